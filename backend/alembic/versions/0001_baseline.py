@@ -0,0 +1,23 @@
+"""Baseline: the schema create_all produced before migrations were added
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 09:00:00
+
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,24 @@
+"""Index product_files.checksum (blob lookups, ownership checks and GC)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from app.core.migrations import create_index, drop_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index("ix_product_files_checksum", "product_files", ["checksum"])
+
+
+def downgrade() -> None:
+    drop_index("ix_product_files_checksum", "product_files")
@@ -0,0 +1,30 @@
+"""Product card thumbnails and the source checksum of product images
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:10:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from app.core.migrations import add_column, create_index, drop_column, drop_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_column("products", sa.Column("thumbnail_url", sa.String(500)))
+    add_column("product_images", sa.Column("checksum", sa.String(64)))
+    create_index("ix_product_images_checksum", "product_images", ["checksum"])
+
+
+def downgrade() -> None:
+    drop_index("ix_product_images_checksum", "product_images")
+    drop_column("product_images", "checksum")
+    drop_column("products", "thumbnail_url")
@@ -0,0 +1,26 @@
+"""Index pending/completed purchase lookups (checkout, downloads)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:20:00
+
+"""
+from typing import Sequence, Union
+
+from app.core.migrations import create_index, drop_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index(
+        "ix_transactions_buyer_product_status", "transactions", ["buyer_id", "product_id", "status"]
+    )
+
+
+def downgrade() -> None:
+    drop_index("ix_transactions_buyer_product_status", "transactions")
@@ -0,0 +1,37 @@
+"""Transaction history indexes and the transactions archive
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.orm import Session
+
+from app.core.migrations import create_index, create_table, drop_index, has_table
+from app.models.transaction import TransactionArchive
+from app.services.transaction_archive import restore_downloadable
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index("ix_transactions_buyer_created", "transactions", ["buyer_id", "created_at"])
+    create_index("ix_transactions_seller_created", "transactions", ["seller_id", "created_at"])
+    create_table(TransactionArchive.__table__)
+
+    # Purchases archived while still downloadable go back to the live table
+    restore_downloadable(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    if has_table("transactions_archive"):
+        op.drop_table("transactions_archive")
+    drop_index("ix_transactions_seller_created", "transactions")
+    drop_index("ix_transactions_buyer_created", "transactions")
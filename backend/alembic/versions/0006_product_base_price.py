@@ -0,0 +1,40 @@
+"""Product prices in the base currency, and the FX rates behind them
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:40:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.orm import Session
+
+from app.core.migrations import add_column, create_index, create_table, drop_column, drop_index, has_table
+from app.models.currency import FxRate
+from app.services.currency import load_rates, renormalize
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_table(FxRate.__table__)
+    add_column("products", sa.Column("base_price", sa.Float()))
+    create_index("ix_products_base_price", "products", ["base_price"])
+
+    # Base-currency products get their price now; the rest once refresh_rates has run
+    session = Session(bind=op.get_bind())
+    renormalize(session, load_rates(session))
+    session.commit()
+
+
+def downgrade() -> None:
+    drop_index("ix_products_base_price", "products")
+    drop_column("products", "base_price")
+    if has_table("fx_rates"):
+        op.drop_table("fx_rates")
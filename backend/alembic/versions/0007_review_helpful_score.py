@@ -0,0 +1,44 @@
+"""Review helpfulness votes and the per-sort listing indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 09:50:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.orm import Session
+
+from app.core.migrations import add_column, create_index, create_table, drop_column, drop_index, has_table
+from app.models.review import ReviewVote
+from app.services.reviews import rescore_reviews
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_column("reviews", sa.Column("helpful_score", sa.Float(), server_default="0"))
+    create_index("ix_reviews_product_created", "reviews", ["product_id", "created_at"])
+    create_index("ix_reviews_product_rating", "reviews", ["product_id", "rating", "created_at"])
+    create_index("ix_reviews_product_helpful", "reviews", ["product_id", "helpful_score", "created_at"])
+    create_table(ReviewVote.__table__)
+
+    # Scores of the votes counted before the score existed
+    session = Session(bind=op.get_bind())
+    rescore_reviews(session)
+    session.commit()
+
+
+def downgrade() -> None:
+    if has_table("review_votes"):
+        op.drop_table("review_votes")
+    drop_index("ix_reviews_product_helpful", "reviews")
+    drop_index("ix_reviews_product_rating", "reviews")
+    drop_index("ix_reviews_product_created", "reviews")
+    drop_column("reviews", "helpful_score")
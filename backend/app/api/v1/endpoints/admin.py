@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
 
+from app.core.celery_app import get_sync_redis
 from app.core.deps import get_db, get_current_admin_user
-from app.models.user import User
-from app.models.product import Product
-from app.models.transaction import Transaction
+from app.core.redis_client import redis_client
+from app.core.serialization import get_serializer, fast_json_response
+from app.core.streaming import STREAM_HEADERS
+from app.models.user import User, UserRole
+from app.models.product import Product, ProductStatus
+from app.models.transaction import PaymentMethod, Transaction, TransactionStatus
 from app.schemas.user import UserResponse
 from app.schemas.product import ProductBase
 from app.schemas.transaction import TransactionBase
+from app.services import admin_metrics, export
 
 router = APIRouter()
 
@@ -18,10 +26,21 @@ async def admin_stats(
     db: Session = Depends(get_db),
     _admin: User = Depends(get_current_admin_user),
 ):
-    users = db.query(User).count()
-    products = db.query(Product).count()
-    sales = db.query(Transaction).count()
-    return {"users": users, "products": products, "transactions": sales}
+    """
+    Totals, breakdowns by role/status, recent signups, sales and revenue and
+    their week-over-week trends, read from the maintained counters
+    """
+    stats = await admin_metrics.dashboard()
+    if stats is None and redis_client.redis is not None:
+        # First request after a Redis flush: rebuild the counters once
+        await run_in_threadpool(admin_metrics.reconcile, db, get_sync_redis())
+        stats = await admin_metrics.dashboard()
+    if stats is None:
+        users = db.query(User).count()
+        products = db.query(Product).count()
+        sales = db.query(Transaction).count()
+        return {"users": users, "products": products, "transactions": sales}
+    return stats
 
 
 @router.get("/users", response_model=List[UserResponse])
@@ -29,7 +48,14 @@ async def admin_users(
     db: Session = Depends(get_db),
     _admin: User = Depends(get_current_admin_user),
 ):
-    return db.query(User).order_by(User.created_at.desc()).all()
+    serializer = get_serializer(UserResponse)
+    rows = (
+        db.query(User)
+        .options(serializer.load_options(User))
+        .order_by(User.created_at.desc())
+        .all()
+    )
+    return fast_json_response(serializer.dump_rows(rows))
 
 
 @router.get("/products", response_model=List[ProductBase])
@@ -37,7 +63,14 @@ async def admin_products(
     db: Session = Depends(get_db),
     _admin: User = Depends(get_current_admin_user),
 ):
-    return db.query(Product).order_by(Product.created_at.desc()).all()
+    serializer = get_serializer(ProductBase)
+    rows = (
+        db.query(Product)
+        .options(serializer.load_options(Product))
+        .order_by(Product.created_at.desc())
+        .all()
+    )
+    return fast_json_response(serializer.dump_rows(rows))
 
 
 @router.get("/transactions", response_model=List[TransactionBase])
@@ -45,4 +78,90 @@ async def admin_transactions(
     db: Session = Depends(get_db),
     _admin: User = Depends(get_current_admin_user),
 ):
-    return db.query(Transaction).order_by(Transaction.created_at.desc()).all()
+    serializer = get_serializer(TransactionBase)
+    rows = (
+        db.query(Transaction)
+        .options(serializer.load_options(Transaction))
+        .order_by(Transaction.created_at.desc())
+        .all()
+    )
+    return fast_json_response(serializer.dump_rows(rows))
+
+
+def _export_response(
+    db: Session,
+    entity: str,
+    fmt: str,
+    filters: Dict[str, Any],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+) -> StreamingResponse:
+    body = export.export(db, entity, fmt, filters, created_from, created_to)
+    filename = f"{entity}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={**STREAM_HEADERS, "Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/export/users")
+async def export_users(
+    format: str = Query(export.NDJSON, pattern="^(ndjson|csv)$"),
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    is_banned: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _admin: User = Depends(get_current_admin_user),
+):
+    """
+    All users matching the filters, streamed as NDJSON or CSV
+    """
+    filters = {"role": role, "is_active": is_active, "is_banned": is_banned}
+    return _export_response(db, "users", format, filters, created_from, created_to)
+
+
+@router.get("/export/products")
+async def export_products(
+    format: str = Query(export.NDJSON, pattern="^(ndjson|csv)$"),
+    status: Optional[ProductStatus] = None,
+    seller_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _admin: User = Depends(get_current_admin_user),
+):
+    """
+    All products matching the filters, streamed as NDJSON or CSV
+    """
+    filters = {"status": status, "seller_id": seller_id, "category_id": category_id}
+    return _export_response(db, "products", format, filters, created_from, created_to)
+
+
+@router.get("/export/transactions")
+async def export_transactions(
+    format: str = Query(export.NDJSON, pattern="^(ndjson|csv)$"),
+    status: Optional[TransactionStatus] = None,
+    payment_method: Optional[PaymentMethod] = None,
+    seller_id: Optional[int] = None,
+    buyer_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _admin: User = Depends(get_current_admin_user),
+):
+    """
+    All transactions matching the filters, streamed as NDJSON or CSV
+    """
+    filters = {
+        "status": status,
+        "payment_method": payment_method,
+        "seller_id": seller_id,
+        "buyer_id": buyer_id,
+        "product_id": product_id,
+    }
+    return _export_response(db, "transactions", format, filters, created_from, created_to)
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.deps import get_db, get_current_admin_user, get_current_seller_user
+from app.models.user import User, UserRole
+from app.services import sales_analytics
+from app.tasks.analytics import rebuild_sales_rollups_job
+from app.tasks.base import enqueue_async
+
+router = APIRouter()
+
+DEFAULT_RANGE = timedelta(days=30)
+
+
+def _naive_utc(moment: Union[datetime, date]) -> datetime:
+    """Rollups are kept in naive UTC; plain dates mean midnight UTC"""
+    if not isinstance(moment, datetime):
+        return datetime(moment.year, moment.month, moment.day)
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _report_scope(
+    current_user: User,
+    seller_id: Optional[int],
+    start: Optional[Union[datetime, date]],
+    end: Optional[Union[datetime, date]],
+):
+    """Seller whose sales are read (admins may pick one) and the date range"""
+    if seller_id is not None and seller_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    end = _naive_utc(end) if end else datetime.utcnow()
+    start = _naive_utc(start) if start else end - DEFAULT_RANGE
+    return seller_id or current_user.id, start, end
+
+
+@router.get("/sales")
+async def sales(
+    start: Optional[Union[datetime, date]] = None,
+    end: Optional[Union[datetime, date]] = None,
+    granularity: Optional[str] = Query(None, description="hour, day or month; picked from the range when omitted"),
+    product_id: Optional[int] = None,
+    seller_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    """
+    Units, gross, commission and net sales per bucket over ``[start, end)``
+    (default: the last 30 days), for all products or one of them
+    """
+    seller_id, start, end = _report_scope(current_user, seller_id, start, end)
+    return sales_analytics.sales_report(db, seller_id, start, end, granularity, product_id)
+
+
+@router.get("/sales/top-products")
+async def top_products(
+    start: Optional[Union[datetime, date]] = None,
+    end: Optional[Union[datetime, date]] = None,
+    limit: int = Query(10, ge=1, le=100),
+    seller_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    seller_id, start, end = _report_scope(current_user, seller_id, start, end)
+    return sales_analytics.top_products(db, seller_id, start, end, limit)
+
+
+@router.post("/rollups/rebuild")
+async def rebuild_rollups(
+    since: Optional[datetime] = None,
+    _admin: User = Depends(get_current_admin_user),
+):
+    """
+    Backfill the sales rollups from completed transactions (from the month
+    of ``since`` on, or everything)
+    """
+    job_id = await enqueue_async(
+        rebuild_sales_rollups_job,
+        since=since.isoformat() if since else None,
+    )
+    return {"job_id": job_id, "status": "queued"}
@@ -26,8 +26,10 @@ from app.schemas.auth import (
     PasswordResetConfirm
 )
 from app.schemas.user import UserResponse
+from app.services.admin_metrics import MetricChanges
 from app.services.auth import AuthService
-from app.services.email import EmailService
+from app.tasks import email as email_tasks
+from app.tasks.base import enqueue_async
 
 router = APIRouter()
 
@@ -68,10 +70,15 @@ async def register(
     db.add(user)
     db.commit()
     db.refresh(user)
+    await MetricChanges().user_created(user).flush_async()
     
-    # Send verification email
-    email_service = EmailService()
-    await email_service.send_verification_email(user.email, user.username)
+    # Queue verification email
+    await enqueue_async(
+        email_tasks.send_verification_email,
+        idempotency_key=f"user-{user.id}",
+        email_to=user.email,
+        username=user.username
+    )
     
     return user
 
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_db
+from app.core.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
 from app.models.product import ProductCategory
 from app.schemas.product import CategoryBase, CategoryListResponse
 
@@ -9,6 +11,18 @@ router = APIRouter()
 
 
 @router.get("/", response_model=CategoryListResponse)
-async def list_categories(db: Session = Depends(get_db)):
+async def list_categories(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    total, last_modified = db.query(
+        func.count(ProductCategory.id), func.max(ProductCategory.updated_at)
+    ).one()
+    etag = make_etag("categories", total, last_modified, weak=True)
+    if etag_matches(request, etag):
+        return not_modified(etag, "category_list", last_modified)
+
     items = db.query(ProductCategory).order_by(ProductCategory.name.asc()).all()
+    set_cache_headers(response, etag, "category_list", last_modified)
     return {"items": items, "total": len(items)}
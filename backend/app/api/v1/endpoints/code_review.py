@@ -1,8 +1,13 @@
 """API endpoint for AI code review."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.services.code_review import review_code
+from app.core.config import settings
+from app.core.streaming import STREAM_HEADERS, ndjson_stream, sse_stream
+from app.services.code_review import check_configured, code_hash, normalize_code, review_service
+from app.tasks.base import enqueue_async, job_status
+from app.tasks.code_review import review_code_job
 
 router = APIRouter()
 
@@ -11,7 +16,52 @@ class CodeReviewRequest(BaseModel):
     code: str
 
 
-@router.post("/", response_model=dict)
+@router.post("/", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def perform_code_review(payload: CodeReviewRequest):
-    feedback = review_code(payload.code)
-    return {"feedback": feedback}
+    check_configured()
+    review_service.chunks(normalize_code(payload.code))  # 413 before queueing oversized code
+    cached = await review_service.get_cached(payload.code)
+    if cached is not None:
+        return {"job_id": None, "status": "success", "feedback": cached}
+
+    # Identical code maps to the same job, so repeats reuse the pending/finished review
+    job_id = await enqueue_async(
+        review_code_job,
+        idempotency_key=code_hash(payload.code),
+        code=payload.code,
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.post("/stream")
+async def stream_code_review(payload: CodeReviewRequest, request: Request):
+    """
+    Stream the review while it is generated: Server-Sent Events, or NDJSON
+    when the client accepts application/x-ndjson. Disconnecting cancels the
+    upstream completion.
+    """
+    check_configured()
+    review_service.chunks(normalize_code(payload.code))
+    review_service.check_capacity()
+
+    events = review_service.stream(payload.code)
+    keepalive = settings.CODE_REVIEW_STREAM_KEEPALIVE
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            ndjson_stream(events, keepalive),
+            media_type="application/x-ndjson",
+            headers=STREAM_HEADERS,
+        )
+    return StreamingResponse(
+        sse_stream(events, keepalive),
+        media_type="text/event-stream",
+        headers=STREAM_HEADERS,
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_code_review(job_id: str):
+    status_info = job_status(job_id)
+    if status_info["status"] == "success":
+        status_info["feedback"] = status_info.pop("result")
+    return status_info
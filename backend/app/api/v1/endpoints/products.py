@@ -1,61 +1,223 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.core.deps import get_db, get_current_seller_user, PaginationParams
-from app.models.product import Product
-from app.schemas.product import ProductBase, ProductDetail, ProductListResponse, ProductCreate
+from app.core.config import settings
+from app.core.deps import get_db, get_current_active_user, get_current_seller_user, PaginationParams
+from app.core.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
+from app.core.serialization import get_serializer, fast_json_response
+from app.models.product import Product, ProductFile
+from app.models.user import User
+from app.schemas.product import (
+    ProductDetail,
+    ProductListItem,
+    ProductListResponse,
+    ProductCreate,
+    ProductManifestResponse,
+)
+from app.services.admin_metrics import MetricChanges
+from app.services.archive import get_manifest
+from app.services.code_analysis import get_summary
+from app.services.currency import display_prices, get_rates, rate_for, rates_version, to_base
+from app.services.download import get_purchase, get_product_file, download_response
+from app.services.upload import get_owned_product
+from app.tasks.analysis import schedule_analysis
 
 router = APIRouter()
 
 
 @router.get("/", response_model=ProductListResponse)
 async def list_products(
+    request: Request,
     db: Session = Depends(get_db),
     pagination: PaginationParams = Depends(),
     q: Optional[str] = None,
     category_id: Optional[int] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    currency: Optional[str] = Query(None, min_length=3, max_length=3, description="Display currency of prices and price filters"),
+    sort: str = Query("newest", pattern="^(newest|price_asc|price_desc)$"),
 ):
+    """
+    Products, optionally filtered by a price range and sorted by price, both
+    across currencies through the indexed base-currency price. Prices are
+    also returned in the display currency (the base currency by default).
+    Filtering or sorting by price leaves out products whose currency has no
+    rate yet.
+    """
+    rates = await get_rates()
+    currency = (currency or settings.BASE_CURRENCY).upper()
+    rate = rate_for(rates, currency)
+
     query = db.query(Product)
     if q:
         query = query.filter(Product.title.ilike(f"%{q}%"))
     if category_id:
         query = query.filter(Product.category_id == category_id)
+    if min_price is not None:
+        query = query.filter(Product.base_price >= min_price / rate)
+    if max_price is not None:
+        query = query.filter(Product.base_price <= max_price / rate)
+    if sort != "newest":
+        query = query.filter(Product.base_price.isnot(None))
+
+    # Count and updated_at watermark in one cheap aggregate; answer 304 before paging
+    total, last_modified = query.with_entities(
+        func.count(Product.id), func.max(Product.updated_at)
+    ).one()
+    etag = make_etag(
+        "products", q, category_id, min_price, max_price, currency, sort,
+        pagination.page, pagination.page_size, total, last_modified,
+        rates_version(rates), weak=True
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, "product_list", last_modified)
+
+    if sort == "price_asc":
+        order = (Product.base_price.asc(), Product.id.asc())
+    elif sort == "price_desc":
+        order = (Product.base_price.desc(), Product.id.desc())
+    else:
+        order = (Product.created_at.desc(),)
 
-    total = query.count()
-    items = (
-        query.order_by(Product.created_at.desc())
+    serializer = get_serializer(ProductListItem)
+    items = serializer.dump_rows(
+        query.options(serializer.load_options(Product))
+        .order_by(*order)
         .offset(pagination.skip)
         .limit(pagination.limit)
         .all()
     )
-    return {"items": items, "total": total, "page": pagination.page, "page_size": pagination.page_size}
+    prices = display_prices([item["base_price"] for item in items], currency, rates)
+    for item, price in zip(items, prices):
+        item["display_price"] = price
+        item["display_currency"] = currency
+    response = fast_json_response({
+        "items": items,
+        "total": total,
+        "page": pagination.page,
+        "page_size": pagination.page_size,
+    })
+    return set_cache_headers(response, etag, "product_list", last_modified)
 
 
 @router.get("/{product_id}", response_model=ProductDetail)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    # updated_at changes on every write, so it is a strong validator for the row
+    updated_at = (
+        db.query(Product.updated_at).filter(Product.id == product_id).scalar()
+    )
+    etag = make_etag("product", product_id, updated_at)
+    if updated_at is not None and etag_matches(request, etag):
+        return not_modified(etag, "product", updated_at)
+
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    set_cache_headers(response, etag, "product", updated_at)
     return product
 
 
+@router.get("/{product_id}/manifest", response_model=ProductManifestResponse)
+async def get_product_manifest(product_id: int, db: Session = Depends(get_db)):
+    """
+    Files inside each of the product's archives, read without extracting them
+    """
+    if not db.query(Product.id).filter(Product.id == product_id).first():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    product_files = (
+        db.query(ProductFile)
+        .filter(ProductFile.product_id == product_id)
+        .order_by(ProductFile.is_main.desc(), ProductFile.id.asc())
+        .all()
+    )
+    items = []
+    for product_file in product_files:
+        manifest = await get_manifest(product_file)
+        items.append({
+            **manifest,
+            "file_id": product_file.id,
+            "file_name": product_file.file_name,
+        })
+    return {"product_id": product_id, "items": items}
+
+
+@router.post("/{product_id}/analysis", status_code=status.HTTP_202_ACCEPTED)
+async def request_product_analysis(
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Queue static analysis (code quality and security scores) of the product's files
+    """
+    get_owned_product(db, product_id, current_user)
+    job_id = await schedule_analysis(db, product_id)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/{product_id}/analysis")
+async def get_product_analysis(
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Latest analysis of the product, with findings (owner and admins only)
+    """
+    product = get_owned_product(db, product_id, current_user)
+    summary = await get_summary(product_id)
+    if summary is None:
+        summary = {
+            "product_id": product_id,
+            "code_quality_score": product.code_quality_score,
+            "security_score": product.security_score,
+        }
+    return summary
+
+
+@router.get("/{product_id}/download")
+async def download_product(
+    product_id: int,
+    request: Request,
+    file_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Download a purchased product file (main file unless file_id is given).
+    Supports Range/If-Range; a download is counted when a transfer starts at byte 0.
+    """
+    transaction = get_purchase(db, current_user.id, product_id)
+    product_file = get_product_file(db, product_id, file_id)
+    return await download_response(request, db, transaction, product_file)
+
+
 @router.post("/", response_model=ProductDetail, status_code=status.HTTP_201_CREATED)
 async def create_product(
     data: ProductCreate,
     db: Session = Depends(get_db),
     _seller=Depends(get_current_seller_user),
 ):
+    currency = data.currency.upper()
     product = Product(
         title=data.title,
         slug=data.title.lower().replace(" ", "-"),
         description=data.description,
         price=data.price,
-        currency=data.currency,
+        currency=currency,
+        base_price=to_base(data.price, currency, await get_rates()),
         seller_id=_seller.id,
         category_id=data.category_id,
     )
     db.add(product)
     db.commit()
     db.refresh(product)
+    await MetricChanges().product_created(product).flush_async()
     return product
@@ -1,15 +1,90 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List
 
-from app.core.deps import get_db
+from app.core.config import settings
+from app.core.deps import get_db, get_current_active_user, PaginationParams
+from app.core.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
+from app.core.redis_client import redis_client
+from app.core.serialization import get_serializer, fast_json_response
 from app.models.review import Review
-from app.schemas.review import ReviewBase
+from app.models.user import User
+from app.schemas.review import ReviewBase, ReviewListResponse, ReviewVoteRequest, ReviewVoteResponse
+from app.services.reviews import (
+    cached_first_page,
+    invalidate_first_pages,
+    list_page,
+    record_vote,
+    store_first_page,
+)
 
 router = APIRouter()
 
 
-@router.get("/product/{product_id}", response_model=List[ReviewBase])
-async def list_reviews(product_id: int, db: Session = Depends(get_db)):
-    reviews = db.query(Review).filter(Review.product_id == product_id).order_by(Review.created_at.desc()).all()
-    return reviews
+@router.get("/product/{product_id}", response_model=ReviewListResponse)
+async def list_reviews(
+    product_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    pagination: PaginationParams = Depends(),
+    sort: str = Query("newest", pattern="^(newest|highest|lowest|most_helpful)$"),
+):
+    """
+    Reviews of a product, a page at a time. The first page of each sort mode
+    is cached in Redis until the product's reviews change.
+    """
+    total, last_modified = (
+        db.query(func.count(Review.id), func.max(Review.updated_at))
+        .filter(Review.product_id == product_id)
+        .one()
+    )
+    etag = make_etag(
+        "reviews", product_id, sort, pagination.page, pagination.page_size,
+        total, last_modified, weak=True
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, "review_list", last_modified)
+
+    cacheable = (
+        pagination.page == 1
+        and pagination.page_size == settings.DEFAULT_PAGE_SIZE
+        and redis_client.redis is not None
+    )
+    if cacheable:
+        body = await cached_first_page(product_id, sort, etag)
+        if body is not None:
+            response = Response(content=body, media_type="application/json")
+            return set_cache_headers(response, etag, "review_list", last_modified)
+
+    serializer = get_serializer(ReviewBase)
+    reviews = list_page(db, product_id, sort, pagination.skip, pagination.limit)
+    response = fast_json_response({
+        "items": serializer.dump_rows(reviews),
+        "total": total,
+        "page": pagination.page,
+        "page_size": pagination.page_size,
+        "sort": sort,
+    })
+    if cacheable:
+        await store_first_page(product_id, sort, etag, response.body.decode())
+    return set_cache_headers(response, etag, "review_list", last_modified)
+
+
+@router.post("/{review_id}/vote", response_model=ReviewVoteResponse)
+async def vote_review(
+    review_id: int,
+    data: ReviewVoteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Mark a review helpful or not helpful (voting again changes the vote)
+    """
+    review = record_vote(db, review_id, current_user, data.helpful)
+    await invalidate_first_pages(review.product_id)
+    return {
+        "review_id": review.id,
+        "helpful_count": review.helpful_count,
+        "not_helpful_count": review.not_helpful_count,
+        "helpful_score": review.helpful_score,
+    }
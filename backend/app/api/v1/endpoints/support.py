@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 from app.core.deps import get_db
 from app.core.config import settings
 from app.schemas.support import ContactForm
-from app.services.email import EmailService
+from app.tasks import email as email_tasks
+from app.tasks.base import enqueue_async
 
 router = APIRouter()
 
@@ -12,7 +13,6 @@ router = APIRouter()
 @router.post("/contact")
 async def submit_contact(form: ContactForm, db: Session = Depends(get_db)):
     try:
-        email_service = EmailService()
         subject = f"[Contact] {form.subject}"
         html = f"""
         <h3>New Contact Message</h3>
@@ -21,7 +21,8 @@ async def submit_contact(form: ContactForm, db: Session = Depends(get_db)):
         <p><strong>Subject:</strong> {form.subject}</p>
         <p><strong>Message:</strong><br/>{form.message}</p>
         """
-        await email_service.send_email(
+        await enqueue_async(
+            email_tasks.send_email,
             email_to=[settings.ADMIN_EMAIL],
             subject=subject,
             body=form.message,
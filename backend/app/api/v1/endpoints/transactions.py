@@ -1,100 +1,132 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from uuid import uuid4
+from datetime import date, datetime
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.core.celery_app import get_sync_redis
 from app.core.deps import get_db, get_current_active_user
-from app.models.transaction import (
-    Transaction,
-    PaymentMethod,
-    TransactionStatus,
-)
-from app.models.product import Product
-from app.schemas.transaction import (
-    TransactionBase,
-    TransactionCreate,
-    PaymentInitResponse,
-    PaymentVerifyRequest,
-)
+from app.core.serialization import get_serializer, fast_json_response
+from app.models.transaction import PaymentMethod, Transaction, TransactionArchive
 from app.models.user import User
-from app.services import payment
-from app.core.config import settings
+from app.schemas.transaction import TransactionBase, TransactionCreate, PaymentInitResponse
+from app.services.checkout import checkout
+from app.services.payment import gateways
+from app.services.settlement import (
+    OPEN_STATUSES,
+    after_settlement,
+    queue_verification,
+    settle_batch,
+    verification,
+)
+from app.services.transaction_archive import history
+from app.tasks.settlement import schedule_settlement
 
 router = APIRouter()
 
 
 @router.get("/my/purchases", response_model=List[TransactionBase])
-async def my_purchases(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    txs = db.query(Transaction).filter(Transaction.buyer_id == current_user.id).order_by(Transaction.created_at.desc()).all()
-    return txs
+async def my_purchases(
+    start: Optional[Union[datetime, date]] = None,
+    end: Optional[Union[datetime, date]] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Purchases created in ``[start, end)``, newest first (archived ones included)
+    """
+    serializer = get_serializer(TransactionBase)
+    txs = history(db, "buyer_id", current_user.id, start, end, limit, serializer.load_options)
+    return fast_json_response(serializer.dump_rows(txs))
 
 
 @router.get("/my/sales", response_model=List[TransactionBase])
-async def my_sales(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    txs = db.query(Transaction).filter(Transaction.seller_id == current_user.id).order_by(Transaction.created_at.desc()).all()
-    return txs
+async def my_sales(
+    start: Optional[Union[datetime, date]] = None,
+    end: Optional[Union[datetime, date]] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Sales created in ``[start, end)``, newest first (archived ones included)
+    """
+    serializer = get_serializer(TransactionBase)
+    txs = history(db, "seller_id", current_user.id, start, end, limit, serializer.load_options)
+    return fast_json_response(serializer.dump_rows(txs))
 
 
 @router.post("/create", response_model=PaymentInitResponse)
 async def create_transaction(
     payload: TransactionCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    product = db.query(Product).filter(Product.id == payload.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    """
+    Start a purchase. Send an Idempotency-Key to make retries safe: repeats
+    get the first response back instead of a new transaction.
+    """
+    result, replayed = await checkout(db, current_user, payload, idempotency_key)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
-    transaction = Transaction(
-        transaction_id=str(uuid4()),
-        amount=product.price,
-        currency=product.currency,
-        product_id=product.id,
-        buyer_id=current_user.id,
-        seller_id=product.seller_id,
-        payment_method=payload.payment_method,
-    )
-    db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
 
-    return_url = f"{settings.FRONTEND_URL}/payments/return"
-    if payload.payment_method == PaymentMethod.VNPAY:
-        payment_url = payment.create_vnpay_payment(
-            transaction.transaction_id, transaction.amount, return_url
-        )
-    else:
-        res = payment.create_paypal_payment(
-            transaction.transaction_id, transaction.amount, return_url, return_url
-        )
-        payment_url = res["approval_url"]
-
-    return {
-        "transaction_id": transaction.transaction_id,
-        "payment_url": payment_url,
-    }
-
-
-@router.post("/verify")
+@router.api_route(
+    "/verify/{payment_method}", methods=["GET", "POST"], status_code=status.HTTP_202_ACCEPTED
+)
 async def verify_transaction(
-    payload: PaymentVerifyRequest,
+    payment_method: PaymentMethod,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ):
-    transaction = (
-        db.query(Transaction)
-        .filter(Transaction.transaction_id == payload.transaction_id)
-        .first()
+    """
+    Accept a payment result from its gateway: VNPay return/IPN parameters,
+    a Stripe webhook event, or a PayPal order id (looked up and captured).
+    Only results the gateway authenticates reach settlement, which happens
+    in batches on the workers; the transaction's status shows the outcome.
+    """
+    result = await gateways.get(payment_method).verify(request)
+    if result is None:
+        return {"status": "ignored"}
+
+    current = (
+        db.query(Transaction.status)
+        .filter(
+            Transaction.transaction_id == result.transaction_id,
+            Transaction.payment_method == payment_method,
+        )
+        .scalar()
     )
-    if not transaction:
+    if current is None:
+        # Archived transactions are settled: report their status
+        current = (
+            db.query(TransactionArchive.status)
+            .filter(TransactionArchive.transaction_id == result.transaction_id)
+            .scalar()
+        )
+    if current is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    if current not in OPEN_STATUSES:
+        # Already settled: replays change nothing
+        response.status_code = status.HTTP_200_OK
+        return {"status": current}
 
-    transaction.status = (
-        TransactionStatus.COMPLETED
-        if payload.status == "success"
-        else TransactionStatus.FAILED
-    )
-    db.commit()
-    return {"status": transaction.status}
+    item = verification(result.transaction_id, result.succeeded, result.gateway_id)
+    if not await queue_verification(item):
+        # Queue unavailable: settle this one inline, with the workers' side effects
+        settled = settle_batch(db, [item])
+        await run_in_threadpool(after_settlement, db, get_sync_redis(), settled)
+        response.status_code = status.HTTP_200_OK
+        return {
+            "status": db.query(Transaction.status)
+            .filter(Transaction.transaction_id == result.transaction_id)
+            .scalar()
+        }
+    await schedule_settlement()
+    return {"status": "queued"}
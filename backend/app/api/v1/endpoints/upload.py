@@ -1,23 +1,318 @@
 import os
-import uuid
-import shutil
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from typing import Optional
 
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '..', '..', 'uploads')
-UPLOAD_DIR = os.path.abspath(UPLOAD_DIR)
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+from app.core.config import settings
+from app.core.deps import get_db, get_current_seller_user
+from app.core.storage import storage
+from app.models.user import User
+from app.services.blob_store import blob_store, validate_checksum
+from app.services.images import generate_derivatives, variant_key
+from app.services.resumable_upload import ResumableUploadService, parse_checksum_header
+from app.services.upload import (
+    MultipartFileStream,
+    StoredUpload,
+    ingest_stream,
+    get_owned_product,
+    owns_blob,
+    attach_product_file,
+    attach_product_image,
+    validate_filename,
+    sniff_content_type,
+    SNIFF_SIZE,
+)
+from app.tasks.analysis import schedule_analysis
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Request body documented for endpoints that parse multipart uploads by hand
+FILE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
 
 router = APIRouter()
 
 
-@router.post("/file")
-async def upload_file(file: UploadFile = File(...)):
-    if not file.filename:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file")
-    ext = os.path.splitext(file.filename)[1]
-    target_name = f"{uuid.uuid4().hex}{ext}"
-    target_path = os.path.join(UPLOAD_DIR, target_name)
-    with open(target_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"filename": file.filename, "stored_as": target_name, "size": os.path.getsize(target_path)}
+def _stored_response(stored: StoredUpload) -> dict:
+    return {
+        "filename": stored.filename,
+        "stored_as": stored.stored_as,
+        "size": stored.size,
+        "checksum": stored.checksum,
+        "content_type": stored.content_type,
+        "deduplicated": stored.deduplicated,
+    }
+
+
+def _check_content_length(request: Request, max_size: int) -> None:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_size + MULTIPART_OVERHEAD:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds the {max_size} byte limit"
+            )
+
+
+@router.post("/file", status_code=status.HTTP_201_CREATED, openapi_extra=FILE_UPLOAD_BODY)
+async def upload_file(
+    request: Request,
+    product_id: int,
+    is_main: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    """
+    Single-request upload of a product file. The file is recorded on the
+    product right away, so its blob is referenced before garbage collection
+    can see it.
+    """
+    product = get_owned_product(db, product_id, current_user)
+    _check_content_length(request, settings.MAX_UPLOAD_SIZE)
+    stream = MultipartFileStream(request)
+    filename = await stream.start()
+    stored = await ingest_stream(stream.chunks(), filename)
+    product_file = attach_product_file(db, product, stored, is_main=is_main)
+    result = _stored_response(stored)
+    result["product_file_id"] = product_file.id
+    result["analysis_job_id"] = await schedule_analysis(db, product.id)
+    return result
+
+
+@router.post("/images", status_code=status.HTTP_201_CREATED, openapi_extra=FILE_UPLOAD_BODY)
+async def upload_image(
+    request: Request,
+    product_id: int,
+    is_primary: bool = False,
+    caption: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    """
+    Upload a product screenshot; resized WebP/JPEG derivatives are generated
+    in the image process pool and metadata is stripped
+    """
+    product = get_owned_product(db, product_id, current_user)
+    _check_content_length(request, settings.MAX_IMAGE_UPLOAD_SIZE)
+    stream = MultipartFileStream(request)
+    filename = await stream.start()
+    stored = await ingest_stream(
+        stream.chunks(),
+        filename,
+        max_size=settings.MAX_IMAGE_UPLOAD_SIZE,
+        allowed_extensions=settings.IMAGE_EXTENSIONS,
+    )
+    derivatives = await generate_derivatives(stored.checksum)
+    image = attach_product_image(db, product, stored, derivatives, is_primary, caption)
+    return {
+        "id": image.id,
+        "image_url": image.image_url,
+        "thumbnail_url": image.thumbnail_url,
+        "is_primary": image.is_primary,
+        "checksum": stored.checksum,
+        "width": derivatives["width"],
+        "height": derivatives["height"],
+        "variants": derivatives["variants"],
+        "urls": derivatives["urls"],
+    }
+
+
+@router.get("/images/{checksum}/{variant}")
+async def get_image_variant(checksum: str, variant: str):
+    """
+    Serve an image derivative; content-addressed, so cacheable forever
+    """
+    checksum = validate_checksum(checksum)
+    key = variant_key(checksum, variant)
+    if key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+
+    path = storage.local_path(key)
+    if path is None:
+        url = await run_in_threadpool(storage.presigned_url, key)
+        return RedirectResponse(
+            url,
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": f"public, max-age={settings.S3_PRESIGNED_URL_TTL // 2}"},
+        )
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    return FileResponse(
+        path,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+    chunk_size: Optional[int] = None
+    product_id: Optional[int] = None
+
+
+def _offset_headers(info: dict) -> dict:
+    return {
+        "Upload-Offset": str(info["offset"]),
+        "Upload-Length": str(info["size"]),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/sessions", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    if payload.product_id is not None:
+        get_owned_product(db, payload.product_id, current_user)
+    service = ResumableUploadService(current_user.id)
+    session = await service.create(
+        payload.filename, payload.size, payload.chunk_size, payload.product_id
+    )
+    response.headers["Location"] = f"/api/v1/upload/sessions/{session['upload_id']}"
+    return session
+
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_seller_user),
+):
+    info = await ResumableUploadService(current_user.id).status(upload_id)
+    response.headers.update(_offset_headers(info))
+    return info
+
+
+@router.patch("/sessions/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    current_user: User = Depends(get_current_seller_user),
+):
+    service = ResumableUploadService(current_user.id)
+    await service.append(
+        upload_id,
+        upload_offset,
+        request.stream(),
+        parse_checksum_header(upload_checksum),
+    )
+    info = await service.status(upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_offset_headers(info))
+
+
+@router.post("/sessions/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    is_main: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    service = ResumableUploadService(current_user.id)
+    session = await service.get_session(upload_id)
+    product = None
+    if session.get("product_id") is not None:
+        product = get_owned_product(db, session["product_id"], current_user)
+
+    stored = await service.complete(upload_id)
+    result = _stored_response(stored)
+    if product is not None:
+        product_file = attach_product_file(db, product, stored, is_main=is_main)
+        result["product_file_id"] = product_file.id
+        result["analysis_job_id"] = await schedule_analysis(db, product.id)
+    return result
+
+
+@router.delete("/sessions/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_seller_user),
+):
+    await ResumableUploadService(current_user.id).abort(upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+class BlobAttach(BaseModel):
+    filename: str
+    product_id: int
+    is_main: bool = False
+
+
+def _read_head(key: str) -> bytes:
+    with storage.open(key) as fh:
+        return fh.read(SNIFF_SIZE)
+
+
+@router.get("/blobs/{checksum}")
+async def probe_blob(
+    checksum: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    """
+    Existence probe: clients hash locally and skip uploading content one of
+    their products already has. Other sellers' content is never reported.
+    """
+    checksum = validate_checksum(checksum)
+    size = None
+    if owns_blob(db, checksum, current_user):
+        size = await run_in_threadpool(blob_store.size, checksum)
+    return {"checksum": checksum, "exists": size is not None, "size": size}
+
+
+@router.post("/blobs/{checksum}/attach", status_code=status.HTTP_201_CREATED)
+async def attach_blob(
+    checksum: str,
+    payload: BlobAttach,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_seller_user),
+):
+    """
+    Attach content already stored for one of the seller's products to
+    another of their products without re-uploading it
+    """
+    checksum = validate_checksum(checksum)
+    validate_filename(payload.filename)
+    product = get_owned_product(db, payload.product_id, current_user)
+    size = None
+    if owns_blob(db, checksum, current_user):
+        size = await run_in_threadpool(blob_store.size, checksum)
+    if size is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blob not found")
+
+    await run_in_threadpool(blob_store.touch, checksum)
+    key = blob_store.key_for(checksum)
+    stored = StoredUpload(
+        filename=os.path.basename(payload.filename),
+        stored_as=key,
+        size=size,
+        checksum=checksum,
+        content_type=sniff_content_type(await run_in_threadpool(_read_head, key), payload.filename),
+        deduplicated=True,
+    )
+    product_file = attach_product_file(db, product, stored, is_main=payload.is_main)
+    result = _stored_response(stored)
+    result["product_file_id"] = product_file.id
+    result["analysis_job_id"] = await schedule_analysis(db, product.id)
+    return result
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
 
+from app.core.config import settings
 from app.core.deps import get_db, get_current_active_user
 from app.models.user import User
 from app.schemas.user import UserResponse, UserPublic
+from app.services.entitlements import owned_products
 
 router = APIRouter()
 
@@ -14,6 +16,24 @@ async def get_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
+@router.get("/me/entitlements")
+async def my_entitlements(
+    product_ids: List[int] = Query(..., description="Products to check, e.g. those of a listing page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Which of the given products the current user has bought
+    """
+    if len(product_ids) > settings.ENTITLEMENT_MAX_CHECK:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ENTITLEMENT_MAX_CHECK} products per check"
+        )
+    owned = await owned_products(db, current_user.id, product_ids)
+    return {"owned": sorted(owned)}
+
+
 @router.get("/{user_id}", response_model=UserPublic)
 async def get_user(user_id: int, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
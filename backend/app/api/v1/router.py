@@ -14,6 +14,7 @@ from app.api.v1.endpoints import (
     upload,
     support,
     code_review,
+    analytics,
 )
 
 api_router = APIRouter()
@@ -78,3 +79,9 @@ api_router.include_router(
     prefix="/code-review",
     tags=["Code Review"]
 )
+
+api_router.include_router(
+    analytics.router,
+    prefix="/analytics",
+    tags=["Analytics"]
+)
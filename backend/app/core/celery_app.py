@@ -0,0 +1,132 @@
+"""
+Celery Application (background jobs backed by Redis)
+
+Worker:  celery -A app.core.celery_app worker -Q critical,default,bulk -l info
+Beat:    celery -A app.core.celery_app beat -l info
+"""
+from typing import Optional
+
+import redis
+from celery import Celery
+from celery.signals import import_modules
+from kombu import Queue
+
+from app.core.config import settings
+
+# Queues in priority order; with the "priority" queue order strategy a worker
+# consuming several always drains critical before default before bulk
+QUEUE_CRITICAL = "critical"
+QUEUE_DEFAULT = "default"
+QUEUE_BULK = "bulk"
+
+celery_app = Celery(
+    "codeshare_market",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=[
+        "app.tasks.email",
+        "app.tasks.code_review",
+        "app.tasks.uploads",
+        "app.tasks.analysis",
+        "app.tasks.settlement",
+        "app.tasks.analytics",
+        "app.tasks.entitlements",
+        "app.tasks.archive",
+        "app.tasks.currency",
+    ],
+)
+
+celery_app.conf.update(
+    task_queues=(
+        Queue(QUEUE_CRITICAL),
+        Queue(QUEUE_DEFAULT),
+        Queue(QUEUE_BULK),
+    ),
+    task_default_queue=QUEUE_DEFAULT,
+    task_routes={
+        "app.tasks.email.send_verification_email": {"queue": QUEUE_CRITICAL},
+        "app.tasks.email.send_password_reset_email": {"queue": QUEUE_CRITICAL},
+        "app.tasks.settlement.*": {"queue": QUEUE_CRITICAL},
+        "app.tasks.email.*": {"queue": QUEUE_DEFAULT},
+        "app.tasks.code_review.*": {"queue": QUEUE_DEFAULT},
+        "app.tasks.uploads.*": {"queue": QUEUE_BULK},
+        "app.tasks.analysis.*": {"queue": QUEUE_BULK},
+        "app.tasks.analytics.*": {"queue": QUEUE_BULK},
+        "app.tasks.archive.*": {"queue": QUEUE_BULK},
+    },
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=settings.JOB_RESULT_TTL,
+    # Durability: ack only after the task ran, redeliver if a worker dies mid-task
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
+    broker_transport_options={
+        "visibility_timeout": settings.JOB_VISIBILITY_TIMEOUT,
+        # Redis transport default is round_robin, which ignores the queue order
+        "queue_order_strategy": "priority",
+    },
+    broker_connection_retry_on_startup=True,
+    timezone="UTC",
+    beat_schedule={
+        "purge-abandoned-uploads": {
+            "task": "app.tasks.uploads.purge_abandoned_uploads",
+            "schedule": 60 * 60,
+        },
+        "reconcile-admin-metrics": {
+            "task": "app.tasks.analytics.reconcile_admin_metrics",
+            "schedule": settings.ADMIN_METRICS_RECONCILE_INTERVAL,
+        },
+        "reconcile-entitlements": {
+            "task": "app.tasks.entitlements.reconcile_entitlements",
+            "schedule": settings.ENTITLEMENT_RECONCILE_INTERVAL,
+        },
+        "settle-payments": {
+            # Safety net; verifications normally trigger settlement themselves
+            "task": "app.tasks.settlement.settle_payments",
+            "schedule": 30,
+        },
+        "refresh-fx-rates": {
+            "task": "app.tasks.currency.refresh_fx_rates",
+            "schedule": settings.FX_REFRESH_INTERVAL,
+        },
+        "archive-transactions": {
+            "task": "app.tasks.archive.archive_transactions",
+            "schedule": 60 * 60,
+        },
+        "collect-blob-garbage": {
+            "task": "app.tasks.uploads.collect_blob_garbage",
+            "schedule": 24 * 60 * 60,
+        },
+    },
+)
+
+
+
+@import_modules.connect
+def size_worker_pools(sender=None, **kwargs):
+    """
+    Give Celery worker (and beat) processes the small DB pool. Sent just
+    before the task modules, and so the engine, are imported; see
+    server.plan_workers for how these connections count against
+    DB_CONNECTION_BUDGET.
+    """
+    if not sender.loader.worker_initialized:
+        return
+    settings.DB_POOL_SIZE = settings.CELERY_DB_POOL_SIZE
+    settings.DB_MAX_OVERFLOW = settings.CELERY_DB_MAX_OVERFLOW
+
+
+_sync_redis: Optional[redis.Redis] = None
+
+
+def get_sync_redis() -> redis.Redis:
+    """
+    Blocking Redis client for job bookkeeping (workers have no event loop)
+    """
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _sync_redis
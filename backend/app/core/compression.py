@@ -0,0 +1,292 @@
+"""
+Negotiated Response Compression Middleware
+"""
+import gzip
+import zlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional C extension
+    brotli = None
+
+from app.core.config import settings
+
+# Content types worth compressing (matched on the media type prefix)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+# Streams that must reach the client unbuffered
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can produce, in preference order"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported encoding from an ``Accept-Encoding`` header
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check a response content type against the allowlist"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if not media_type or media_type in EXCLUDED_TYPES:
+        return False
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def must_stay_identity(headers: Headers) -> bool:
+    """
+    Responses whose bytes must reach the client as they are: ``no-transform``,
+    byte ranges (offsets and strong validators refer to the identity bytes)
+    and file downloads
+    """
+    return (
+        "no-transform" in headers.get("cache-control", "").lower()
+        or "accept-ranges" in headers
+        or "content-range" in headers
+        or headers.get("content-disposition", "").lower().startswith("attachment")
+    )
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a complete body"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(
+                quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        else:
+            self.compressor = zlib.compressobj(
+                settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away"""
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Finish the stream"""
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class CompressedBodyCache:
+    """
+    Small LRU of compressed bodies keyed by resource, ETag and encoding, so
+    a cacheable representation is compressed once instead of on every hit.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str, str], bytes]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Tuple[str, str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str, str, str], body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    Only allowlisted content types at or above ``minimum_size`` are compressed,
+    and never ranged, ``no-transform`` or attachment responses. Responses
+    carrying an ETag are served from ``CompressedBodyCache``. Streaming
+    responses are compressed chunk by chunk; zero-copy file sends pass
+    through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+        cache_entries: int = settings.COMPRESSION_CACHE_ENTRIES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodyCache(cache_entries)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            async def send_with_vary(message: Message) -> None:
+                # Shared caches must still key the identity variant by encoding
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(raw=message["headers"])
+                    if is_compressible(headers.get("content-type", "")):
+                        headers.add_vary_header("Accept-Encoding")
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        responder = _CompressionResponder(self, scope, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-request state for CompressionMiddleware"""
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        scope: Scope,
+        encoding: str,
+        send: Send
+    ):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.active = False
+        self.streamer: Optional[StreamCompressor] = None
+
+    def _cache_key(self, etag: str) -> Tuple[str, str, str, str]:
+        query = self.scope.get("query_string", b"").decode("latin-1")
+        return (self.scope["path"], query, etag, self.encoding)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start_message = message
+            self.active = (
+                message["status"] == 200
+                and "content-encoding" not in headers
+                and is_compressible(headers.get("content-type", ""))
+                and not must_stay_identity(headers)
+            )
+            if not self.active:
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or not self.active:
+            if self.active and self.streamer is None:
+                # Not a body we can compress (e.g. zerocopysend): the held start goes first, as is
+                self.active = False
+                await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+
+        if self.streamer is None and not more_body:
+            # Complete body in a single message
+            if len(body) < self.middleware.minimum_size:
+                headers.add_vary_header("Accept-Encoding")
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+
+            etag = headers.get("etag")
+            compressed = None
+            if etag:
+                key = self._cache_key(etag)
+                compressed = self.middleware.cache.get(key)
+                if compressed is None:
+                    compressed = compress(body, self.encoding)
+                    self.middleware.cache.put(key, compressed)
+            else:
+                compressed = compress(body, self.encoding)
+
+            self._set_encoding_headers(headers)
+            headers["Content-Length"] = str(len(compressed))
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.streamer is None:
+            self.streamer = StreamCompressor(self.encoding)
+            self._set_encoding_headers(headers)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.downstream(self.start_message)
+
+        data = self.streamer.chunk(body) if body else b""
+        if not more_body:
+            data += self.streamer.finish()
+        await self.downstream({
+            "type": "http.response.body",
+            "body": data,
+            "more_body": more_body,
+        })
+
+    def _set_encoding_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The encoded bytes differ from the identity representation
+            headers["ETag"] = f"W/{etag}"
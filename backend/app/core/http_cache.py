@@ -0,0 +1,103 @@
+"""
+HTTP Caching Helpers (ETag / conditional GET)
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response, status
+
+# Cache-Control policy per resource type
+CACHE_CONTROL: Dict[str, str] = {
+    "product": "public, max-age=60, must-revalidate",
+    "product_list": "public, max-age=30, must-revalidate",
+    "category_list": "public, max-age=3600, must-revalidate",
+    "review_list": "public, max-age=60, must-revalidate",
+}
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """
+    Build an ETag from cheap version markers (ids, watermarks, counts, filters)
+    """
+    digest = hashlib.sha1(
+        "|".join("" if part is None else str(part) for part in parts).encode()
+    ).hexdigest()
+    tag = f'"{digest}"'
+    return f"W/{tag}" if weak else tag
+
+
+def _opaque(tag: str) -> str:
+    """Strip the weak prefix for weak comparison"""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check ``If-None-Match`` against an ETag (weak comparison, RFC 9110 13.1.2)
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = _opaque(etag)
+    return any(_opaque(candidate) == target for candidate in header.split(","))
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    """
+    Format a naive UTC datetime as an HTTP date
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.replace(microsecond=0), usegmt=True)
+
+
+def cache_headers(
+    etag: str,
+    resource: str,
+    last_modified: Optional[datetime] = None
+) -> Dict[str, str]:
+    """
+    Validator and freshness headers for a resource type
+    """
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL[resource],
+    }
+    modified = http_date(last_modified)
+    if modified:
+        headers["Last-Modified"] = modified
+    return headers
+
+
+def set_cache_headers(
+    response: Response,
+    etag: str,
+    resource: str,
+    last_modified: Optional[datetime] = None
+) -> Response:
+    """
+    Attach validator and freshness headers to a response
+    """
+    response.headers.update(cache_headers(etag, resource, last_modified))
+    return response
+
+
+def not_modified(
+    etag: str,
+    resource: str,
+    last_modified: Optional[datetime] = None
+) -> Response:
+    """
+    Empty ``304 Not Modified`` response carrying the same validators
+    """
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(etag, resource, last_modified),
+    )
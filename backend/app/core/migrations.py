@@ -0,0 +1,54 @@
+"""
+Schema Helpers for Alembic Revisions
+
+``create_all`` on startup creates missing tables with their current
+columns and indexes, but never alters a table that already exists. The
+revisions add those changes to older databases. Every helper checks the
+live schema first, so a revision is a no-op where ``create_all`` already
+did the work.
+"""
+from typing import List
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def _inspector() -> sa.engine.reflection.Inspector:
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table: str) -> bool:
+    return _inspector().has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return has_table(table) and column in {c["name"] for c in _inspector().get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    return has_table(table) and name in {i["name"] for i in _inspector().get_indexes(table)}
+
+
+def create_table(table: sa.Table) -> None:
+    """Create a model's table (with its indexes) if it is missing"""
+    table.create(op.get_bind(), checkfirst=True)
+
+
+def add_column(table: str, column: sa.Column) -> None:
+    if has_table(table) and not has_column(table, column.name):
+        op.add_column(table, column)
+
+
+def drop_column(table: str, column: str) -> None:
+    if has_column(table, column):
+        op.drop_column(table, column)
+
+
+def create_index(name: str, table: str, columns: List[str], unique: bool = False) -> None:
+    if has_table(table) and not has_index(table, name):
+        op.create_index(name, table, columns, unique=unique)
+
+
+def drop_index(name: str, table: str) -> None:
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
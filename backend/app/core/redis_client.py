@@ -37,12 +37,13 @@ class RedisClient:
         self,
         key: str,
         value: str,
-        expire: Optional[int] = None
+        expire: Optional[int] = None,
+        nx: bool = False
     ) -> bool:
-        """Set value in Redis with optional expiration"""
+        """Set value in Redis with optional expiration (only if absent with nx)"""
         if not self.redis:
             return False
-        return await self.redis.set(key, value, ex=expire)
+        return bool(await self.redis.set(key, value, ex=expire, nx=nx))
     
     async def delete(self, key: str) -> bool:
         """Delete key from Redis"""
@@ -56,6 +57,30 @@ class RedisClient:
             return False
         return await self.redis.exists(key) > 0
     
+    async def expire(self, key: str, seconds: int) -> bool:
+        """Set a key's time to live"""
+        if not self.redis:
+            return False
+        return await self.redis.expire(key, seconds)
+    
+    async def sadd(self, key: str, *values: str) -> int:
+        """Add members to a set"""
+        if not self.redis:
+            return 0
+        return await self.redis.sadd(key, *values)
+    
+    async def smembers(self, key: str) -> set:
+        """Get all members of a set"""
+        if not self.redis:
+            return set()
+        return await self.redis.smembers(key)
+    
+    async def scard(self, key: str) -> int:
+        """Get the number of members in a set"""
+        if not self.redis:
+            return 0
+        return await self.redis.scard(key)
+    
     async def get_json(self, key: str) -> Optional[dict]:
         """Get JSON value from Redis"""
         value = await self.get(key)
@@ -79,6 +104,22 @@ class RedisClient:
         except (TypeError, json.JSONEncodeError):
             return False
     
+    async def rpush(self, key: str, *values: str) -> int:
+        """Append values to a list"""
+        if not self.redis:
+            return 0
+        return await self.redis.rpush(key, *values)
+    
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        """Delete key only while it still holds value (releasing a lock we own)"""
+        if not self.redis:
+            return False
+        return bool(await self.redis.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then "
+            "return redis.call('del', KEYS[1]) else return 0 end",
+            1, key, value
+        ))
+    
     async def increment(self, key: str) -> int:
         """Increment value in Redis"""
         if not self.redis:
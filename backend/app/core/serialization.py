@@ -0,0 +1,119 @@
+"""
+Fast Serialization for Large List Responses
+"""
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type, Union, get_args, get_origin
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import load_only
+from sqlalchemy.inspection import inspect as sa_inspect
+
+# Annotations whose ORM values are already JSON-ready and need no re-validation
+TRUSTED_TYPES = (int, float, str, bool, datetime, date)
+
+
+def _is_trusted(annotation: Any) -> bool:
+    """Check whether a field annotation can be copied straight from the ORM row"""
+    if annotation in TRUSTED_TYPES:
+        return True
+    if get_origin(annotation) is Union:
+        return all(
+            arg is type(None) or arg in TRUSTED_TYPES
+            for arg in get_args(annotation)
+        )
+    return False
+
+
+def _plain(value: Any) -> Any:
+    """Unwrap enum members the way Pydantic does for ``str`` fields"""
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _cached_converter(annotation: Any) -> Callable[[Any], Any]:
+    """
+    Build a converter for non-trivial fields (HttpUrl, EmailStr, enums).
+
+    Values such as URLs repeat across rows and pages, so the validated JSON form
+    is memoized per distinct input instead of being re-validated for every row.
+    """
+    adapter = TypeAdapter(annotation)
+
+    @lru_cache(maxsize=4096)
+    def convert(value: Any) -> Any:
+        return adapter.dump_python(adapter.validate_python(value), mode="json")
+
+    def converter(value: Any) -> Any:
+        if value is None:
+            return None
+        try:
+            return convert(value)
+        except TypeError:
+            # Unhashable input, fall back to an uncached conversion
+            return adapter.dump_python(adapter.validate_python(value), mode="json")
+
+    return converter
+
+
+class FastSerializer:
+    """
+    Serialize trusted ORM rows against a response schema without building
+    Pydantic models, producing the same JSON as ``response_model`` would.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields: List[str] = list(schema.model_fields)
+        self.converters: Dict[str, Optional[Callable[[Any], Any]]] = {}
+        for name, field in schema.model_fields.items():
+            if _is_trusted(field.annotation):
+                self.converters[name] = None
+            else:
+                self.converters[name] = _cached_converter(field.annotation)
+
+    def load_options(self, model: Any):
+        """
+        Query option restricting the SELECT to the columns the schema needs
+        """
+        mapper = sa_inspect(model)
+        columns = [
+            getattr(model, name)
+            for name in self.fields
+            if name in mapper.column_attrs
+        ]
+        return load_only(*columns)
+
+    def dump_row(self, row: Any) -> Dict[str, Any]:
+        """Convert a single ORM row to a JSON-ready dict"""
+        data = {}
+        for name, converter in self.converters.items():
+            value = getattr(row, name, None)
+            if converter is None:
+                data[name] = _plain(value)
+            else:
+                data[name] = converter(value)
+        return data
+
+    def dump_rows(self, rows: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Convert ORM rows to a list of JSON-ready dicts"""
+        dump_row = self.dump_row
+        return [dump_row(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_serializer(schema: Type[BaseModel]) -> FastSerializer:
+    """
+    Get the shared serializer for a response schema
+    """
+    return FastSerializer(schema)
+
+
+def fast_json_response(content: Any, status_code: int = 200) -> ORJSONResponse:
+    """
+    Encode already serialized content with orjson
+    """
+    return ORJSONResponse(content=content, status_code=status_code)
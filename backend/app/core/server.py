@@ -0,0 +1,105 @@
+"""
+Production Server Sizing and Worker Health
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+# Set when the module is imported inside a worker process
+WORKER_STARTED_AT = time.time()
+
+
+@dataclass
+class WorkerPlan:
+    """Process and connection-pool sizing for the pre-fork server"""
+    workers: int
+    pool_size: int
+    max_overflow: int
+    celery_connections: int = 0
+
+    @property
+    def connections_per_worker(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    @property
+    def total_connections(self) -> int:
+        return self.workers * self.connections_per_worker
+
+    @property
+    def peak_connections(self) -> int:
+        """
+        Worst case against the database: during a HUP reload the new web
+        workers start before the old ones drain, plus every Celery process
+        """
+        return 2 * self.total_connections + self.celery_connections
+
+
+def celery_connections(
+    concurrency: int = settings.CELERY_WORKER_CONCURRENCY,
+    pool_size: int = settings.CELERY_DB_POOL_SIZE,
+    max_overflow: int = settings.CELERY_DB_MAX_OVERFLOW,
+) -> int:
+    """Connections the Celery worker's child processes can hold (beat opens none)"""
+    return concurrency * (pool_size + max_overflow)
+
+
+def plan_workers(
+    cpu_count: Optional[int] = None,
+    requested_workers: int = settings.WEB_WORKERS,
+    pool_size: int = settings.DB_POOL_SIZE,
+    max_overflow: int = settings.DB_MAX_OVERFLOW,
+    connection_budget: int = settings.DB_CONNECTION_BUDGET,
+    reserved_connections: Optional[int] = None,
+) -> WorkerPlan:
+    """
+    Size the worker count from CPU count, then clamp it (and if needed the
+    per-process pool) so ``peak_connections`` never exceeds the global DB
+    connection budget. The Celery workers' connections are reserved first;
+    the web tier gets half of the rest because two generations of workers
+    overlap during a reload.
+    """
+    if reserved_connections is None:
+        reserved_connections = celery_connections()
+    cpu_count = cpu_count or os.cpu_count() or 1
+    workers = requested_workers if requested_workers > 0 else cpu_count * 2 + 1
+    web_budget = max(connection_budget - reserved_connections, 2) // 2
+
+    per_worker = pool_size + max_overflow
+    if per_worker > 0:
+        workers = min(workers, max(web_budget // per_worker, 1))
+
+    if workers * per_worker > web_budget:
+        # Even one worker with the configured pool is over budget: shrink the pool
+        pool_size = min(pool_size, max(web_budget, 1))
+        max_overflow = max(web_budget - pool_size, 0)
+
+    return WorkerPlan(
+        workers=workers,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        celery_connections=reserved_connections,
+    )
+
+
+def worker_health() -> dict:
+    """
+    Health snapshot for the current worker process
+    """
+    from app.core.database import engine
+
+    pool = engine.pool
+    health = {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - WORKER_STARTED_AT, 1),
+    }
+    if hasattr(pool, "checkedout"):
+        health["db_pool"] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+        }
+    return health
@@ -0,0 +1,326 @@
+"""
+Object Storage Backends (local disk and S3-compatible)
+"""
+import io
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import quote
+
+from app.core.config import settings
+
+# RFC 5987 attr-char: sent as is in ``filename*``, everything else is percent-encoded
+ATTR_CHARS = "!#$&+-.^_`|~"
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """
+    ``Content-Disposition`` value for any file name: an ASCII ``filename``
+    fallback (accents stripped, anything else non-ASCII or unsafe replaced) plus
+    the exact name as RFC 5987 ``filename*``. Headers are latin-1 encoded,
+    so the raw name can't be sent.
+    """
+    name = os.path.basename(filename.replace("\\", "/"))
+    fallback = "".join(
+        char for char in unicodedata.normalize("NFKD", name.replace("đ", "d").replace("Đ", "D"))
+        if not unicodedata.combining(char)
+    )
+    fallback = re.sub(r"[^A-Za-z0-9 ._()\[\]-]", "_", fallback).strip() or "download"
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe=ATTR_CHARS)}"
+
+
+class LocalStorage:
+    """
+    Objects stored as files under ``root``, keyed by their relative path.
+
+    Staging files live in the same directory tree, so ``put_file`` is an
+    atomic rename and objects can be sent with zero-copy I/O.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.realpath(root or settings.UPLOAD_DIR)
+
+    @property
+    def staging_dir(self) -> str:
+        return self.root
+
+    def local_path(self, key: str) -> str:
+        """Filesystem path of a key, confined to the storage root"""
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Key escapes the storage root: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.local_path(key))
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.local_path(key))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.local_path(key))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def touch(self, key: str) -> None:
+        os.utime(self.local_path(key))
+
+    def put_file(self, source_path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Store a local file under ``key``; the source file is consumed"""
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+
+    def get_file(self, key: str, dest_path: str) -> None:
+        shutil.copyfile(self.local_path(key), dest_path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), "rb")
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix: str) -> None:
+        shutil.rmtree(self.local_path(prefix.rstrip("/")), ignore_errors=True)
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        base = self.local_path(prefix.rstrip("/")) if prefix else self.root
+        for directory, _, files in os.walk(base):
+            for name in files:
+                yield os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+
+    def presigned_url(self, key: str, **kwargs) -> Optional[str]:
+        return None
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable read-only view of an S3 object backed by ranged GETs, so zip
+    directories and file headers can be read without fetching whole objects
+    """
+
+    def __init__(self, storage: "S3Storage", key: str, size: int):
+        self.storage = storage
+        self.key = key
+        self.length = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.length
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.length:
+            return 0
+        end = min(self.position + len(buffer), self.length) - 1
+        response = self.storage.client.get_object(
+            Bucket=self.storage.bucket,
+            Key=self.key,
+            Range=f"bytes={self.position}-{end}",
+        )
+        data = response["Body"].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+# Object headers a REPLACE copy would reset unless passed again
+REPLACED_HEADERS = ("ContentType", "ContentDisposition", "ContentEncoding", "ContentLanguage", "CacheControl")
+
+
+class S3Storage:
+    """
+    Objects stored in an S3-compatible bucket (AWS, MinIO, ...).
+
+    One boto3 client per process keeps a pool of HTTP connections alive.
+    Transfers go through s3transfer: objects above the multipart threshold
+    are uploaded and downloaded as parts over several connections at once.
+    Clients fetch objects directly through presigned URLs.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        staging_dir: Optional[str] = None
+    ):
+        self.bucket = bucket or settings.AWS_S3_BUCKET_NAME
+        self.endpoint_url = endpoint_url or settings.AWS_S3_ENDPOINT_URL or None
+        self._staging_dir = staging_dir or settings.UPLOAD_DIR
+        self._client = None
+        self._client_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def staging_dir(self) -> str:
+        return self._staging_dir
+
+    @property
+    def client(self):
+        """boto3 client, recreated after a fork (connections can't be shared)"""
+        if self._client is None or self._client_pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._client_pid != os.getpid():
+                    import boto3
+                    from botocore.config import Config
+
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        region_name=settings.AWS_REGION,
+                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
+                        config=Config(
+                            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                            retries={"max_attempts": 5, "mode": "standard"},
+                            s3={"addressing_style": "path" if self.endpoint_url else "auto"},
+                        ),
+                    )
+                    self._client_pid = os.getpid()
+        return self._client
+
+    @property
+    def transfer_config(self):
+        from boto3.s3.transfer import TransferConfig
+
+        return TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE,
+            max_concurrency=settings.S3_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> Optional[int]:
+        head = self._head(key)
+        return head["ContentLength"] if head else None
+
+    def modified_at(self, key: str) -> Optional[float]:
+        head = self._head(key)
+        return head["LastModified"].timestamp() if head else None
+
+    def touch(self, key: str) -> None:
+        """
+        Refresh LastModified by copying the object onto itself. S3 only allows
+        that with REPLACE, which drops every header not sent again, so the
+        stored ones are carried over.
+        """
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        headers = {name: head[name] for name in REPLACED_HEADERS if head.get(name)}
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=key,
+            CopySource={"Bucket": self.bucket, "Key": key},
+            MetadataDirective="REPLACE",
+            Metadata={**head.get("Metadata", {}), "touched": str(int(time.time()))},
+            **headers,
+        )
+
+    def put_file(self, source_path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Upload a local file under ``key``; the source file is consumed"""
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(
+            source_path, self.bucket, key, ExtraArgs=extra, Config=self.transfer_config
+        )
+        os.remove(source_path)
+
+    def get_file(self, key: str, dest_path: str) -> None:
+        self.client.download_file(self.bucket, key, dest_path, Config=self.transfer_config)
+
+    def open(self, key: str) -> BinaryIO:
+        size = self.size(key)
+        if size is None:
+            raise FileNotFoundError(key)
+        return io.BufferedReader(
+            S3RangeReader(self, key, size), buffer_size=settings.S3_MULTIPART_CHUNK_SIZE
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        batch = []
+        for key in self.iter_keys(prefix):
+            batch.append({"Key": key})
+            if len(batch) == 1000:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch})
+                batch = []
+        if batch:
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch})
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"]
+
+    def presigned_url(
+        self,
+        key: str,
+        expires: int = settings.S3_PRESIGNED_URL_TTL,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> str:
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename)
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+
+
+def create_storage():
+    """
+    Backend selected by STORAGE_BACKEND
+    """
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage()
+    return LocalStorage()
+
+
+storage = create_storage()
@@ -0,0 +1,78 @@
+"""
+Streaming Response Helpers (Server-Sent Events and NDJSON)
+"""
+import asyncio
+from typing import AsyncIterator, Optional
+
+import anyio
+import orjson
+
+# Headers that keep proxies (nginx) and caches from buffering a stream
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache, no-transform",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> bytes:
+    """One Server-Sent Event with a JSON payload"""
+    head = f"event: {event}\n".encode() if event else b""
+    return head + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+def ndjson_line(data: dict) -> bytes:
+    return orjson.dumps(data) + b"\n"
+
+
+async def with_keepalive(
+    events: AsyncIterator[dict],
+    interval: float
+) -> AsyncIterator[Optional[dict]]:
+    """
+    Re-yield ``events``, yielding None whenever nothing arrived for
+    ``interval`` seconds so idle connections are not dropped by proxies.
+
+    The source is closed when the consumer stops (client disconnect), which
+    lets it cancel whatever upstream work is still running.
+    """
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield None
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            yield item
+    finally:
+        with anyio.CancelScope(shield=True):
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            await events.aclose()
+
+
+async def sse_stream(events: AsyncIterator[dict], keepalive: float) -> AsyncIterator[bytes]:
+    """
+    Encode events as Server-Sent Events; each event's "event" key names it
+    """
+    async for item in with_keepalive(events, keepalive):
+        if item is None:
+            yield b": keepalive\n\n"
+        else:
+            yield sse_event(item, item.get("event"))
+
+
+async def ndjson_stream(events: AsyncIterator[dict], keepalive: float) -> AsyncIterator[bytes]:
+    """
+    Encode events as newline-delimited JSON
+    """
+    async for item in with_keepalive(events, keepalive):
+        yield ndjson_line({"event": "ping"} if item is None else item)
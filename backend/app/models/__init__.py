@@ -3,8 +3,10 @@ Database Models
 """
 from app.models.user import User, UserRole
 from app.models.product import Product, ProductCategory, ProductImage, ProductFile
-from app.models.transaction import Transaction, TransactionStatus, PaymentMethod
-from app.models.review import Review, ReviewReport
+from app.models.transaction import Transaction, TransactionArchive, TransactionStatus, PaymentMethod
+from app.models.review import Review, ReviewReport, ReviewVote
+from app.models.analytics import SalesRollup
+from app.models.currency import FxRate
 
 __all__ = [
     "User",
@@ -14,8 +16,12 @@ __all__ = [
     "ProductImage",
     "ProductFile",
     "Transaction",
+    "TransactionArchive",
     "TransactionStatus",
     "PaymentMethod",
     "Review",
-    "ReviewReport"
+    "ReviewReport",
+    "ReviewVote",
+    "SalesRollup",
+    "FxRate"
 ]
@@ -0,0 +1,27 @@
+"""
+Analytics Models
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime
+
+from app.core.database import Base
+
+
+class SalesRollup(Base):
+    """
+    Completed sales of a seller aggregated per time bucket. Rows with
+    ``product_id`` 0 hold the seller's totals across all products.
+    """
+    __tablename__ = "sales_rollups"
+
+    granularity = Column(String(5), primary_key=True)  # hour / day / month
+    seller_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # UTC start of the bucket
+
+    units = Column(Integer, nullable=False, default=0)
+    gross = Column(Float, nullable=False, default=0.0)
+    commission = Column(Float, nullable=False, default=0.0)
+    net = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<SalesRollup {self.granularity} {self.seller_id}/{self.product_id} {self.bucket}>"
@@ -0,0 +1,19 @@
+"""
+Currency Models
+"""
+from sqlalchemy import Column, String, Float, DateTime
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class FxRate(Base):
+    """Units of ``currency`` per one unit of the base currency"""
+    __tablename__ = "fx_rates"
+
+    currency = Column(String(3), primary_key=True)
+    rate = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FxRate {self.currency} {self.rate}>"
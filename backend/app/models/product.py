@@ -1,7 +1,7 @@
 """
 Product Model
 """
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -41,6 +41,10 @@ class ProductCategory(Base):
 class Product(Base):
     """Product model"""
     __tablename__ = "products"
+    __table_args__ = (
+        # Price range filters and price sorting across currencies
+        Index("ix_products_base_price", "base_price"),
+    )
     
     # Basic Information
     id = Column(Integer, primary_key=True, index=True)
@@ -53,6 +57,7 @@ class Product(Base):
     price = Column(Float, nullable=False)
     discount_price = Column(Float)
     currency = Column(String(3), default="USD")
+    base_price = Column(Float)  # price in BASE_CURRENCY; NULL while the rate is unknown
     
     # Technical Details
     programming_language = Column(String(50))
@@ -62,6 +67,7 @@ class Product(Base):
     responsive = Column(Boolean, default=True)
     
     # Files and Media
+    thumbnail_url = Column(String(500))  # card-sized derivative of the primary image
     demo_url = Column(String(500))
     video_url = Column(String(500))
     documentation_url = Column(String(500))
@@ -128,6 +134,7 @@ class ProductImage(Base):
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     image_url = Column(String(500), nullable=False)
     thumbnail_url = Column(String(500))
+    checksum = Column(String(64), index=True)  # source image blob (SHA-256)
     caption = Column(String(255))
     is_primary = Column(Boolean, default=False)
     order = Column(Integer, default=0)
@@ -149,7 +156,7 @@ class ProductFile(Base):
     file_url = Column(String(500), nullable=False)
     file_size = Column(Integer)  # in bytes
     file_type = Column(String(50))
-    checksum = Column(String(64))  # SHA256 hash
+    checksum = Column(String(64), index=True)  # SHA256 hash, also the blob store key
     is_main = Column(Boolean, default=False)
     
     # Timestamps
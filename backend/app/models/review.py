@@ -1,7 +1,7 @@
 """
 Review Model
 """
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -11,6 +11,12 @@ from app.core.database import Base
 class Review(Base):
     """Review model"""
     __tablename__ = "reviews"
+    __table_args__ = (
+        # One index per listing sort mode
+        Index("ix_reviews_product_created", "product_id", "created_at"),
+        Index("ix_reviews_product_rating", "product_id", "rating", "created_at"),
+        Index("ix_reviews_product_helpful", "product_id", "helpful_score", "created_at"),
+    )
     
     # Basic Information
     id = Column(Integer, primary_key=True, index=True)
@@ -23,6 +29,7 @@ class Review(Base):
     is_featured = Column(Boolean, default=False)
     helpful_count = Column(Integer, default=0)
     not_helpful_count = Column(Integer, default=0)
+    helpful_score = Column(Float, default=0.0)  # Wilson lower bound of the helpful share
     
     # Foreign Keys
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -42,6 +49,19 @@ class Review(Base):
         return f"<Review {self.id} - Rating: {self.rating}>"
 
 
+class ReviewVote(Base):
+    """One user's helpful / not helpful vote on a review"""
+    __tablename__ = "review_votes"
+
+    review_id = Column(Integer, ForeignKey("reviews.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    helpful = Column(Boolean, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class ReviewReport(Base):
     """Review report model for handling inappropriate reviews"""
     __tablename__ = "review_reports"
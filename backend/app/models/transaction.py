@@ -1,7 +1,7 @@
 """
 Transaction Model
 """
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -28,9 +28,8 @@ class PaymentMethod(str, enum.Enum):
     FREE = "free"
 
 
-class Transaction(Base):
-    """Transaction model"""
-    __tablename__ = "transactions"
+class TransactionColumns:
+    """Columns shared by live and archived transactions"""
     
     # Basic Information
     id = Column(Integer, primary_key=True, index=True)
@@ -57,16 +56,28 @@ class Transaction(Base):
     max_downloads = Column(Integer, default=5)
     download_expiry = Column(DateTime)
     
-    # Foreign Keys
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
-    buyer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    seller_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime)
     refunded_at = Column(DateTime)
+
+
+class Transaction(TransactionColumns, Base):
+    """Transaction model"""
+    __tablename__ = "transactions"
+    __table_args__ = (
+        # Pending/completed purchase lookups of a buyer for a product
+        Index("ix_transactions_buyer_product_status", "buyer_id", "product_id", "status"),
+        # Purchase and sales histories, newest first
+        Index("ix_transactions_buyer_created", "buyer_id", "created_at"),
+        Index("ix_transactions_seller_created", "seller_id", "created_at"),
+    )
+    
+    # Foreign Keys
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    buyer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    seller_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Relationships
     product = relationship("Product", back_populates="transactions")
@@ -75,3 +86,26 @@ class Transaction(Base):
     
     def __repr__(self):
         return f"<Transaction {self.transaction_id}>"
+
+
+class TransactionArchive(TransactionColumns, Base):
+    """
+    Settled transactions moved out of ``transactions`` once older than
+    ``TRANSACTION_ARCHIVE_AFTER_DAYS`` (same ids; no foreign keys so users and products
+    stay free to change)
+    """
+    __tablename__ = "transactions_archive"
+    __table_args__ = (
+        Index("ix_transactions_archive_buyer_created", "buyer_id", "created_at"),
+        Index("ix_transactions_archive_seller_created", "seller_id", "created_at"),
+        Index("ix_transactions_archive_buyer_product", "buyer_id", "product_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    product_id = Column(Integer, nullable=False)
+    buyer_id = Column(Integer, nullable=False)
+    seller_id = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<TransactionArchive {self.transaction_id}>"
@@ -64,7 +64,6 @@ class User(Base):
     purchases = relationship("Transaction", foreign_keys="Transaction.buyer_id", back_populates="buyer")
     sales = relationship("Transaction", foreign_keys="Transaction.seller_id", back_populates="seller")
     reviews_given = relationship("Review", foreign_keys="Review.reviewer_id", back_populates="reviewer")
-    reviews_received = relationship("Review", foreign_keys="Review.product_id", back_populates="product")
     
     def __repr__(self):
         return f"<User {self.username}>"
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, HttpUrl
 
 
@@ -20,6 +20,7 @@ class ProductBase(BaseModel):
     currency: str
     rating: Optional[float] = 0.0
     total_reviews: Optional[int] = 0
+    thumbnail_url: Optional[str] = None
     demo_url: Optional[HttpUrl] = None
     video_url: Optional[HttpUrl] = None
     created_at: datetime
@@ -46,13 +47,49 @@ class ProductCreate(BaseModel):
     category_id: Optional[int] = None
 
 
+class ProductListItem(ProductBase):
+    base_price: Optional[float] = None  # price in the base currency
+    display_price: Optional[float] = None  # price in the requested display currency
+    display_currency: Optional[str] = None
+
+
 class ProductListResponse(BaseModel):
-    items: List[ProductBase]
+    items: List[ProductListItem]
     total: int
     page: int
     page_size: int
 
 
+class ArchiveEntry(BaseModel):
+    path: str
+    size: int
+    language: Optional[str] = None
+
+
+class LanguageStats(BaseModel):
+    files: int
+    size: int
+    loc: int
+
+
+class ArchiveManifest(BaseModel):
+    file_id: int
+    file_name: str
+    format: str
+    files: List[ArchiveEntry]
+    total_files: int
+    total_size: int
+    estimated_loc: int
+    languages: Dict[str, LanguageStats]
+    truncated: bool = False
+    error: Optional[str] = None
+
+
+class ProductManifestResponse(BaseModel):
+    product_id: int
+    items: List[ArchiveManifest]
+
+
 class CategoryListResponse(BaseModel):
     items: List[CategoryBase]
     total: int
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -10,7 +10,29 @@ class ReviewBase(BaseModel):
     comment: str
     product_id: int
     reviewer_id: int
+    is_verified_purchase: Optional[bool] = False
+    helpful_count: Optional[int] = 0
+    not_helpful_count: Optional[int] = 0
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ReviewListResponse(BaseModel):
+    items: List[ReviewBase]
+    total: int
+    page: int
+    page_size: int
+    sort: str
+
+
+class ReviewVoteRequest(BaseModel):
+    helpful: bool
+
+
+class ReviewVoteResponse(BaseModel):
+    review_id: int
+    helpful_count: int
+    not_helpful_count: int
+    helpful_score: float
@@ -30,7 +30,3 @@ class PaymentInitResponse(BaseModel):
     transaction_id: str
     payment_url: str
 
-
-class PaymentVerifyRequest(BaseModel):
-    transaction_id: str
-    status: str
@@ -0,0 +1,245 @@
+"""
+Admin Metrics: counters and time series for the admin dashboard, kept in Redis
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.models.analytics import SalesRollup
+from app.models.product import Product
+from app.models.transaction import Transaction, TransactionArchive
+from app.models.user import User
+from app.services.sales_analytics import ALL_PRODUCTS, DAY, HOUR, floor_bucket
+
+TOTALS_KEY = "metrics:totals"
+BREAKDOWN_KEY = "metrics:{}:by_{}"  # e.g. metrics:transactions:by_status
+SERIES_KEY = "metrics:series:{}:{}"  # metric, granularity -> {bucket: value}
+
+USERS_BY_ROLE = BREAKDOWN_KEY.format("users", "role")
+PRODUCTS_BY_STATUS = BREAKDOWN_KEY.format("products", "status")
+TRANSACTIONS_BY_STATUS = BREAKDOWN_KEY.format("transactions", "status")
+
+SIGNUPS = "signups"
+SALES = "sales"
+REVENUE = "revenue"
+SERIES = (SIGNUPS, SALES, REVENUE)
+
+BUCKET_FORMAT = {HOUR: "%Y-%m-%dT%H:00", DAY: "%Y-%m-%d"}
+RETENTION = {HOUR: timedelta(days=7), DAY: timedelta(days=90)}
+
+
+def _value(raw) -> str:
+    """Enum members are counted under their value"""
+    return getattr(raw, "value", raw)
+
+
+def bucket_field(moment: datetime, granularity: str) -> str:
+    return floor_bucket(moment, granularity).strftime(BUCKET_FORMAT[granularity])
+
+
+class MetricChanges:
+    """
+    Counter and series increments collected while handling a request or a
+    batch, written to Redis in one pipeline round trip by ``flush``.
+    Recording methods return the instance so calls can be chained.
+    """
+
+    def __init__(self):
+        self.counters: Dict[tuple, float] = defaultdict(int)
+
+    def _add(self, key: str, field: str, amount: float = 1) -> None:
+        self.counters[(key, field)] += amount
+
+    def _add_series(self, metric: str, moment: datetime, amount: float = 1) -> None:
+        for granularity in BUCKET_FORMAT:
+            self._add(SERIES_KEY.format(metric, granularity), bucket_field(moment, granularity), amount)
+
+    def user_created(self, user: User) -> "MetricChanges":
+        self._add(TOTALS_KEY, "users")
+        self._add(USERS_BY_ROLE, _value(user.role))
+        self._add_series(SIGNUPS, user.created_at or datetime.utcnow())
+        return self
+
+    def product_created(self, product: Product) -> "MetricChanges":
+        self._add(TOTALS_KEY, "products")
+        self._add(PRODUCTS_BY_STATUS, _value(product.status))
+        return self
+
+    def transaction_created(self, transaction: Transaction) -> "MetricChanges":
+        self._add(TOTALS_KEY, "transactions")
+        self._add(TRANSACTIONS_BY_STATUS, _value(transaction.status))
+        return self
+
+    def transaction_moved(self, old_status, new_status) -> "MetricChanges":
+        self._add(TRANSACTIONS_BY_STATUS, _value(old_status), -1)
+        self._add(TRANSACTIONS_BY_STATUS, _value(new_status))
+        return self
+
+    def sale_completed(self, moment: datetime, amount: float) -> "MetricChanges":
+        self._add_series(SALES, moment)
+        self._add_series(REVENUE, moment, float(amount or 0.0))
+        return self
+
+    def _queue(self, pipe) -> None:
+        for (key, field), amount in sorted(self.counters.items()):
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(key, field, amount)
+            else:
+                pipe.hincrby(key, field, amount)
+        self.counters.clear()
+
+    def flush(self, redis_conn) -> None:
+        """Write the changes with a synchronous Redis client (workers)"""
+        if self.counters:
+            pipe = redis_conn.pipeline(transaction=False)
+            self._queue(pipe)
+            pipe.execute()
+
+    async def flush_async(self) -> None:
+        """Write the changes with the application's Redis client"""
+        if self.counters and redis_client.redis is not None:
+            pipe = redis_client.redis.pipeline(transaction=False)
+            self._queue(pipe)
+            await pipe.execute()
+
+
+def _breakdown(db: Session, column) -> Dict[str, int]:
+    return {_value(key): count for key, count in db.query(column, func.count()).group_by(column) if key is not None}
+
+
+def reconcile(db: Session, redis_conn) -> Dict[str, int]:
+    """
+    Recompute every counter and the retained part of each series from the
+    database and replace what Redis holds. Increments landing between the
+    queries and the write are lost until the next run, which keeps drift
+    bounded to one reconciliation interval.
+    """
+    now = datetime.utcnow()
+    users = _breakdown(db, User.role)
+    products = _breakdown(db, Product.status)
+    transactions = _breakdown(db, Transaction.status)
+    for key, count in _breakdown(db, TransactionArchive.status).items():
+        transactions[key] = transactions.get(key, 0) + count
+
+    series: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    signups_since = floor_bucket(now - RETENTION[DAY], DAY)
+    for (created_at,) in (
+        db.query(User.created_at)
+        .filter(User.created_at >= signups_since)
+        .yield_per(settings.ANALYTICS_READ_BATCH)
+    ):
+        for granularity in BUCKET_FORMAT:
+            series[SERIES_KEY.format(SIGNUPS, granularity)][bucket_field(created_at, granularity)] += 1
+
+    # Sales come from the seller rollups, summed across sellers per bucket
+    for granularity in BUCKET_FORMAT:
+        since = floor_bucket(now - RETENTION[granularity], granularity)
+        rows = (
+            db.query(SalesRollup.bucket, func.sum(SalesRollup.units), func.sum(SalesRollup.gross))
+            .filter(
+                SalesRollup.granularity == granularity,
+                SalesRollup.product_id == ALL_PRODUCTS,
+                SalesRollup.bucket >= since,
+            )
+            .group_by(SalesRollup.bucket)
+        )
+        for bucket, units, gross in rows:
+            field = bucket.strftime(BUCKET_FORMAT[granularity])
+            series[SERIES_KEY.format(SALES, granularity)][field] = int(units)
+            series[SERIES_KEY.format(REVENUE, granularity)][field] = round(gross, 2)
+
+    pipe = redis_conn.pipeline(transaction=True)
+    pipe.delete(TOTALS_KEY, USERS_BY_ROLE, PRODUCTS_BY_STATUS, TRANSACTIONS_BY_STATUS)
+    pipe.hset(TOTALS_KEY, mapping={
+        "users": sum(users.values()),
+        "products": sum(products.values()),
+        "transactions": sum(transactions.values()),
+        "reconciled_at": now.isoformat(),
+    })
+    for key, counts in ((USERS_BY_ROLE, users), (PRODUCTS_BY_STATUS, products), (TRANSACTIONS_BY_STATUS, transactions)):
+        if counts:
+            pipe.hset(key, mapping=counts)
+    for metric in SERIES:
+        for granularity in BUCKET_FORMAT:
+            key = SERIES_KEY.format(metric, granularity)
+            pipe.delete(key)
+            if series[key]:
+                pipe.hset(key, mapping=dict(series[key]))
+    pipe.execute()
+    return {"users": sum(users.values()), "products": sum(products.values()), "transactions": sum(transactions.values())}
+
+
+def _fields(now: datetime, granularity: str, count: int) -> List[str]:
+    """The last ``count`` bucket fields up to and including the current one"""
+    step = timedelta(hours=1) if granularity == HOUR else timedelta(days=1)
+    return [bucket_field(now - step * offset, granularity) for offset in range(count - 1, -1, -1)]
+
+
+def _number(raw) -> float:
+    if raw is None:
+        return 0
+    value = float(raw)
+    return int(value) if value.is_integer() else round(value, 2)
+
+
+def _counts(raw: Dict[str, str]) -> Dict[str, float]:
+    return {key: _number(value) for key, value in raw.items() if _number(value)}
+
+
+def _trend(current: float, previous: float) -> dict:
+    change = None
+    if previous:
+        change = round((current - previous) / previous * 100, 1)
+    return {"current": current, "previous": previous, "change_percent": change}
+
+
+async def dashboard(now: Optional[datetime] = None) -> Optional[dict]:
+    """
+    Totals, breakdowns, the last 24 hours and 30 days of each series and
+    week-over-week trends, from a fixed number of Redis reads. None when
+    the counters are missing (not reconciled yet, or Redis unavailable).
+    """
+    if redis_client.redis is None:
+        return None
+    now = now or datetime.utcnow()
+    hours = _fields(now, HOUR, 24)
+    days = _fields(now, DAY, 30)
+
+    pipe = redis_client.redis.pipeline(transaction=False)
+    pipe.hgetall(TOTALS_KEY)
+    pipe.hgetall(USERS_BY_ROLE)
+    pipe.hgetall(PRODUCTS_BY_STATUS)
+    pipe.hgetall(TRANSACTIONS_BY_STATUS)
+    for metric in SERIES:
+        pipe.hmget(SERIES_KEY.format(metric, HOUR), hours)
+        pipe.hmget(SERIES_KEY.format(metric, DAY), days)
+    totals, users, products, transactions, *series = await pipe.execute()
+    if "reconciled_at" not in totals:
+        return None
+
+    result = {
+        "users": _number(totals.get("users")),
+        "products": _number(totals.get("products")),
+        "transactions": _number(totals.get("transactions")),
+        "reconciled_at": totals["reconciled_at"],
+        "users_by_role": _counts(users),
+        "products_by_status": _counts(products),
+        "transactions_by_status": _counts(transactions),
+        "series": {},
+        "trends": {},
+    }
+    for index, metric in enumerate(SERIES):
+        hourly, daily = series[2 * index], series[2 * index + 1]
+        daily = [_number(value) for value in daily]
+        result["series"][metric] = {
+            "hourly": [{"bucket": field, "value": _number(value)} for field, value in zip(hours, hourly)],
+            "daily": [{"bucket": field, "value": value} for field, value in zip(days, daily)],
+        }
+        last_14 = daily[-14:]
+        result["trends"][metric] = _trend(_number(sum(last_14[7:])), _number(sum(last_14[:7])))
+    return result
@@ -0,0 +1,237 @@
+"""
+Archive Introspection (manifests of zip/tar product files)
+"""
+import os
+import struct
+import tarfile
+import time
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.core.storage import storage
+from app.models.product import ProductFile
+
+MANIFEST_KEY = "archive:manifest:{}"
+
+# Bump when the manifest layout changes so stale cache entries are ignored
+MANIFEST_VERSION = 1
+
+LANGUAGES = {
+    ".py": "Python", ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript", ".java": "Java", ".kt": "Kotlin",
+    ".c": "C", ".h": "C", ".cpp": "C++", ".cc": "C++", ".hpp": "C++",
+    ".cs": "C#", ".go": "Go", ".rs": "Rust", ".rb": "Ruby", ".php": "PHP",
+    ".swift": "Swift", ".dart": "Dart", ".vue": "Vue", ".html": "HTML",
+    ".css": "CSS", ".scss": "SCSS", ".sql": "SQL", ".sh": "Shell",
+    ".json": "JSON", ".xml": "XML", ".yaml": "YAML", ".yml": "YAML",
+    ".md": "Markdown",
+}
+
+# Average bytes per line of source code, used for the LOC estimate
+AVG_LINE_BYTES = 32
+
+# Longest path kept per entry
+MAX_PATH_LENGTH = 1024
+
+ZIP_EOCD = struct.Struct("<4s4H2LH")
+ZIP64_LOCATOR = struct.Struct("<4sLQL")
+ZIP64_EOCD = struct.Struct("<4sQ2H2L4Q")
+ZIP_CENTRAL_DIR = struct.Struct("<4s4B4HL2L5H2L")
+
+
+class ManifestLimit(Exception):
+    """Raised internally when an archive exceeds the entry or time budget"""
+
+
+def _zip_entries(fh: BinaryIO) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (name, uncompressed size) from a zip's central directory.
+
+    Only the end-of-central-directory record and the directory itself are
+    read, entry by entry, so file data is never touched (on S3 this is a
+    couple of ranged GETs).
+    """
+    file_size = fh.seek(0, os.SEEK_END)
+    tail_size = min(file_size, ZIP_EOCD.size + 0xFFFF)
+    fh.seek(file_size - tail_size)
+    tail = fh.read(tail_size)
+    pos = tail.rfind(b"PK\x05\x06")
+    if pos < 0 or pos + ZIP_EOCD.size > len(tail):
+        raise ValueError("End of central directory not found")
+    eocd_offset = file_size - tail_size + pos
+    _, _, _, _, count, cd_size, cd_offset, _ = ZIP_EOCD.unpack_from(tail, pos)
+
+    if count == 0xFFFF or cd_size == 0xFFFFFFFF or cd_offset == 0xFFFFFFFF:
+        fh.seek(eocd_offset - ZIP64_LOCATOR.size)
+        sig, _, eocd64_offset, _ = ZIP64_LOCATOR.unpack(fh.read(ZIP64_LOCATOR.size))
+        if sig != b"PK\x06\x07":
+            raise ValueError("Missing zip64 locator")
+        # The record normally sits right before the locator; its stored
+        # offset is wrong when data was prepended to the archive
+        eocd64_offset = max(eocd64_offset, eocd_offset - ZIP64_LOCATOR.size - ZIP64_EOCD.size)
+        fh.seek(eocd64_offset)
+        record = ZIP64_EOCD.unpack(fh.read(ZIP64_EOCD.size))
+        if record[0] != b"PK\x06\x06":
+            raise ValueError("Missing zip64 end of central directory")
+        count, cd_size, cd_offset = record[7], record[8], record[9]
+        eocd_offset = eocd64_offset
+
+    # Data prepended to the archive (self-extracting stubs) shifts offsets
+    cd_offset += max(0, eocd_offset - cd_size - cd_offset)
+    fh.seek(cd_offset)
+    for _ in range(count):
+        header = fh.read(ZIP_CENTRAL_DIR.size)
+        if len(header) < ZIP_CENTRAL_DIR.size:
+            return
+        fields = ZIP_CENTRAL_DIR.unpack(header)
+        if fields[0] != b"PK\x01\x02":
+            raise ValueError("Corrupt central directory")
+        flags, size = fields[5], fields[11]
+        name_len, extra_len, comment_len = fields[12], fields[13], fields[14]
+        raw_name = fh.read(name_len)
+        extra = fh.read(extra_len)
+        fh.seek(comment_len, os.SEEK_CUR)
+
+        if size == 0xFFFFFFFF:
+            size = _zip64_size(extra, size)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437", errors="replace")
+        if not name.endswith("/"):
+            yield name, size
+
+
+def _zip64_size(extra: bytes, default: int) -> int:
+    offset = 0
+    while offset + 4 <= len(extra):
+        tag, length = struct.unpack_from("<2H", extra, offset)
+        if tag == 0x0001 and length >= 8:
+            return struct.unpack_from("<Q", extra, offset + 4)[0]
+        offset += 4 + length
+    return default
+
+
+def _tar_entries(fh: BinaryIO) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (name, size) from tar headers. Plain tars are walked by seeking
+    past member data; compressed tars are decompressed as a stream.
+    """
+    fh.seek(0)
+    with tarfile.open(fileobj=fh, mode="r:*") as tar:
+        while True:
+            member = tar.next()
+            if member is None:
+                return
+            if member.isfile():
+                yield member.name, member.size
+            # Drop parsed headers, tarfile would otherwise keep them all
+            tar.members = []
+
+
+def detect_format(fh: BinaryIO, filename: str) -> str:
+    """
+    "zip", "tar" (optionally compressed) or "file" for anything else
+    """
+    fh.seek(0)
+    head = fh.read(512)
+    # Self-extracting zips start with a stub, so trust the extension too
+    if head.startswith((b"PK\x03\x04", b"PK\x05\x06")) or filename.lower().endswith(".zip"):
+        return "zip"
+    if head.startswith((b"\x1f\x8b", b"BZh", b"\xfd7zXZ")) or head[257:262] == b"ustar":
+        return "tar"
+    return "file"
+
+
+def build_manifest(
+    fh: BinaryIO,
+    filename: str,
+    max_entries: int = settings.ARCHIVE_MANIFEST_MAX_ENTRIES,
+    time_limit: float = settings.ARCHIVE_MANIFEST_TIME_LIMIT
+) -> dict:
+    """
+    List the files inside an archive without extracting it (blocking).
+
+    Reading stops after ``max_entries`` files or ``time_limit`` seconds, in
+    which case the manifest is marked ``truncated`` and totals cover only the
+    entries read.
+    """
+    archive_format = detect_format(fh, filename)
+    if archive_format == "zip":
+        entries = _zip_entries(fh)
+    elif archive_format == "tar":
+        entries = _tar_entries(fh)
+    else:
+        entries = iter([(filename, fh.seek(0, os.SEEK_END))])
+
+    files = []
+    languages: Dict[str, dict] = {}
+    total_size = 0
+    estimated_loc = 0
+    truncated = False
+    error: Optional[str] = None
+    deadline = time.monotonic() + time_limit
+
+    try:
+        for name, size in entries:
+            if len(files) >= max_entries or time.monotonic() > deadline:
+                raise ManifestLimit()
+            language = LANGUAGES.get(os.path.splitext(name)[1].lower())
+            loc = -(-size // AVG_LINE_BYTES) if language else 0
+            files.append({"path": name[:MAX_PATH_LENGTH], "size": size, "language": language})
+            total_size += size
+            estimated_loc += loc
+            if language:
+                stats = languages.setdefault(language, {"files": 0, "size": 0, "loc": 0})
+                stats["files"] += 1
+                stats["size"] += size
+                stats["loc"] += loc
+    except ManifestLimit:
+        truncated = True
+    except (ValueError, OSError, tarfile.TarError, struct.error) as exc:
+        truncated = True
+        error = f"Archive could not be fully read: {exc}"
+    finally:
+        close = getattr(entries, "close", None)
+        if close:
+            close()
+
+    return {
+        "version": MANIFEST_VERSION,
+        "format": archive_format,
+        "files": files,
+        "total_files": len(files),
+        "total_size": total_size,
+        "estimated_loc": estimated_loc,
+        "languages": languages,
+        "truncated": truncated,
+        "error": error,
+    }
+
+
+def _build_stored_manifest(key: str, filename: str) -> dict:
+    try:
+        fh = storage.open(key)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    with fh:
+        return build_manifest(fh, filename)
+
+
+async def get_manifest(product_file: ProductFile) -> dict:
+    """
+    Manifest of a product file, cached by checksum (content never changes)
+    """
+    key = MANIFEST_KEY.format(product_file.checksum) if product_file.checksum else None
+    if key:
+        cached = await redis_client.get_json(key)
+        if cached and cached.get("version") == MANIFEST_VERSION:
+            return cached
+
+    manifest = await run_in_threadpool(
+        _build_stored_manifest, product_file.file_url, product_file.file_name
+    )
+    if key:
+        await redis_client.set_json(key, manifest, settings.ARCHIVE_MANIFEST_CACHE_TTL)
+    return manifest
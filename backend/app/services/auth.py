@@ -1,6 +1,7 @@
 """
 Authentication Service
 """
+import hashlib
 from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy.orm import Session
@@ -19,7 +20,8 @@ from app.core.security import (
     verify_email_token
 )
 from app.core.config import settings
-from app.services.email import EmailService
+from app.tasks import email as email_tasks
+from app.tasks.base import enqueue_async
 
 
 class AuthService:
@@ -27,7 +29,6 @@ class AuthService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.email_service = EmailService()
     
     async def authenticate_user(
         self,
@@ -102,10 +103,12 @@ class AuthService:
         token = generate_password_reset_token(user.email)
         reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
         
-        await self.email_service.send_password_reset_email(
-            user.email,
-            user.username,
-            reset_url
+        await enqueue_async(
+            email_tasks.send_password_reset_email,
+            idempotency_key=hashlib.sha256(token.encode()).hexdigest(),
+            email_to=user.email,
+            username=user.username,
+            reset_url=reset_url
         )
         
         # Store token in database
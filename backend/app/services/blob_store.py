@@ -0,0 +1,155 @@
+"""
+Content-Addressed Blob Store
+"""
+import os
+import re
+import time
+from typing import Iterator, List, Optional, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.storage import storage as default_storage
+from app.models.product import ProductFile, ProductImage
+
+CHECKSUM_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Checksums looked up per query during garbage collection
+GC_BATCH_SIZE = 500
+
+
+def validate_checksum(checksum: str) -> str:
+    """
+    Normalize a hex SHA-256 digest or reject it
+    """
+    checksum = checksum.lower()
+    if not CHECKSUM_RE.match(checksum):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Checksum must be a hex SHA-256 digest"
+        )
+    return checksum
+
+
+class BlobStore:
+    """
+    Files stored once per SHA-256 under the key ``blobs/ab/cd/<sha256>`` of
+    the configured storage backend.
+
+    The blob key is what ProductFile.file_url holds. Identical uploads share
+    one blob. A blob's reference count is the number of ProductFile and
+    ProductImage rows with its checksum, and blobs nothing references are
+    removed by ``collect_garbage``.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    @property
+    def staging_dir(self) -> str:
+        """Local directory for uploads in progress"""
+        return self.storage.staging_dir
+
+    @staticmethod
+    def key_for(checksum: str) -> str:
+        return f"blobs/{checksum[:2]}/{checksum[2:4]}/{checksum}"
+
+    def exists(self, checksum: str) -> bool:
+        return self.storage.exists(self.key_for(checksum))
+
+    def size(self, checksum: str) -> Optional[int]:
+        return self.storage.size(self.key_for(checksum))
+
+    def modified_at(self, checksum: str) -> Optional[float]:
+        return self.storage.modified_at(self.key_for(checksum))
+
+    def touch(self, checksum: str) -> None:
+        """Refresh mtime so a blob just reused survives the GC grace period"""
+        self.storage.touch(self.key_for(checksum))
+
+    def commit(self, temp_path: str, checksum: str, content_type: Optional[str] = None) -> bool:
+        """
+        Move a fully written temp file into the store (blocking).
+
+        Returns True when identical content was already stored and the temp
+        file was discarded instead.
+        """
+        if self.exists(checksum):
+            os.remove(temp_path)
+            self.touch(checksum)
+            return True
+        self.storage.put_file(temp_path, self.key_for(checksum), content_type)
+        return False
+
+    def iter_checksums(self) -> Iterator[str]:
+        """All stored checksums"""
+        for key in self.storage.iter_keys("blobs/"):
+            name = key.rsplit("/", 1)[-1]
+            if CHECKSUM_RE.match(name):
+                yield name
+
+    def delete(self, checksum: str) -> None:
+        self.storage.delete(self.key_for(checksum))
+        # Image derivatives are keyed by the source checksum
+        self.storage.delete_prefix(f"derivatives/{checksum[:2]}/{checksum[2:4]}/{checksum}/")
+
+
+def reference_count(db: Session, checksum: str) -> int:
+    """
+    Number of ProductFile and ProductImage rows pointing at a blob
+    """
+    return (
+        db.query(ProductFile).filter(ProductFile.checksum == checksum).count()
+        + db.query(ProductImage).filter(ProductImage.checksum == checksum).count()
+    )
+
+
+def _referenced(db: Session, checksums: List[str]) -> Set[str]:
+    referenced = set()
+    for column in (ProductFile.checksum, ProductImage.checksum):
+        rows = db.query(column).filter(column.in_(checksums)).distinct().all()
+        referenced.update(row[0] for row in rows)
+    return referenced
+
+
+def collect_garbage(
+    db: Session,
+    store: Optional[BlobStore] = None,
+    grace_seconds: int = settings.BLOB_GC_GRACE_SECONDS
+) -> int:
+    """
+    Delete blobs nothing references (blocking, run from a worker).
+
+    Blobs modified within ``grace_seconds`` are kept: they may belong to an
+    upload whose ProductFile row has not been written yet.
+    """
+    store = store or BlobStore()
+    cutoff = time.time() - grace_seconds
+    removed = 0
+
+    def sweep(batch: List[str]) -> int:
+        referenced = _referenced(db, batch)
+        count = 0
+        for checksum in batch:
+            if checksum in referenced:
+                continue
+            modified_at = store.modified_at(checksum)
+            if modified_at is None or modified_at > cutoff:
+                continue
+            store.delete(checksum)
+            count += 1
+        return count
+
+    batch: List[str] = []
+    for checksum in store.iter_checksums():
+        batch.append(checksum)
+        if len(batch) >= GC_BATCH_SIZE:
+            removed += sweep(batch)
+            batch = []
+    if batch:
+        removed += sweep(batch)
+    return removed
+
+
+blob_store = BlobStore()
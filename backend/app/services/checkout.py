@@ -0,0 +1,229 @@
+"""
+Checkout: idempotent creation of pending transactions and payment sessions
+"""
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.models.product import Product
+from app.models.transaction import PaymentMethod, Transaction, TransactionStatus
+from app.models.user import User
+from app.schemas.transaction import TransactionCreate
+from app.services.payment import PaymentSession, gateways
+from app.services.admin_metrics import MetricChanges
+
+IDEMPOTENCY_KEY = "idempotency:checkout:{}:{}"
+LOCK_KEY = "checkout:lock:{}:{}"
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+def _fingerprint(payload: TransactionCreate) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+async def _deadline_passed(deadline: float) -> bool:
+    if asyncio.get_running_loop().time() >= deadline:
+        return True
+    await asyncio.sleep(settings.CHECKOUT_POLL_INTERVAL)
+    return False
+
+
+@asynccontextmanager
+async def buyer_product_lock(buyer_id: int, product_id: int) -> AsyncIterator[None]:
+    """
+    Serialize checkouts of one product by one buyer across all processes, so
+    concurrent requests see each other's pending transaction
+    """
+    key = LOCK_KEY.format(buyer_id, product_id)
+    token = uuid4().hex
+    deadline = asyncio.get_running_loop().time() + settings.CHECKOUT_WAIT_TIMEOUT
+    while not await redis_client.set(key, token, expire=settings.CHECKOUT_LOCK_TTL, nx=True):
+        if await _deadline_passed(deadline):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Checkout for this product is already in progress"
+            )
+    try:
+        yield
+    finally:
+        await redis_client.delete_if_equals(key, token)
+
+
+def find_pending(
+    db: Session,
+    buyer_id: int,
+    product_id: int,
+    payment_method: PaymentMethod
+) -> Optional[Transaction]:
+    """
+    Recent pending transaction of the buyer for the product, if any
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.CHECKOUT_PENDING_REUSE)
+    return (
+        db.query(Transaction)
+        .filter(
+            Transaction.buyer_id == buyer_id,
+            Transaction.product_id == product_id,
+            Transaction.payment_method == payment_method,
+            Transaction.status == TransactionStatus.PENDING,
+            Transaction.created_at >= cutoff,
+        )
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .first()
+    )
+
+
+async def create_payment_session(transaction: Transaction) -> PaymentSession:
+    return_url = f"{settings.FRONTEND_URL}/payments/return"
+    gateway = gateways.get(transaction.payment_method)
+    return await gateway.create_payment(transaction, return_url, return_url)
+
+
+def _stored_payment_url(transaction: Transaction) -> Optional[str]:
+    try:
+        return json.loads(transaction.payment_gateway_response or "{}").get("payment_url")
+    except (ValueError, AttributeError):
+        return None
+
+
+async def start_checkout(
+    db: Session,
+    buyer: User,
+    payload: TransactionCreate,
+    metrics: Optional[MetricChanges] = None
+) -> dict:
+    """
+    Reuse the buyer's pending transaction for the product or create one,
+    along with its payment session. Callers hold ``buyer_product_lock``;
+    a created transaction is recorded in ``metrics``. The transaction is
+    committed before the gateway is called, so no database transaction
+    stays open while waiting on it; a failed call is retried on the same
+    pending transaction.
+    """
+    transaction = find_pending(db, buyer.id, payload.product_id, payload.payment_method)
+    if transaction is None:
+        product = db.query(Product).filter(Product.id == payload.product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        gateways.get(payload.payment_method)  # 400 before anything is created
+        transaction = Transaction(
+            transaction_id=str(uuid4()),
+            amount=product.price,
+            currency=product.currency,
+            product_id=product.id,
+            buyer_id=buyer.id,
+            seller_id=product.seller_id,
+            payment_method=payload.payment_method,
+        )
+        db.add(transaction)
+        db.commit()
+        if metrics is not None:
+            metrics.transaction_created(transaction)
+
+    # One gateway session per transaction: retries get the same payment URL
+    payment_url = _stored_payment_url(transaction)
+    if payment_url is None:
+        session = await create_payment_session(transaction)
+        payment_url = session.payment_url
+        transaction.payment_gateway_response = json.dumps({"payment_url": payment_url})
+        if session.gateway_id:
+            transaction.payment_gateway_id = session.gateway_id
+        db.commit()
+
+    return {
+        "transaction_id": transaction.transaction_id,
+        "payment_url": payment_url,
+    }
+
+
+async def _claim_key(key: str, fingerprint: str) -> Optional[dict]:
+    """
+    Claim an idempotency key for this request. Returns None once claimed,
+    or the stored response of the request that already used the key
+    (waiting for it while it is still running).
+    """
+    record = json.dumps({"state": IN_PROGRESS, "fingerprint": fingerprint})
+    deadline = asyncio.get_running_loop().time() + settings.CHECKOUT_WAIT_TIMEOUT
+    while True:
+        if await redis_client.set(key, record, expire=settings.CHECKOUT_LOCK_TTL, nx=True):
+            return None
+
+        existing = await redis_client.get_json(key)
+        if existing is not None:
+            if existing.get("fingerprint") != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request"
+                )
+            if existing.get("state") == DONE:
+                return existing["response"]
+        # Still running, or the first request failed and released the key (and
+        # another duplicate may win it): wait a poll interval, then try again
+        if await _deadline_passed(deadline):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+
+
+async def checkout(
+    db: Session,
+    buyer: User,
+    payload: TransactionCreate,
+    idempotency_key: Optional[str] = None
+) -> Tuple[dict, bool]:
+    """
+    Start (or resume) a purchase and return ``(response, replayed)``.
+
+    With an ``Idempotency-Key`` the first response is stored and replayed
+    for ``CHECKOUT_IDEMPOTENCY_TTL``; duplicates arriving while it runs wait
+    for it instead of doing the work again. Independently of the key, a
+    per buyer and product lock plus reuse of the pending transaction means
+    retries never create a second transaction or payment session.
+    """
+    if redis_client.redis is None:
+        return await start_checkout(db, buyer, payload), False
+
+    key = None
+    fingerprint = _fingerprint(payload)
+    if idempotency_key:
+        if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Idempotency-Key is too long"
+            )
+        key = IDEMPOTENCY_KEY.format(buyer.id, idempotency_key)
+        stored = await _claim_key(key, fingerprint)
+        if stored is not None:
+            return stored, True
+
+    metrics = MetricChanges()
+    try:
+        async with buyer_product_lock(buyer.id, payload.product_id):
+            response = await start_checkout(db, buyer, payload, metrics)
+    except BaseException:
+        if key:
+            await redis_client.delete(key)
+        raise
+
+    if key:
+        await redis_client.set_json(
+            key,
+            {"state": DONE, "fingerprint": fingerprint, "response": response},
+            settings.CHECKOUT_IDEMPOTENCY_TTL,
+        )
+    await metrics.flush_async()
+    return response, False
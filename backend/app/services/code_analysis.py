@@ -0,0 +1,358 @@
+"""
+Static Code Analysis (quality and security scores of product archives)
+"""
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import billiard
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.core.storage import storage
+from app.models.product import Product, ProductFile
+from app.services.archive import detect_format
+
+# Bump when metrics or scoring change so cached per-file results are ignored
+ANALYZER_VERSION = 1
+
+FILE_CACHE_KEY = "analysis:file:v%d:{}" % ANALYZER_VERSION
+SUMMARY_KEY = "analysis:product:{}"
+
+# radon and bandit only understand Python
+ANALYZED_EXTENSIONS = (".py",)
+
+SEVERITY_WEIGHTS = {"HIGH": 10.0, "MEDIUM": 4.0, "LOW": 1.0}
+CONFIDENCE_WEIGHTS = {"HIGH": 1.0, "MEDIUM": 0.6, "LOW": 0.3}
+
+# Findings kept in the product summary
+MAX_FINDINGS = 50
+
+# Unreadable archives or members: corrupt data, truncation, encryption
+# (RuntimeError) and compression methods zipfile lacks (NotImplementedError)
+READ_ERRORS = (
+    zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, zlib.error,
+    RuntimeError, NotImplementedError,
+)
+
+
+def _wanted(name: str) -> bool:
+    return name.lower().endswith(ANALYZED_EXTENSIONS)
+
+
+def iter_sources(fh: BinaryIO, filename: str, stats: dict) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (path, content) of analyzable files in an archive (blocking).
+
+    Members larger than ANALYSIS_MAX_FILE_SIZE are skipped without being
+    read, and reads are capped in case the archive lies about sizes.
+    Members that cannot be read are counted in ``stats["failed"]``.
+    """
+    limit = settings.ANALYSIS_MAX_FILE_SIZE
+    archive_format = detect_format(fh, filename)
+    fh.seek(0)
+    if archive_format == "zip":
+        with zipfile.ZipFile(fh) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _wanted(info.filename):
+                    continue
+                if info.file_size > limit:
+                    stats["skipped"] += 1
+                    continue
+                try:
+                    with zf.open(info) as member:
+                        content = member.read(limit + 1)
+                except READ_ERRORS:
+                    stats["failed"] += 1
+                    continue
+                yield info.filename, content
+    elif archive_format == "tar":
+        with tarfile.open(fileobj=fh, mode="r:*") as tar:
+            while True:
+                member = tar.next()
+                if member is None:
+                    return
+                tar.members = []
+                if not member.isfile() or not _wanted(member.name):
+                    continue
+                if member.size > limit:
+                    stats["skipped"] += 1
+                    continue
+                try:
+                    content = tar.extractfile(member).read(limit + 1)
+                except READ_ERRORS:
+                    stats["failed"] += 1
+                    continue
+                yield member.name, content
+    elif _wanted(filename):
+        yield filename, fh.read(limit + 1)
+
+
+def _init_worker(memory_limit: int) -> None:
+    """Pool initializer: cap each worker's address space and quiet bandit"""
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except (ImportError, ValueError, OSError):
+        pass  # not supported on this platform
+    logging.getLogger("bandit").setLevel(logging.ERROR)
+
+
+def _quality(source: str) -> dict:
+    from radon.complexity import cc_visit
+    from radon.metrics import mi_visit
+    from radon.raw import analyze
+
+    raw = analyze(source)
+    complexities = [block.complexity for block in cc_visit(source)]
+    return {
+        "sloc": raw.sloc,
+        "comments": raw.comments,
+        "maintainability": round(mi_visit(source, multi=True), 2),
+        "functions": len(complexities),
+        "avg_complexity": round(sum(complexities) / len(complexities), 2) if complexities else 1.0,
+        "max_complexity": max(complexities, default=0),
+        "issues": [],
+    }
+
+
+def _security(sources: List[Tuple[str, str]]) -> Dict[str, List[dict]]:
+    from bandit.core import config as bandit_config
+    from bandit.core import manager as bandit_manager
+
+    findings: Dict[str, List[dict]] = {}
+    with tempfile.TemporaryDirectory(prefix="analysis-") as directory:
+        paths = {}
+        for index, (digest, source) in enumerate(sources):
+            path = os.path.join(directory, f"{index}.py")
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(source)
+            paths[path] = digest
+            findings[digest] = []
+
+        manager = bandit_manager.BanditManager(bandit_config.BanditConfig(), "file", quiet=True)
+        manager.discover_files(list(paths))
+        manager.run_tests()
+        for issue in manager.get_issue_list():
+            findings[paths[issue.fname]].append({
+                "test_id": issue.test_id,
+                "severity": issue.severity,
+                "confidence": issue.confidence,
+                "line": issue.lineno,
+                "text": issue.text,
+            })
+    return findings
+
+
+def analyze_batch(batch: List[Tuple[str, bytes]]) -> Dict[str, dict]:
+    """
+    Metrics and security findings for (sha256, content) pairs (runs in the pool)
+    """
+    results: Dict[str, dict] = {}
+    sources = []
+    for digest, content in batch:
+        source = content.decode("utf-8", errors="replace")
+        try:
+            results[digest] = _quality(source)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            results[digest] = {"error": "unparsable"}
+            continue
+        sources.append((digest, source))
+
+    if sources:
+        for digest, issues in _security(sources).items():
+            results[digest]["issues"] = issues
+    return results
+
+
+def _run_pool(items: List[Tuple[str, bytes]], deadline: float, stats: dict) -> Dict[str, dict]:
+    """
+    Fan batches out over a process pool, stopping at the deadline. Workers
+    are terminated on exit, so a stuck or runaway file cannot outlive the job.
+
+    billiard (Celery's fork of multiprocessing) is used because prefork
+    worker processes are daemonic and the stdlib refuses to let them start
+    children.
+    """
+    size = settings.ANALYSIS_BATCH_SIZE
+    batches = [items[i:i + size] for i in range(0, len(items), size)]
+    context = billiard.get_context("spawn")
+    pool = context.Pool(
+        processes=min(settings.ANALYSIS_WORKERS, len(batches)),
+        initializer=_init_worker,
+        initargs=(settings.ANALYSIS_MEMORY_LIMIT,),
+        maxtasksperchild=20,
+    )
+    results: Dict[str, dict] = {}
+    try:
+        pending = [(pool.apply_async(analyze_batch, (batch,)), batch) for batch in batches]
+        for async_result, batch in pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and not async_result.ready():
+                stats["truncated"] = True
+                continue
+            try:
+                results.update(async_result.get(timeout=max(remaining, 0)))
+            except billiard.TimeoutError:
+                stats["truncated"] = True
+            except Exception:
+                stats["failed"] += len(batch)  # worker hit the memory cap or crashed
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
+
+
+def file_quality(result: dict) -> float:
+    """0-100: maintainability index blended with a cyclomatic complexity score"""
+    complexity_score = max(0.0, 100.0 - (result["avg_complexity"] - 1.0) * 10.0)
+    return 0.7 * result["maintainability"] + 0.3 * complexity_score
+
+
+def aggregate(results: Dict[str, dict], paths: Dict[str, str]) -> dict:
+    """
+    Combine per-file results into product scores (0-100).
+
+    Quality is the SLOC-weighted mean of per-file quality. Security starts at
+    100 and falls with the weighted density of bandit findings per KSLOC.
+    """
+    weighted_quality = 0.0
+    total_weight = 0
+    total_sloc = 0
+    penalty = 0.0
+    severities = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    findings = []
+
+    for digest, result in results.items():
+        if "error" in result:
+            continue
+        weight = max(result["sloc"], 1)
+        weighted_quality += file_quality(result) * weight
+        total_weight += weight
+        total_sloc += result["sloc"]
+        for issue in result["issues"]:
+            severities[issue["severity"]] = severities.get(issue["severity"], 0) + 1
+            penalty += SEVERITY_WEIGHTS.get(issue["severity"], 1.0) * CONFIDENCE_WEIGHTS.get(issue["confidence"], 0.3)
+            findings.append({**issue, "path": paths.get(digest)})
+
+    if not total_weight:
+        return {"code_quality_score": None, "security_score": None, "sloc": 0, "issues": severities, "findings": []}
+
+    density = penalty / max(total_sloc / 1000.0, 1.0)
+    findings.sort(key=lambda f: (-SEVERITY_WEIGHTS.get(f["severity"], 1.0), f["path"] or "", f["line"]))
+    return {
+        "code_quality_score": round(weighted_quality / total_weight, 1),
+        "security_score": round(100.0 / (1.0 + density / 10.0), 1),
+        "sloc": total_sloc,
+        "issues": severities,
+        "findings": findings[:MAX_FINDINGS],
+    }
+
+
+def analysis_key(db: Session, product_id: int) -> str:
+    """
+    Idempotency key for an analysis job: same files, same job
+    """
+    checksums = sorted(
+        row[0] or "" for row in
+        db.query(ProductFile.checksum).filter(ProductFile.product_id == product_id).all()
+    )
+    digest = hashlib.sha256("|".join(checksums).encode()).hexdigest()[:32]
+    return f"{product_id}:v{ANALYZER_VERSION}:{digest}"
+
+
+def analyze_product(db: Session, product_id: int, redis_conn) -> dict:
+    """
+    Analyze every Python file in a product's files and store the scores
+    (blocking, run from a worker with a sync Redis client).
+
+    Per-file results are cached by content hash, so re-uploads only analyze
+    files that changed. Reading stops at ANALYSIS_MAX_FILES files,
+    ANALYSIS_MAX_TOTAL_BYTES bytes or ANALYSIS_TIME_LIMIT seconds.
+    """
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        return {"product_id": product_id, "status": "missing"}
+
+    started = time.monotonic()
+    deadline = started + settings.ANALYSIS_TIME_LIMIT
+    stats = {"files": 0, "cached": 0, "analyzed": 0, "skipped": 0, "failed": 0, "truncated": False}
+    paths: Dict[str, str] = {}
+    pending: Dict[str, bytes] = {}
+    total_bytes = 0
+
+    for product_file in product.files:
+        if stats["truncated"]:
+            break
+        try:
+            fh = storage.open(product_file.file_url)
+        except (FileNotFoundError, ValueError):
+            continue
+        with fh:
+            try:
+                for path, content in iter_sources(fh, product_file.file_name, stats):
+                    if len(content) > settings.ANALYSIS_MAX_FILE_SIZE:
+                        stats["skipped"] += 1
+                        continue
+                    if (
+                        stats["files"] >= settings.ANALYSIS_MAX_FILES
+                        or total_bytes + len(content) > settings.ANALYSIS_MAX_TOTAL_BYTES
+                        or time.monotonic() > deadline
+                    ):
+                        stats["truncated"] = True
+                        break
+                    stats["files"] += 1
+                    digest = hashlib.sha256(content).hexdigest()
+                    paths.setdefault(digest, path)
+                    if digest not in pending:
+                        pending[digest] = content
+                        total_bytes += len(content)
+            except READ_ERRORS:
+                stats["failed"] += 1
+
+    results: Dict[str, dict] = {}
+    digests = list(pending)
+    if digests:
+        cached = redis_conn.mget([FILE_CACHE_KEY.format(digest) for digest in digests])
+        for digest, raw in zip(digests, cached):
+            if raw:
+                results[digest] = json.loads(raw)
+                del pending[digest]
+    stats["cached"] = len(results)
+
+    if pending:
+        fresh = _run_pool(list(pending.items()), deadline, stats)
+        stats["analyzed"] = len(fresh)
+        pipe = redis_conn.pipeline(transaction=False)
+        for digest, result in fresh.items():
+            pipe.set(FILE_CACHE_KEY.format(digest), json.dumps(result), ex=settings.ANALYSIS_CACHE_TTL)
+        pipe.execute()
+        results.update(fresh)
+
+    summary = aggregate(results, paths)
+    if summary["code_quality_score"] is not None:
+        product.code_quality_score = summary["code_quality_score"]
+        product.security_score = summary["security_score"]
+        db.commit()
+
+    summary.update(stats)
+    summary["product_id"] = product_id
+    summary["analyzer_version"] = ANALYZER_VERSION
+    summary["duration"] = round(time.monotonic() - started, 2)
+    redis_conn.set(SUMMARY_KEY.format(product_id), json.dumps(summary), ex=settings.ANALYSIS_CACHE_TTL)
+    return summary
+
+
+async def get_summary(product_id: int) -> Optional[dict]:
+    """
+    Latest analysis summary of a product, None if it was never analyzed
+    """
+    return await redis_client.get_json(SUMMARY_KEY.format(product_id))
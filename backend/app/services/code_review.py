@@ -1,24 +1,342 @@
 """Service for AI-powered code review using OpenAI."""
-from openai import OpenAI
+import asyncio
+import hashlib
+import re
+import textwrap
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+from fastapi import HTTPException, status
+from openai import AsyncOpenAI, OpenAIError
 
 from app.core.config import settings
+from app.core.redis_client import redis_client
 
+CACHE_KEY = "code_review:{}:{}:{}"  # model and prompt version, mode, code hash
 
-def review_code(code: str) -> str:
-    """Send code to OpenAI API and return review feedback."""
+# Bump when the prompt changes so cached reviews are not reused
+PROMPT_VERSION = 1
+
+PROMPT = "Please review the following code and provide suggestions for improvement:\n\n"
+CHUNK_PROMPT = (
+    "Please review the following excerpt of a larger file "
+    "and provide suggestions for improvement:\n\n"
+)
+
+# Preferred split points: blank lines and top-level definitions
+BOUNDARY_RE = re.compile(r"^(\s*$|(async\s+def|def|class|function|export|public|private|func|fn)\b)")
+
+
+def normalize_code(code: str) -> str:
+    """
+    Canonical form used for the cache key: unified newlines, no trailing
+    whitespace, no common indentation and no leading/trailing blank lines
+    """
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return textwrap.dedent("\n".join(lines)).strip("\n")
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(normalize_code(code).encode()).hexdigest()
+
+
+def split_code(code: str, max_chars: int) -> List[Tuple[int, int, str]]:
+    """
+    Split code into (first line, last line, text) chunks of at most
+    ``max_chars``, cutting at blank lines or top-level definitions when
+    possible (single lines longer than ``max_chars`` are cut hard)
+    """
+    lines = code.split("\n")
+    chunks = []
+    start = 0
+    while start < len(lines):
+        size = 0
+        end = start
+        boundary = None
+        while end < len(lines) and size + len(lines[end]) + 1 <= max_chars:
+            size += len(lines[end]) + 1
+            end += 1
+            if end < len(lines) and end - start > 1 and BOUNDARY_RE.match(lines[end]):
+                boundary = end
+        if end == start:
+            # One line alone exceeds the budget
+            text = lines[start]
+            for offset in range(0, len(text), max_chars):
+                chunks.append((start + 1, start + 1, text[offset:offset + max_chars]))
+            start += 1
+            continue
+        if end < len(lines) and boundary and boundary - start >= (end - start) // 2:
+            end = boundary
+        chunks.append((start + 1, end, "\n".join(lines[start:end])))
+        start = end
+    return chunks
+
+
+class CodeReviewService:
+    """
+    Reviews code with the chat completions API.
+
+    One ``AsyncOpenAI`` client per event loop keeps HTTP connections alive
+    between requests. A semaphore caps concurrent completions per process;
+    callers queue for a slot and get 503 when the queue is full or the wait
+    exceeds ``OPENAI_QUEUE_TIMEOUT``. Reviews are cached by the hash of the
+    normalized code, and identical reviews already running are shared.
+    Code above ``CODE_REVIEW_CHUNK_SIZE`` characters is split into chunks
+    reviewed in parallel and merged.
+    """
+
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _bind(self) -> None:
+        """(Re)create loop-bound state when used from a new event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None,
+                timeout=settings.OPENAI_TIMEOUT,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.OPENAI_MAX_CONCURRENCY,
+                        max_keepalive_connections=settings.OPENAI_MAX_CONCURRENCY,
+                    ),
+                    timeout=settings.OPENAI_TIMEOUT,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+            self._waiting = 0
+            self._inflight = {}
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        self._bind()
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._loop = None
+
+    def check_capacity(self) -> None:
+        """503 when too many callers are already waiting for a slot"""
+        if self._waiting >= settings.OPENAI_MAX_QUEUE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Code review is busy, try again later"
+            )
+
+    async def _acquire(self) -> None:
+        self._bind()
+        self.check_capacity()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), settings.OPENAI_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Code review is busy, try again later"
+            )
+        finally:
+            self._waiting -= 1
+
+    async def complete(self, prompt: str) -> str:
+        """One chat completion, within the concurrency limit"""
+        client = self.client
+        await self._acquire()
+        try:
+            completion = await client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+            )
+        finally:
+            self._semaphore.release()
+        return (completion.choices[0].message.content or "").strip()
+
+    async def complete_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        One streamed chat completion yielding text deltas, within the
+        concurrency limit. Closing the iterator early (the client went away)
+        closes the upstream response, which cancels the generation.
+        """
+        client = self.client
+        await self._acquire()
+        try:
+            stream = await client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+            try:
+                async for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        yield event.choices[0].delta.content
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await stream.response.aclose()
+        finally:
+            self._semaphore.release()
+
+    async def _cached(self, key: str, prompt: str) -> str:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return cached
+
+        # Share a review that is already running for the same code
+        running = self._inflight.get(key)
+        if running is not None:
+            return await asyncio.shield(running)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            feedback = await self.complete(prompt)
+            await redis_client.set(key, feedback, settings.CODE_REVIEW_CACHE_TTL)
+            future.set_result(feedback)
+            return feedback
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def cache_key(self, code: str, mode: str = "file") -> str:
+        """
+        Key of a review: ``file`` for whole (possibly merged) reviews, ``chunk``
+        for excerpts, which are reviewed with a different prompt
+        """
+        return CACHE_KEY.format(f"{settings.OPENAI_MODEL}:v{PROMPT_VERSION}", mode, code_hash(code))
+
+    def chunks(self, normalized: str) -> List[Tuple[int, int, str]]:
+        """Chunks the (normalized) code is reviewed in; 413 when there are too many"""
+        if len(normalized) <= settings.CODE_REVIEW_CHUNK_SIZE:
+            return [(1, normalized.count("\n") + 1, normalized)]
+        chunks = split_code(normalized, settings.CODE_REVIEW_CHUNK_SIZE)
+        if len(chunks) > settings.CODE_REVIEW_MAX_CHUNKS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Code is too large to review"
+            )
+        return chunks
+
+    async def get_cached(self, code: str) -> Optional[str]:
+        """Stored review of this code, if any"""
+        return await redis_client.get(self.cache_key(code))
+
+    async def review(self, code: str) -> str:
+        """
+        Review code, from cache when the same (normalized) code was seen before
+        """
+        self._bind()
+        normalized = normalize_code(code)
+        chunks = self.chunks(normalized)
+        if len(chunks) == 1:
+            return await self._cached(self.cache_key(code), PROMPT + normalized)
+
+        key = self.cache_key(code)
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return cached
+
+        # Chunks are cached on their own, so editing one part re-reviews only it
+        reviews = await asyncio.gather(*(
+            self._cached(self.cache_key(text, "chunk"), CHUNK_PROMPT + text)
+            for _, _, text in chunks
+        ))
+        feedback = "\n\n".join(
+            f"### Lines {start}-{end}\n\n{review}"
+            for (start, end, _), review in zip(chunks, reviews)
+        )
+        await redis_client.set(key, feedback, settings.CODE_REVIEW_CACHE_TTL)
+        return feedback
+
+    async def stream(self, code: str) -> AsyncIterator[dict]:
+        """
+        Review code as a stream of events: ``start``, then ``delta`` events
+        carrying text as the model writes it, then ``done`` (or ``error``).
+
+        ``start`` is sent before waiting for a slot, so clients get a first
+        byte immediately. Large code is streamed chunk by chunk under the
+        same headings as ``review``. Cached reviews (whole or per chunk) are
+        sent at once, and completed reviews are cached for both paths.
+        """
+        normalized = normalize_code(code)
+        chunks = self.chunks(normalized)
+        key = self.cache_key(code)
+        yield {"event": "start", "chunks": len(chunks)}
+
+        cached = await redis_client.get(key)
+        if cached is not None:
+            yield {"event": "delta", "text": cached}
+            yield {"event": "done", "cached": True}
+            return
+
+        parts = []
+        try:
+            for start, end, text in chunks:
+                heading = ""
+                if len(chunks) > 1:
+                    heading = f"### Lines {start}-{end}\n\n"
+                    yield {"event": "delta", "text": ("\n\n" if parts else "") + heading}
+                    chunk_key, prompt = self.cache_key(text, "chunk"), CHUNK_PROMPT + text
+                    review = await redis_client.get(chunk_key)
+                else:
+                    chunk_key, prompt, review = None, PROMPT + text, None
+
+                if review is not None:
+                    yield {"event": "delta", "text": review}
+                else:
+                    pieces = []
+                    # aclosing: stopping this stream must stop the completion right away
+                    async with aclosing(self.complete_stream(prompt)) as deltas:
+                        async for delta in deltas:
+                            pieces.append(delta)
+                            yield {"event": "delta", "text": delta}
+                    review = "".join(pieces).strip()
+                    if chunk_key:
+                        await redis_client.set(chunk_key, review, settings.CODE_REVIEW_CACHE_TTL)
+                parts.append(heading + review)
+        except HTTPException as exc:
+            yield {"event": "error", "detail": exc.detail}
+            return
+        except OpenAIError as exc:
+            yield {"event": "error", "detail": f"Error during code review: {exc}"}
+            return
+
+        await redis_client.set(key, "\n\n".join(parts), settings.CODE_REVIEW_CACHE_TTL)
+        yield {"event": "done", "cached": False}
+
+
+review_service = CodeReviewService()
+
+
+class ReviewNotConfigured(HTTPException):
+    """No OpenAI API key: a configuration error, so jobs fail without retrying"""
+
+
+def check_configured() -> None:
+    """503 when no OpenAI API key is set"""
     if not settings.OPENAI_API_KEY:
-        return "OpenAI API key is not configured."
-
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    prompt = (
-        "Please review the following code and provide suggestions for improvement:\n\n"
-        + code
-    )
-    try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+        raise ReviewNotConfigured(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OpenAI API key is not configured."
         )
-        return completion.choices[0].message.content.strip()
-    except Exception as exc:  # pragma: no cover - network
-        return f"Error during code review: {exc}"
+
+
+async def review_code(code: str) -> str:
+    """Send code to OpenAI API and return review feedback."""
+    # Raised, not returned: a job result is cached under the code's job id
+    check_configured()
+    return await review_service.review(code)
@@ -0,0 +1,161 @@
+"""
+Currencies: cached FX rates and product prices normalized to the base currency
+"""
+import hashlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client
+from app.models.currency import FxRate
+from app.models.product import Product
+
+RATES_KEY = "fx:rates"  # currency -> units per one base currency unit
+
+# Per-process copy of the rates, kept for FX_CACHE_TTL seconds
+_cached: Dict[str, object] = {"rates": None, "expires": 0.0}
+
+
+def load_rates(db: Session) -> Dict[str, float]:
+    rates = {code: rate for code, rate in db.query(FxRate.currency, FxRate.rate)}
+    rates[settings.BASE_CURRENCY] = 1.0
+    return rates
+
+
+def _load_rates() -> Dict[str, float]:
+    db = SessionLocal()
+    try:
+        return load_rates(db)
+    finally:
+        db.close()
+
+
+async def get_rates() -> Dict[str, float]:
+    """
+    Current rates, from process memory, else Redis (written by the refresh
+    job), else the database
+    """
+    if _cached["rates"] is not None and time.monotonic() < _cached["expires"]:
+        return _cached["rates"]
+    rates = None
+    if redis_client.redis is not None:
+        raw = await redis_client.redis.hgetall(RATES_KEY)
+        if raw:
+            rates = {code: float(rate) for code, rate in raw.items()}
+    if rates is None:
+        rates = await run_in_threadpool(_load_rates)
+    rates[settings.BASE_CURRENCY] = 1.0
+    _cached["rates"] = rates
+    _cached["expires"] = time.monotonic() + settings.FX_CACHE_TTL
+    return rates
+
+
+def rates_version(rates: Dict[str, float]) -> str:
+    """Short fingerprint of a rate table, for cache validators"""
+    return hashlib.md5(repr(sorted(rates.items())).encode()).hexdigest()[:16]
+
+
+def rate_for(rates: Dict[str, float], currency: str) -> float:
+    """Rate of a currency requested by a client; 400 when it is unknown"""
+    rate = rates.get(currency.upper())
+    if not rate:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported currency {currency}")
+    return rate
+
+
+def to_base(amount: Optional[float], currency: Optional[str], rates: Dict[str, float]) -> Optional[float]:
+    """Amount in the base currency, None when the currency's rate is unknown"""
+    rate = rates.get((currency or settings.BASE_CURRENCY).upper())
+    if amount is None or not rate:
+        return None
+    return round(amount / rate, 6)
+
+
+def convert(amount: float, source: str, target: str, rates: Dict[str, float]) -> float:
+    """Amount converted between two currencies; 503 when a rate is missing"""
+    source, target = source.upper(), target.upper()
+    if source == target:
+        return amount
+    if not rates.get(source) or not rates.get(target):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No exchange rate from {source} to {target}, try again later"
+        )
+    return amount / rates[source] * rates[target]
+
+
+def display_prices(base_prices: Sequence[Optional[float]], currency: str, rates: Dict[str, float]) -> List[Optional[float]]:
+    """A page of base-currency prices in the display currency (one rate lookup for the page)"""
+    factor = rate_for(rates, currency)
+    return [None if price is None else round(price * factor, 2) for price in base_prices]
+
+
+def renormalize(db: Session, rates: Dict[str, float]) -> int:
+    """
+    Recompute ``base_price`` of every product, one UPDATE per currency
+    (``updated_at`` is kept: the product itself did not change)
+    """
+    updated = 0
+    currencies = [code for (code,) in db.query(Product.currency).distinct()]
+    for code in currencies:
+        rate = rates.get((code or settings.BASE_CURRENCY).upper())
+        updated += (
+            db.query(Product)
+            .filter(Product.currency == code if code is not None else Product.currency.is_(None))
+            .update(
+                {
+                    Product.base_price: Product.price / rate if rate else None,
+                    Product.updated_at: Product.updated_at,
+                },
+                synchronize_session=False,
+            )
+        )
+    return updated
+
+
+def fetch_rates() -> Dict[str, float]:
+    """Rates per one base currency unit from ``FX_RATES_URL``"""
+    response = httpx.get(
+        settings.FX_RATES_URL.format(base=settings.BASE_CURRENCY),
+        timeout=settings.FX_TIMEOUT,
+    )
+    response.raise_for_status()
+    rates = {
+        code.upper(): float(rate)
+        for code, rate in response.json()["rates"].items()
+        if len(code) == 3 and rate and float(rate) > 0
+    }
+    rates[settings.BASE_CURRENCY] = 1.0
+    return rates
+
+
+def refresh_rates(db: Session, redis_conn) -> Dict[str, int]:
+    """
+    Store freshly fetched rates, renormalize product prices in the same
+    database transaction, then publish the rates to Redis for API processes
+    """
+    rates = fetch_rates()
+    now = datetime.utcnow()
+    stored = {row.currency: row for row in db.query(FxRate)}
+    for code, rate in rates.items():
+        row = stored.get(code)
+        if row is None:
+            db.add(FxRate(currency=code, rate=rate, updated_at=now))
+        else:
+            row.rate = rate
+            row.updated_at = now
+    products = renormalize(db, rates)
+    db.commit()
+
+    pipe = redis_conn.pipeline(transaction=True)
+    pipe.delete(RATES_KEY)
+    pipe.hset(RATES_KEY, mapping=rates)
+    pipe.execute()
+    return {"rates": len(rates), "products": products}
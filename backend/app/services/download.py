@@ -0,0 +1,323 @@
+"""
+Purchase Downloads: entitlement, quota and ranged file delivery
+"""
+import os
+from datetime import datetime
+from functools import partial
+from typing import Awaitable, Callable, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request, status
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.http_cache import http_date
+from app.core.storage import content_disposition, storage
+from app.models.product import ProductFile
+from app.models.transaction import Transaction, TransactionArchive, TransactionStatus
+
+# Fallback read size when the server cannot do zero-copy sends
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def get_purchase(db: Session, buyer_id: int, product_id: int) -> Transaction:
+    """
+    Completed purchase of a product that still allows downloads. Downloadable
+    purchases are never archived, so an archived one only explains the refusal.
+    """
+    def completed(model):
+        return (
+            db.query(model)
+            .filter(
+                model.buyer_id == buyer_id,
+                model.product_id == product_id,
+                model.status == TransactionStatus.COMPLETED,
+            )
+            .order_by(model.completed_at.desc(), model.id.desc())
+            .first()
+        )
+
+    transaction = completed(Transaction) or completed(TransactionArchive)
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Product has not been purchased"
+        )
+    if transaction.download_expiry and transaction.download_expiry < datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Download period has expired")
+    if transaction.download_count >= transaction.max_downloads:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Download limit reached")
+    return transaction
+
+
+def get_product_file(db: Session, product_id: int, file_id: Optional[int] = None) -> ProductFile:
+    """
+    Requested file of a product, or its main file
+    """
+    query = db.query(ProductFile).filter(ProductFile.product_id == product_id)
+    if file_id is not None:
+        product_file = query.filter(ProductFile.id == file_id).first()
+    else:
+        product_file = query.order_by(ProductFile.is_main.desc(), ProductFile.id.asc()).first()
+    if not product_file:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return product_file
+
+
+def reserve_download(db: Session, transaction_id: int) -> bool:
+    """
+    Check entitlement and quota and consume one download in a single
+    conditional UPDATE, so concurrent requests can never exceed the limit.
+    """
+    now = datetime.utcnow()
+    result = db.execute(
+        update(Transaction)
+        .where(
+            Transaction.id == transaction_id,
+            Transaction.status == TransactionStatus.COMPLETED,
+            Transaction.download_count < Transaction.max_downloads,
+            or_(Transaction.download_expiry.is_(None), Transaction.download_expiry > now),
+        )
+        .values(download_count=Transaction.download_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _release_download(transaction_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Transaction)
+            .where(Transaction.id == transaction_id, Transaction.download_count > 0)
+            .values(download_count=Transaction.download_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def release_download(transaction_id: int) -> None:
+    """
+    Give back a download whose transfer did not finish
+    """
+    await run_in_threadpool(_release_download, transaction_id)
+
+
+def parse_range(
+    request: Request,
+    size: int,
+    etag: str,
+    last_modified: Optional[str]
+) -> Optional[Tuple[int, int]]:
+    """
+    Single byte range requested by the client as an inclusive (start, end), or
+    None for the whole file. ``If-Range`` disables the range when stale.
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() not in (etag, last_modified):
+        return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # multipart ranges are not supported, send the full file
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                raise ValueError
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            end = min(end, size - 1)
+    except ValueError:
+        start, end = size, size - 1  # unparsable, treated as unsatisfiable
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """
+    Sends a byte range of a file.
+
+    Uses the ASGI ``http.response.zerocopysend`` extension (``sendfile``) when
+    the server offers it, and otherwise ``pread`` in bounded chunks. Client
+    disconnects are watched so that ``on_abort`` runs when the range was not
+    fully delivered.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: str = "application/octet-stream",
+        on_abort: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.on_abort = on_abort
+        self.completed = False
+        self.headers["Content-Length"] = str(self.length)
+        self.headers["Accept-Ranges"] = "bytes"
+
+    async def _listen_for_disconnect(self, receive: Receive) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+
+    async def _send_body(self, scope: Scope, send: Send) -> None:
+        fh = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": fh,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+                self.completed = True
+                return
+
+            fd = fh.fileno()
+            offset, remaining = self.start, self.length
+            while remaining > 0:
+                data = await run_in_threadpool(
+                    os.pread, fd, min(READ_CHUNK_SIZE, remaining), offset
+                )
+                if not data:
+                    break  # file shrank underneath us
+                offset += len(data)
+                remaining -= len(data)
+                await send({
+                    "type": "http.response.body",
+                    "body": data,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            self.completed = remaining == 0
+        finally:
+            await run_in_threadpool(fh.close)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        try:
+            if scope.get("method") == "HEAD" or self.length == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                self.completed = True
+                return
+
+            async with anyio.create_task_group() as task_group:
+                async def wrap(func: Callable[[], Awaitable[None]]) -> None:
+                    await func()
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(wrap, partial(self._send_body, scope, send))
+                await wrap(partial(self._listen_for_disconnect, receive))
+        finally:
+            if not self.completed and self.on_abort is not None:
+                with anyio.CancelScope(shield=True):
+                    await self.on_abort()
+
+
+async def download_response(
+    request: Request,
+    db: Session,
+    transaction: Transaction,
+    product_file: ProductFile
+) -> Response:
+    """
+    Build the download response for an entitled purchase.
+
+    A response starting at the first byte consumes a download, so resuming a
+    broken transfer with ``Range`` is free; a range that skips the start only
+    counts when nothing has been downloaded yet. A consumed download is
+    released again if the client disconnects before the end. With object
+    storage the client is redirected to a short-lived presigned URL instead.
+    """
+    key = product_file.file_url
+    size = await run_in_threadpool(storage.size, key)
+    if size is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    etag = f'"{product_file.checksum}"' if product_file.checksum else f'"{product_file.id}-{size}"'
+    last_modified = http_date(product_file.updated_at)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-transform",
+        "Content-Disposition": content_disposition(product_file.file_name),
+    }
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    byte_range = parse_range(request, size, etag, last_modified) if size else None
+    start, end = byte_range if byte_range else (0, size - 1)
+    counts = start == 0 or not transaction.download_count
+
+    if counts and not reserve_download(db, transaction.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Download limit reached")
+
+    path = storage.local_path(key)
+    if path is None:
+        # The bucket serves the bytes (and Range) itself; completion is not observable
+        url = await run_in_threadpool(
+            partial(
+                storage.presigned_url,
+                key,
+                filename=product_file.file_name,
+                content_type=product_file.file_type,
+            )
+        )
+        return RedirectResponse(
+            url,
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": "no-store"},
+        )
+
+    if settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX:
+        # The front proxy streams the file with sendfile and handles Range itself
+        headers["X-Accel-Redirect"] = settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX + product_file.file_url
+        return Response(headers=headers, media_type=product_file.file_type)
+
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return FileRangeResponse(
+        path,
+        start,
+        end,
+        status_code=status_code,
+        headers=headers,
+        media_type=product_file.file_type or "application/octet-stream",
+        on_abort=partial(release_download, transaction.id) if counts else None,
+    )
@@ -0,0 +1,148 @@
+"""
+Purchase Entitlements: which products a user has bought, cached per user in Redis
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.models.transaction import Transaction, TransactionArchive, TransactionStatus
+
+KEY = "entitlements:{}"
+
+# Member present in every warmed set: an empty purchase history still
+# caches, and sets written only by grants are told apart from warmed ones
+WARM = "0"
+
+
+def _key(user_id: int) -> str:
+    return KEY.format(user_id)
+
+
+def load_owned(db: Session, user_ids: Sequence[int]) -> Dict[int, Set[int]]:
+    """Products of each user with a completed purchase, live or archived"""
+    owned: Dict[int, Set[int]] = {user_id: set() for user_id in user_ids}
+    for model in (Transaction, TransactionArchive):
+        rows = (
+            db.query(model.buyer_id, model.product_id)
+            .filter(
+                model.buyer_id.in_(list(user_ids)),
+                model.status == TransactionStatus.COMPLETED,
+            )
+            .distinct()
+        )
+        for buyer_id, product_id in rows:
+            owned[buyer_id].add(product_id)
+    return owned
+
+
+async def _warm(db: Session, user_id: int) -> Set[int]:
+    """
+    Load the user's set from the database. Members are only ever added here
+    (never replaced), so a grant racing with the load cannot be lost.
+    """
+    owned = load_owned(db, [user_id])[user_id]
+    key = _key(user_id)
+    pipe = redis_client.redis.pipeline(transaction=True)
+    pipe.sadd(key, WARM, *owned)
+    pipe.expire(key, settings.ENTITLEMENT_CACHE_TTL)
+    await pipe.execute()
+    return owned
+
+
+async def owned_products(db: Session, user_id: int, product_ids: Sequence[int]) -> Set[int]:
+    """
+    Which of ``product_ids`` the user has bought, in one Redis round trip
+    (a whole listing page at once). The user's set is loaded from the
+    database on first use; without Redis the database answers directly.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return set()
+    if redis_client.redis is None:
+        owned = set()
+        for model in (Transaction, TransactionArchive):
+            rows = (
+                db.query(model.product_id)
+                .filter(
+                    model.buyer_id == user_id,
+                    model.product_id.in_(product_ids),
+                    model.status == TransactionStatus.COMPLETED,
+                )
+                .distinct()
+            )
+            owned.update(product_id for (product_id,) in rows)
+        return owned
+
+    flags = await redis_client.redis.smismember(_key(user_id), [WARM, *product_ids])
+    if flags[0]:
+        return {product_id for product_id, flag in zip(product_ids, flags[1:]) if flag}
+    return await _warm(db, user_id) & set(product_ids)
+
+
+async def has_purchased(db: Session, user_id: int, product_id: int) -> bool:
+    return product_id in await owned_products(db, user_id, [product_id])
+
+
+def grant(redis_conn, purchases: Iterable[Tuple[int, int]]) -> None:
+    """
+    Add completed (buyer, product) purchases to cached sets (settlement).
+    Sets not warmed yet only gain members; they are rebuilt on first read.
+    """
+    by_user: Dict[int, List[int]] = defaultdict(list)
+    for buyer_id, product_id in purchases:
+        by_user[buyer_id].append(product_id)
+    if not by_user:
+        return
+    pipe = redis_conn.pipeline(transaction=False)
+    for buyer_id, product_ids in by_user.items():
+        pipe.sadd(_key(buyer_id), *product_ids)
+        pipe.expire(_key(buyer_id), settings.ENTITLEMENT_CACHE_TTL)
+    pipe.execute()
+
+
+def revoke(redis_conn, user_ids: Iterable[int]) -> None:
+    """
+    Drop cached sets after purchases were refunded or cancelled; they are
+    rebuilt from the database on next use, which keeps products bought
+    twice (one purchase still standing) correct
+    """
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        redis_conn.delete(*keys)
+
+
+def reconcile(db: Session, redis_conn) -> Dict[str, int]:
+    """
+    Compare every warmed set with the database, ``ENTITLEMENT_RECONCILE_BATCH``
+    users at a time, and drop the ones that drifted so they are reloaded.
+    Dropping rather than rewriting means a purchase settled while this runs
+    is never lost: at worst its set is reloaded once more.
+    """
+    stats = {"checked": 0, "repaired": 0}
+    batch: List[int] = []
+
+    def check(user_ids: List[int]) -> None:
+        owned = load_owned(db, user_ids)
+        pipe = redis_conn.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.smembers(_key(user_id))
+        drifted = [
+            user_id
+            for user_id, members in zip(user_ids, pipe.execute())
+            if WARM in members and members != {WARM, *map(str, owned[user_id])}
+        ]
+        revoke(redis_conn, drifted)
+        stats["checked"] += len(user_ids)
+        stats["repaired"] += len(drifted)
+
+    for key in redis_conn.scan_iter(match=KEY.format("*"), count=settings.ENTITLEMENT_RECONCILE_BATCH):
+        batch.append(int(key.rsplit(":", 1)[1]))
+        if len(batch) >= settings.ENTITLEMENT_RECONCILE_BATCH:
+            check(batch)
+            batch = []
+    if batch:
+        check(batch)
+    return stats
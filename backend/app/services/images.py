@@ -0,0 +1,162 @@
+"""
+Image Derivatives (thumbnails and WebP variants of product screenshots)
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.storage import storage
+from app.services.blob_store import BlobStore
+
+# Bounding box (longest side) of each derivative, largest first
+DERIVATIVE_SIZES = {
+    "large": 1280,
+    "card": 480,
+    "thumb": 160,
+}
+
+# Encoder settings; metadata (EXIF, ICC, XMP) is never passed to the encoders
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+MANIFEST_NAME = "derivatives.json"
+VARIANT_RE = re.compile(r"^(%s)\.(%s)$" % ("|".join(DERIVATIVE_SIZES), "|".join(FORMATS)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def derivatives_key(checksum: str) -> str:
+    """Storage prefix holding a source's derivatives"""
+    return f"derivatives/{checksum[:2]}/{checksum[2:4]}/{checksum}"
+
+
+def variant_key(checksum: str, variant: str) -> Optional[str]:
+    """Storage key of a derivative such as ``card.webp``, None for unknown names"""
+    if not VARIANT_RE.match(variant):
+        return None
+    return f"{derivatives_key(checksum)}/{variant}"
+
+
+def image_url(checksum: str, variant: str) -> str:
+    return f"/api/v1/upload/images/{checksum}/{variant}"
+
+
+def _store(key: str, content_type: str, write) -> None:
+    os.makedirs(storage.staging_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=storage.staging_dir, prefix=".derivative-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        storage.put_file(temp_path, key, content_type)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def render_derivatives(checksum: str) -> dict:
+    """
+    Decode one stored image and write every size in every format (blocking,
+    runs in the process pool).
+
+    JPEGs are decoded with ``draft`` so the decoder downscales by up to 8x
+    while reading, which is most of the saving on large photos. Derivatives
+    are resized from the previous (larger) one. Output is cached: an existing
+    manifest under the source's derivatives prefix is returned as is.
+    """
+    prefix = derivatives_key(checksum)
+    manifest_key = f"{prefix}/{MANIFEST_NAME}"
+    if storage.exists(manifest_key):
+        with storage.open(manifest_key) as fh:
+            return json.load(fh)
+
+    Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+    with storage.open(BlobStore.key_for(checksum)) as fh, Image.open(fh) as source:
+        width, height = source.size
+        largest = max(DERIVATIVE_SIZES.values())
+        if source.format == "JPEG":
+            source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+    variants = {}
+    for name, box in DERIVATIVE_SIZES.items():
+        image.thumbnail((box, box), Image.LANCZOS, reducing_gap=3.0)
+        for fmt, (encoder, content_type, options) in FORMATS.items():
+            _store(
+                f"{prefix}/{name}.{fmt}",
+                content_type,
+                lambda out: image.save(out, encoder, **options),
+            )
+        variants[name] = {"width": image.width, "height": image.height}
+
+    # Written last: its presence marks the derivative set as complete
+    manifest = {"width": width, "height": height, "variants": variants}
+    _store(manifest_key, "application/json", lambda out: out.write(json.dumps(manifest).encode()))
+    return manifest
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by the worker process, created on first use (after
+    gunicorn forks) with the spawn start method so no event loop or DB
+    connections are inherited.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def generate_derivatives(checksum: str) -> dict:
+    """
+    Build (or load cached) derivatives for a stored image, with public URLs
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        manifest = await loop.run_in_executor(get_pool(), render_derivatives, checksum)
+    except BrokenProcessPool:
+        shutdown_pool()  # a worker died (e.g. OOM); start a fresh pool next time
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image processing is temporarily unavailable"
+        )
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, OSError):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="File is not a supported image"
+        )
+
+    urls = {
+        name: {fmt: image_url(checksum, f"{name}.{fmt}") for fmt in FORMATS}
+        for name in manifest["variants"]
+    }
+    return {**manifest, "urls": urls}
@@ -1,40 +1,421 @@
-"""Payment service handling VNPay and PayPal integrations."""
+"""
+Payment Gateways: VNPay, PayPal and Stripe adapters over a shared HTTP pool
+"""
+import abc
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import time
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Dict, Optional
 from urllib.parse import urlencode
-import hmac
-import hashlib
-from typing import Dict
+
+import httpx
+from fastapi import HTTPException, Request, status
 
 from app.core.config import settings
+from app.models.transaction import PaymentMethod, Transaction
+from app.services.currency import convert, get_rates
 
+# Currencies Stripe expects in whole units rather than cents
+ZERO_DECIMAL_CURRENCIES = {"BIF", "CLP", "JPY", "KRW", "PYG", "VND", "XAF", "XOF"}
 
-def create_vnpay_payment(transaction_id: str, amount: float, return_url: str) -> str:
-    """Generate VNPay payment URL."""
-    params = {
-        "vnp_Version": "2.1.0",
-        "vnp_Command": "pay",
-        "vnp_TmnCode": settings.VNPAY_TMN_CODE,
-        "vnp_Amount": int(amount * 100),
-        "vnp_CreateDate": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
-        "vnp_CurrCode": "VND",
-        "vnp_TxnRef": transaction_id,
-        "vnp_OrderInfo": f"Payment for transaction {transaction_id}",
-        "vnp_ReturnUrl": return_url,
-    }
-    query = urlencode(sorted(params.items()))
-    secure_hash = hmac.new(
-        settings.VNPAY_HASH_SECRET.encode(), query.encode(), hashlib.sha512
-    ).hexdigest()
-    return f"{settings.VNPAY_URL}?{query}&vnp_SecureHash={secure_hash}"
 
+@dataclass
+class PaymentSession:
+    """Where to send the buyer, and the gateway's id for the payment if it has one"""
+    payment_url: str
+    gateway_id: Optional[str] = None
+
+
+@dataclass
+class GatewayVerification:
+    """Outcome of a payment, as authenticated by its gateway"""
+    transaction_id: str
+    succeeded: bool
+    gateway_id: Optional[str] = None
+
+
+def invalid_verification(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class CircuitBreaker:
+    """
+    Fails fast after ``PAYMENT_BREAKER_FAILURES`` consecutive failures. After
+    ``PAYMENT_BREAKER_RESET`` seconds one trial call is let through: success
+    closes the breaker, failure keeps it open for another period.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < settings.PAYMENT_BREAKER_RESET:
+            return False
+        self.probing = True
+        return True
 
-def create_paypal_payment(transaction_id: str, amount: float, return_url: str, cancel_url: str) -> Dict[str, str]:
-    """Create a PayPal payment.
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
 
-    Note: This is a placeholder implementation. In production, integrate the official
-    PayPal SDK and return the approval URL from the created payment.
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= settings.PAYMENT_BREAKER_FAILURES:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """A trial call ended without an outcome (cancelled)"""
+        self.probing = False
+
+
+class GatewayPool:
+    """
+    One ``httpx.AsyncClient`` per event loop shared by every gateway, so
+    connections (and TLS sessions) are kept alive between checkouts
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.PAYMENT_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.PAYMENT_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+class PaymentGateway(abc.ABC):
     """
-    return {
-        "approval_url": f"https://www.sandbox.paypal.com/checkoutnow?token={transaction_id}",
-        "transaction_id": transaction_id,
+    Base adapter. ``_send`` makes one gateway call with the gateway's
+    timeout, retrying connection errors, timeouts, 429 and 5xx responses
+    with jittered exponential backoff, all within
+    ``PAYMENT_GATEWAY_DEADLINE`` seconds. Calls fail fast with 503 while
+    the gateway's circuit breaker is open.
+    """
+    label = "Payment gateway"
+
+    def __init__(self, pool: GatewayPool, timeout: float = 10.0):
+        self.pool = pool
+        self.timeout = timeout
+        self.breaker = CircuitBreaker()
+
+    @abc.abstractmethod
+    async def create_payment(self, transaction: Transaction, return_url: str, cancel_url: str) -> PaymentSession:
+        """Start a payment and return where the buyer completes it"""
+
+    @abc.abstractmethod
+    async def verify(self, request: Request) -> Optional[GatewayVerification]:
+        """
+        Authenticate a payment notification (redirect parameters, webhook,
+        or the gateway's own API). 400 when it can't be trusted; None when it
+        carries no verdict yet.
+        """
+
+    def _unavailable(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{self.label} is unavailable, try again later"
+        )
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.PAYMENT_GATEWAY_DEADLINE
+        for attempt in range(settings.PAYMENT_RETRY_ATTEMPTS):
+            if not self.breaker.allow():
+                raise self._unavailable()
+            timeout = min(self.timeout, deadline - loop.time())
+            try:
+                response = await self.pool.client.request(
+                    method,
+                    url,
+                    timeout=httpx.Timeout(timeout, connect=min(timeout, settings.PAYMENT_CONNECT_TIMEOUT)),
+                    **kwargs
+                )
+            except httpx.TransportError:
+                self.breaker.record_failure()
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    self.breaker.record_success()
+                    if response.is_error:
+                        raise HTTPException(
+                            status_code=status.HTTP_502_BAD_GATEWAY,
+                            detail=f"{self.label} rejected the payment"
+                        )
+                    return response
+                self.breaker.record_failure()
+
+            delay = random.uniform(0, settings.PAYMENT_RETRY_BACKOFF * 2 ** attempt)
+            if loop.time() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"{self.label} did not respond, try again later"
+        )
+
+
+class VNPayGateway(PaymentGateway):
+    """
+    Signed redirect URL; VNPay is only contacted by the buyer's browser.
+    VNPay charges in VND (amount times 100), so other currencies are
+    converted at the current rate. Results (return URL and IPN) carry the
+    same HMAC-SHA512 signature over their ``vnp_`` parameters.
+    """
+    label = "VNPay"
+
+    @staticmethod
+    def sign(params: Dict[str, object]) -> str:
+        query = urlencode(sorted(params.items()))
+        return hmac.new(settings.VNPAY_HASH_SECRET.encode(), query.encode(), hashlib.sha512).hexdigest()
+
+    async def verify(self, request: Request) -> Optional[GatewayVerification]:
+        params = dict(request.query_params)
+        if request.method == "POST" and "vnp_SecureHash" not in params:
+            params = dict(await request.form())
+        params = {name: value for name, value in params.items() if name.startswith("vnp_")}
+        received = params.pop("vnp_SecureHash", "")
+        params.pop("vnp_SecureHashType", None)
+        if not settings.VNPAY_HASH_SECRET or not hmac.compare_digest(self.sign(params), received.lower()):
+            raise invalid_verification("Invalid VNPay signature")
+        if not params.get("vnp_TxnRef"):
+            raise invalid_verification("VNPay result names no transaction")
+        return GatewayVerification(
+            params["vnp_TxnRef"],
+            params.get("vnp_ResponseCode") == "00" and params.get("vnp_TransactionStatus", "00") == "00",
+            params.get("vnp_TransactionNo"),
+        )
+
+    async def create_payment(self, transaction: Transaction, return_url: str, cancel_url: str) -> PaymentSession:
+        transaction_id = transaction.transaction_id
+        amount = convert(transaction.amount, transaction.currency or settings.BASE_CURRENCY, "VND", await get_rates())
+        params = {
+            "vnp_Version": "2.1.0",
+            "vnp_Command": "pay",
+            "vnp_TmnCode": settings.VNPAY_TMN_CODE,
+            "vnp_Amount": int(round(amount)) * 100,
+            "vnp_CreateDate": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+            "vnp_CurrCode": "VND",
+            "vnp_TxnRef": transaction_id,
+            "vnp_OrderInfo": f"Payment for transaction {transaction_id}",
+            "vnp_ReturnUrl": return_url,
+        }
+        query = urlencode(sorted(params.items()))
+        return PaymentSession(f"{settings.VNPAY_URL}?{query}&vnp_SecureHash={self.sign(params)}")
+
+
+class PayPalGateway(PaymentGateway):
+    """
+    Orders v2 API; the OAuth access token is cached until shortly before it
+    expires. Payments are verified by looking the order up (and capturing it
+    once approved) with our own credentials, never from client input.
+    """
+    label = "PayPal"
+
+    def __init__(self, pool: GatewayPool, timeout: float = 10.0):
+        super().__init__(pool, timeout)
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+
+    async def _access_token(self) -> str:
+        if self._token is None or time.monotonic() >= self._token_expires:
+            response = await self._send(
+                "POST",
+                f"{settings.PAYPAL_API_URL}/v1/oauth2/token",
+                auth=(settings.PAYPAL_CLIENT_ID, settings.PAYPAL_CLIENT_SECRET),
+                data={"grant_type": "client_credentials"},
+            )
+            body = response.json()
+            self._token = body["access_token"]
+            self._token_expires = time.monotonic() + int(body.get("expires_in", 3600)) - 60
+        return self._token
+
+    async def create_payment(self, transaction: Transaction, return_url: str, cancel_url: str) -> PaymentSession:
+        token = await self._access_token()
+        response = await self._send(
+            "POST",
+            f"{settings.PAYPAL_API_URL}/v2/checkout/orders",
+            headers={
+                "Authorization": f"Bearer {token}",
+                # Retries of the same transaction return the same order
+                "PayPal-Request-Id": transaction.transaction_id,
+            },
+            json={
+                "intent": "CAPTURE",
+                "purchase_units": [{
+                    "reference_id": transaction.transaction_id,
+                    "custom_id": transaction.transaction_id,
+                    "amount": {
+                        "currency_code": transaction.currency,
+                        "value": f"{transaction.amount:.2f}",
+                    },
+                }],
+                "application_context": {"return_url": return_url, "cancel_url": cancel_url},
+            },
+        )
+        order = response.json()
+        for link in order.get("links", []):
+            if link.get("rel") in ("approve", "payer-action"):
+                return PaymentSession(link["href"], order.get("id"))
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="PayPal returned no approval link"
+        )
+
+    async def verify(self, request: Request) -> Optional[GatewayVerification]:
+        # PayPal sends the buyer back with ?token=<order id>
+        order_id = request.query_params.get("token") or request.query_params.get("order_id")
+        if not order_id or not order_id.isalnum():
+            raise invalid_verification("PayPal order id is missing")
+        token = await self._access_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        url = f"{settings.PAYPAL_API_URL}/v2/checkout/orders/{order_id}"
+        order = (await self._send("GET", url, headers=headers)).json()
+        if order.get("status") == "APPROVED":
+            order = (await self._send(
+                "POST",
+                f"{url}/capture",
+                # A retried capture returns the first capture's result
+                headers={**headers, "PayPal-Request-Id": f"capture-{order_id}", "Content-Type": "application/json"},
+            )).json()
+
+        units = order.get("purchase_units") or [{}]
+        transaction_id = units[0].get("reference_id") or units[0].get("custom_id")
+        if not transaction_id:
+            raise invalid_verification("PayPal order names no transaction")
+        if order.get("status") == "COMPLETED":
+            return GatewayVerification(transaction_id, True, order_id)
+        if order.get("status") == "VOIDED":
+            return GatewayVerification(transaction_id, False, order_id)
+        return None  # not approved by the buyer yet
+
+
+class StripeGateway(PaymentGateway):
+    """Hosted Checkout Sessions; results arrive as signed webhook events"""
+    label = "Stripe"
+
+    # Checkout Session events that settle a payment, and whether they mean success
+    EVENTS = {
+        "checkout.session.completed": True,
+        "checkout.session.async_payment_succeeded": True,
+        "checkout.session.async_payment_failed": False,
+        "checkout.session.expired": False,
     }
+
+    @staticmethod
+    def check_signature(payload: bytes, header: str, now: Optional[float] = None) -> None:
+        """
+        ``Stripe-Signature: t=<unix time>,v1=<hex>``: HMAC-SHA256 of
+        ``"<t>.<payload>"`` with the endpoint's signing secret, within
+        ``STRIPE_WEBHOOK_TOLERANCE`` seconds
+        """
+        timestamp, signatures = None, []
+        for item in header.split(","):
+            name, _, value = item.strip().partition("=")
+            if name == "t":
+                timestamp = value
+            elif name == "v1":
+                signatures.append(value)
+        if not settings.STRIPE_WEBHOOK_SECRET or not timestamp or not timestamp.isdigit() or not signatures:
+            raise invalid_verification("Invalid Stripe signature")
+        expected = hmac.new(
+            settings.STRIPE_WEBHOOK_SECRET.encode(), timestamp.encode() + b"." + payload, hashlib.sha256
+        ).hexdigest()
+        if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+            raise invalid_verification("Invalid Stripe signature")
+        if abs((now or time.time()) - int(timestamp)) > settings.STRIPE_WEBHOOK_TOLERANCE:
+            raise invalid_verification("Stripe event is too old")
+
+    async def verify(self, request: Request) -> Optional[GatewayVerification]:
+        payload = await request.body()
+        self.check_signature(payload, request.headers.get("Stripe-Signature", ""))
+        try:
+            event = json.loads(payload)
+            session = event["data"]["object"]
+        except (ValueError, KeyError, TypeError):
+            raise invalid_verification("Malformed Stripe event")
+
+        succeeded = self.EVENTS.get(event.get("type"))
+        if succeeded is None or not session.get("client_reference_id"):
+            return None
+        if succeeded and session.get("payment_status") not in ("paid", "no_payment_required"):
+            return None  # delayed payment method: wait for async_payment_succeeded
+        return GatewayVerification(session["client_reference_id"], succeeded, session.get("id"))
+
+    async def create_payment(self, transaction: Transaction, return_url: str, cancel_url: str) -> PaymentSession:
+        currency = transaction.currency.upper()
+        unit_amount = transaction.amount if currency in ZERO_DECIMAL_CURRENCIES else transaction.amount * 100
+        response = await self._send(
+            "POST",
+            f"{settings.STRIPE_API_URL}/v1/checkout/sessions",
+            auth=(settings.STRIPE_SECRET_KEY, ""),
+            # Retries of the same transaction return the same session
+            headers={"Idempotency-Key": transaction.transaction_id},
+            data={
+                "mode": "payment",
+                "client_reference_id": transaction.transaction_id,
+                "success_url": return_url,
+                "cancel_url": cancel_url,
+                "line_items[0][quantity]": 1,
+                "line_items[0][price_data][currency]": currency.lower(),
+                "line_items[0][price_data][unit_amount]": int(round(unit_amount)),
+                "line_items[0][price_data][product_data][name]": f"Transaction {transaction.transaction_id}",
+            },
+        )
+        session = response.json()
+        return PaymentSession(session["url"], session.get("id"))
+
+
+class PaymentGateways:
+    """Adapters by payment method, sharing one connection pool"""
+
+    def __init__(self):
+        self.pool = GatewayPool()
+        self.adapters: Dict[PaymentMethod, PaymentGateway] = {
+            PaymentMethod.VNPAY: VNPayGateway(self.pool),
+            PaymentMethod.PAYPAL: PayPalGateway(self.pool, settings.PAYPAL_TIMEOUT),
+            PaymentMethod.STRIPE: StripeGateway(self.pool, settings.STRIPE_TIMEOUT),
+        }
+
+    def get(self, method: PaymentMethod) -> PaymentGateway:
+        adapter = self.adapters.get(method)
+        if adapter is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Payment method {getattr(method, 'value', method)} is not supported"
+            )
+        return adapter
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+# Global gateways instance
+gateways = PaymentGateways()
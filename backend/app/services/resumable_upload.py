@@ -0,0 +1,281 @@
+"""
+Resumable Chunked Uploads (tus-style)
+"""
+import base64
+import hashlib
+import os
+import time
+import uuid
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.services.blob_store import blob_store
+from app.services.upload import StoredUpload, sniff_content_type, validate_filename, SNIFF_SIZE
+
+SESSION_KEY = "upload:session:{}"
+CHUNKS_KEY = "upload:session:{}:chunks"
+COMPLETING_KEY = "upload:session:{}:completing"
+
+# Read size when hashing the assembled file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def parts_dir() -> str:
+    """Directory holding partially uploaded files"""
+    return os.path.join(settings.UPLOAD_DIR, ".resumable")
+
+
+def part_path(upload_id: str) -> str:
+    return os.path.join(parts_dir(), f"{upload_id}.part")
+
+
+def _allocate(path: str, size: int) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.truncate(size)  # sparse file, chunks are written in place
+
+
+def _pwrite(path: str, data: bytes, offset: int) -> None:
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        os.pwrite(fd, data, offset)
+    finally:
+        os.close(fd)
+
+
+def _hash_file(path: str) -> tuple:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        head = fh.read(SNIFF_SIZE)
+        hasher.update(head)
+        for block in iter(lambda: fh.read(HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest(), head
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def parse_checksum_header(value: Optional[str]) -> Optional[bytes]:
+    """
+    Parse a tus ``Upload-Checksum: sha256 <base64>`` header
+    """
+    if not value:
+        return None
+    algorithm, _, encoded = value.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only sha256 chunk checksums are supported"
+        )
+    try:
+        return base64.b64decode(encoded)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid checksum")
+
+
+class ResumableUploadService:
+    """
+    Upload sessions whose chunks may arrive in any order and in parallel.
+
+    Session metadata and the set of received chunk indexes live in Redis and
+    expire after ``UPLOAD_SESSION_TTL`` of inactivity. Chunk bytes are written
+    straight to their final offset in a preallocated part file, so completing
+    an upload needs no copy, only one hashing pass and a move into the blob store.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+
+    async def create(
+        self,
+        filename: str,
+        size: int,
+        chunk_size: Optional[int] = None,
+        product_id: Optional[int] = None
+    ) -> dict:
+        """
+        Open a new upload session
+        """
+        validate_filename(filename)
+        if size <= 0 or size > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds the {settings.MAX_UPLOAD_SIZE} byte limit"
+            )
+        if redis_client.redis is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Resumable uploads are unavailable"
+            )
+
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        chunk_size = max(settings.UPLOAD_CHUNK_MIN_SIZE, min(chunk_size, settings.UPLOAD_CHUNK_MAX_SIZE))
+        session = {
+            "upload_id": uuid.uuid4().hex,
+            "filename": os.path.basename(filename),
+            "size": size,
+            "chunk_size": chunk_size,
+            "total_chunks": -(-size // chunk_size),
+            "user_id": self.user_id,
+            "product_id": product_id,
+            "created_at": int(time.time()),
+        }
+        await run_in_threadpool(_allocate, part_path(session["upload_id"]), size)
+        await redis_client.set_json(
+            SESSION_KEY.format(session["upload_id"]), session, settings.UPLOAD_SESSION_TTL
+        )
+        return session
+
+    async def get_session(self, upload_id: str) -> dict:
+        """
+        Load a session owned by the current user
+        """
+        session = await redis_client.get_json(SESSION_KEY.format(upload_id))
+        if not session or session["user_id"] != self.user_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+        return session
+
+    async def received_chunks(self, upload_id: str) -> List[int]:
+        members = await redis_client.smembers(CHUNKS_KEY.format(upload_id))
+        return sorted(int(index) for index in members)
+
+    async def status(self, upload_id: str) -> dict:
+        """
+        Offset query: contiguous bytes received plus the chunks still missing
+        """
+        session = await self.get_session(upload_id)
+        received = set(await self.received_chunks(upload_id))
+        missing = [i for i in range(session["total_chunks"]) if i not in received]
+
+        contiguous = missing[0] if missing else session["total_chunks"]
+        offset = min(contiguous * session["chunk_size"], session["size"])
+        return {
+            **session,
+            "offset": offset,
+            "received_chunks": len(received),
+            "missing_chunks": missing,
+        }
+
+    async def append(
+        self,
+        upload_id: str,
+        offset: int,
+        body: AsyncIterator[bytes],
+        checksum: Optional[bytes] = None
+    ) -> dict:
+        """
+        Write one chunk at ``offset`` (must be chunk-aligned)
+        """
+        session = await self.get_session(upload_id)
+        chunk_size = session["chunk_size"]
+        if offset < 0 or offset % chunk_size or offset >= session["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload-Offset must be a multiple of {chunk_size} within the file"
+            )
+        index = offset // chunk_size
+        expected = min(chunk_size, session["size"] - offset)
+
+        path = part_path(upload_id)
+        hasher = hashlib.sha256() if checksum is not None else None
+        written = 0
+        async for data in body:
+            if not data:
+                continue
+            if written + len(data) > expected:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Chunk {index} must be exactly {expected} bytes"
+                )
+            if hasher is not None:
+                hasher.update(data)
+            await run_in_threadpool(_pwrite, path, data, offset + written)
+            written += len(data)
+
+        if written != expected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Chunk {index} must be exactly {expected} bytes"
+            )
+        if hasher is not None and hasher.digest() != checksum:
+            raise HTTPException(
+                status_code=460,  # tus "Checksum Mismatch"
+                detail="Chunk checksum mismatch"
+            )
+
+        await redis_client.sadd(CHUNKS_KEY.format(upload_id), str(index))
+        await redis_client.expire(SESSION_KEY.format(upload_id), settings.UPLOAD_SESSION_TTL)
+        await redis_client.expire(CHUNKS_KEY.format(upload_id), settings.UPLOAD_SESSION_TTL)
+        return {"upload_id": upload_id, "chunk": index, "size": written}
+
+    async def complete(self, upload_id: str) -> StoredUpload:
+        """
+        Verify all chunks arrived, hash the file and move it into the blob store
+        """
+        session = await self.get_session(upload_id)
+        received = await redis_client.scard(CHUNKS_KEY.format(upload_id))
+        if received < session["total_chunks"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{session['total_chunks'] - received} chunks are still missing"
+            )
+        if not await redis_client.set(COMPLETING_KEY.format(upload_id), "1", expire=300, nx=True):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload is already completing")
+
+        source = part_path(upload_id)
+        checksum, head = await run_in_threadpool(_hash_file, source)
+        content_type = sniff_content_type(head, session["filename"])
+        deduplicated = await run_in_threadpool(blob_store.commit, source, checksum, content_type)
+
+        await redis_client.delete(SESSION_KEY.format(upload_id))
+        await redis_client.delete(CHUNKS_KEY.format(upload_id))
+        await redis_client.delete(COMPLETING_KEY.format(upload_id))
+        return StoredUpload(
+            filename=session["filename"],
+            stored_as=blob_store.key_for(checksum),
+            size=session["size"],
+            checksum=checksum,
+            content_type=content_type,
+            deduplicated=deduplicated,
+        )
+
+    async def abort(self, upload_id: str) -> None:
+        """
+        Cancel a session and drop its partial data
+        """
+        await self.get_session(upload_id)
+        await redis_client.delete(SESSION_KEY.format(upload_id))
+        await redis_client.delete(CHUNKS_KEY.format(upload_id))
+        await run_in_threadpool(_remove, part_path(upload_id))
+
+
+def purge_abandoned_uploads(redis_conn) -> int:
+    """
+    Delete part files whose session expired (run from a worker with a sync client)
+    """
+    directory = parts_dir()
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+    for name in os.listdir(directory):
+        if not name.endswith(".part"):
+            continue
+        upload_id = name[:-len(".part")]
+        path = os.path.join(directory, name)
+        if redis_conn.exists(SESSION_KEY.format(upload_id)):
+            continue
+        if os.path.getmtime(path) > cutoff:
+            continue  # written recently, session may have been created just now
+        _remove(path)
+        removed += 1
+    return removed
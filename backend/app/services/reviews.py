@@ -0,0 +1,136 @@
+"""
+Reviews: paginated listings in several sort modes, and helpfulness votes
+"""
+import math
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.models.review import Review, ReviewVote
+from app.models.user import User
+
+# Each mode is served by one of the (product_id, ...) indexes on reviews
+SORTS = {
+    "newest": (Review.created_at.desc(), Review.id.desc()),
+    "highest": (Review.rating.desc(), Review.created_at.desc(), Review.id.desc()),
+    "lowest": (Review.rating.asc(), Review.created_at.desc(), Review.id.desc()),
+    "most_helpful": (Review.helpful_score.desc(), Review.created_at.desc(), Review.id.desc()),
+}
+
+FIRST_PAGE_KEY = "reviews:first_page:{}:{}"  # product, sort -> "<etag>\n<json>"
+
+# 95% confidence
+WILSON_Z = 1.96
+
+
+def wilson_lower_bound(positive: int, negative: int) -> float:
+    """
+    Lower bound of the Wilson score interval for the share of helpful votes:
+    a review with 40 of 50 helpful votes outranks one with 2 of 2
+    """
+    total = positive + negative
+    if total == 0:
+        return 0.0
+    z2 = WILSON_Z * WILSON_Z
+    share = positive / total
+    margin = WILSON_Z * math.sqrt((share * (1 - share) + z2 / (4 * total)) / total)
+    return (share + z2 / (2 * total) - margin) / (1 + z2 / total)
+
+
+def rescore_reviews(db: Session) -> int:
+    """
+    Recompute ``helpful_score`` of every review from its vote counts, one
+    UPDATE per distinct (helpful, not helpful) pair (``updated_at`` is kept:
+    the review itself did not change)
+    """
+    helpful = func.coalesce(Review.helpful_count, 0)
+    not_helpful = func.coalesce(Review.not_helpful_count, 0)
+    updated = 0
+    for positive, negative in db.query(helpful, not_helpful).distinct().all():
+        updated += (
+            db.query(Review)
+            .filter(helpful == positive, not_helpful == negative)
+            .update(
+                {
+                    Review.helpful_score: wilson_lower_bound(positive, negative),
+                    Review.updated_at: Review.updated_at,
+                },
+                synchronize_session=False,
+            )
+        )
+    return updated
+
+
+def list_page(db: Session, product_id: int, sort: str, skip: int, limit: int) -> List[Review]:
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORTS)}")
+    return (
+        db.query(Review)
+        .filter(Review.product_id == product_id)
+        .order_by(*SORTS[sort])
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+async def cached_first_page(product_id: int, sort: str, etag: str) -> Optional[str]:
+    """The cached first page, if it was stored for this version of the reviews"""
+    cached = await redis_client.get(FIRST_PAGE_KEY.format(product_id, sort))
+    if cached:
+        version, _, body = cached.partition("\n")
+        if version == etag:
+            return body
+    return None
+
+
+async def store_first_page(product_id: int, sort: str, etag: str, body: str) -> None:
+    await redis_client.set(
+        FIRST_PAGE_KEY.format(product_id, sort), f"{etag}\n{body}", expire=settings.REVIEW_CACHE_TTL
+    )
+
+
+async def invalidate_first_pages(product_id: int) -> None:
+    """
+    Drop the product's cached first pages (new review, vote). Entries are
+    also keyed by the reviews' version, so a missed call only costs memory.
+    """
+    if redis_client.redis is not None:
+        await redis_client.redis.delete(*(FIRST_PAGE_KEY.format(product_id, sort) for sort in SORTS))
+
+
+def record_vote(db: Session, review_id: int, user: User, helpful: bool) -> Review:
+    """
+    Add or change the user's vote and refresh the review's counts and
+    ``helpful_score``. The review row is locked, so concurrent votes on it
+    apply one after the other.
+    """
+    review = db.query(Review).filter(Review.id == review_id).with_for_update().first()
+    if not review:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
+    if review.reviewer_id == user.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You cannot vote on your own review")
+
+    vote = db.get(ReviewVote, (review_id, user.id))
+    if vote is not None and vote.helpful == helpful:
+        db.commit()
+        return review
+    if vote is None:
+        db.add(ReviewVote(review_id=review_id, user_id=user.id, helpful=helpful))
+    else:
+        vote.helpful = helpful
+        if helpful:
+            review.not_helpful_count = (review.not_helpful_count or 0) - 1
+        else:
+            review.helpful_count = (review.helpful_count or 0) - 1
+    if helpful:
+        review.helpful_count = (review.helpful_count or 0) + 1
+    else:
+        review.not_helpful_count = (review.not_helpful_count or 0) + 1
+    review.helpful_score = wilson_lower_bound(review.helpful_count, review.not_helpful_count)
+    db.commit()
+    return review
@@ -0,0 +1,304 @@
+"""
+Sales Analytics: per seller and per product rollups of completed sales
+"""
+from collections import defaultdict
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.analytics import SalesRollup
+from app.models.transaction import Transaction, TransactionArchive, TransactionStatus
+
+HOUR = "hour"
+DAY = "day"
+MONTH = "month"
+GRANULARITIES = (HOUR, DAY, MONTH)
+
+# Seller-wide rows use this product id
+ALL_PRODUCTS = 0
+
+# (granularity, seller_id, product_id, bucket) -> [units, gross, commission, net]
+Deltas = Dict[Tuple[str, int, int, datetime], List[float]]
+
+
+def floor_bucket(moment: datetime, granularity: str) -> datetime:
+    if granularity == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_bucket(bucket: datetime, granularity: str) -> datetime:
+    if granularity == HOUR:
+        return bucket + timedelta(hours=1)
+    if granularity == DAY:
+        return bucket + timedelta(days=1)
+    if bucket.month == 12:
+        return bucket.replace(year=bucket.year + 1, month=1)
+    return bucket.replace(month=bucket.month + 1)
+
+
+def add_sale(
+    deltas: Deltas,
+    seller_id: int,
+    product_id: int,
+    completed_at: datetime,
+    gross: float,
+    commission: float,
+    net: float
+) -> None:
+    """Count one completed sale into every bucket it belongs to"""
+    for granularity in GRANULARITIES:
+        bucket = floor_bucket(completed_at, granularity)
+        for product in (product_id, ALL_PRODUCTS):
+            totals = deltas[(granularity, seller_id, product, bucket)]
+            totals[0] += 1
+            totals[1] += gross or 0.0
+            totals[2] += commission or 0.0
+            totals[3] += net or 0.0
+
+
+def new_deltas() -> Deltas:
+    return defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+
+
+def _upsert_statement(db: Session):
+    """INSERT that adds to an existing row instead of failing on its key"""
+    table = SalesRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(
+            units=table.c.units + stmt.inserted.units,
+            gross=table.c.gross + stmt.inserted.gross,
+            commission=table.c.commission + stmt.inserted.commission,
+            net=table.c.net + stmt.inserted.net,
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.seller_id, table.c.product_id, table.c.bucket],
+        set_={
+            "units": table.c.units + stmt.excluded.units,
+            "gross": table.c.gross + stmt.excluded.gross,
+            "commission": table.c.commission + stmt.excluded.commission,
+            "net": table.c.net + stmt.excluded.net,
+        },
+    )
+
+
+def apply_deltas(db: Session, deltas: Deltas) -> None:
+    """
+    Add aggregated sales to the rollups, within the caller's transaction
+    (keys in a fixed order so concurrent writers lock rows consistently)
+    """
+    if not deltas:
+        return
+    rows = [
+        {
+            "granularity": granularity,
+            "seller_id": seller_id,
+            "product_id": product_id,
+            "bucket": bucket,
+            "units": int(units),
+            "gross": round(gross, 2),
+            "commission": round(commission, 2),
+            "net": round(net, 2),
+        }
+        for (granularity, seller_id, product_id, bucket), (units, gross, commission, net)
+        in sorted(deltas.items())
+    ]
+    stmt = _upsert_statement(db)
+    for offset in range(0, len(rows), settings.ANALYTICS_WRITE_BATCH):
+        db.execute(stmt, rows[offset:offset + settings.ANALYTICS_WRITE_BATCH])
+
+
+def rebuild(
+    db: Session,
+    since: Optional[datetime] = None,
+    on_batch: Optional[Callable[[], None]] = None
+) -> Dict[str, int]:
+    """
+    Recompute the rollups from completed transactions (live and archived),
+    all of them or those completed from the month of ``since`` on. Runs in one database
+    transaction; callers keep settlement from running at the same time
+    (``on_batch`` is called every ``ANALYTICS_READ_BATCH`` transactions).
+    """
+    start = floor_bucket(since, MONTH) if since else None
+
+    deleted = db.query(SalesRollup)
+    if start:
+        deleted = deleted.filter(SalesRollup.bucket >= start)
+    deleted.delete(synchronize_session=False)
+
+    deltas = new_deltas()
+    count = 0
+    for model in (Transaction, TransactionArchive):
+        sales = db.query(
+            model.seller_id,
+            model.product_id,
+            model.completed_at,
+            model.amount,
+            model.commission_amount,
+            model.seller_amount,
+        ).filter(
+            model.status == TransactionStatus.COMPLETED,
+            model.completed_at.isnot(None),
+        )
+        if start:
+            sales = sales.filter(model.completed_at >= start)
+
+        for row in sales.yield_per(settings.ANALYTICS_READ_BATCH):
+            add_sale(deltas, *row)
+            count += 1
+            if on_batch and count % settings.ANALYTICS_READ_BATCH == 0:
+                on_batch()
+    apply_deltas(db, deltas)
+    db.commit()
+    return {"transactions": count, "rollups": len(deltas)}
+
+
+def pick_granularity(start: datetime, end: datetime) -> str:
+    span = end - start
+    if span <= timedelta(days=2):
+        return HOUR
+    if span <= timedelta(days=92):
+        return DAY
+    return MONTH
+
+
+def _bucket_range(start: datetime, end: datetime, granularity: str) -> Iterable[datetime]:
+    bucket = floor_bucket(start, granularity)
+    while bucket < end:
+        yield bucket
+        bucket = next_bucket(bucket, granularity)
+
+
+def sales_report(
+    db: Session,
+    seller_id: int,
+    start: datetime,
+    end: datetime,
+    granularity: Optional[str] = None,
+    product_id: Optional[int] = None
+) -> dict:
+    """
+    Sales of a seller (or one of their products) in ``[start, end)``, as a
+    zero-filled series of buckets plus totals. Read from the rollups only,
+    so the cost depends on the number of buckets, not on sales volume.
+    ``start`` and ``end`` are widened to whole buckets.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    granularity = granularity or pick_granularity(start, end)
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    start = floor_bucket(start, granularity)
+    if floor_bucket(end, granularity) != end:
+        end = next_bucket(floor_bucket(end, granularity), granularity)
+    buckets = list(islice(_bucket_range(start, end, granularity), settings.ANALYTICS_MAX_BUCKETS + 1))
+    if len(buckets) > settings.ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {settings.ANALYTICS_MAX_BUCKETS} {granularity} buckets, "
+                   "use a coarser granularity"
+        )
+
+    rows = (
+        db.query(
+            SalesRollup.bucket,
+            SalesRollup.units,
+            SalesRollup.gross,
+            SalesRollup.commission,
+            SalesRollup.net,
+        )
+        .filter(
+            SalesRollup.granularity == granularity,
+            SalesRollup.seller_id == seller_id,
+            SalesRollup.product_id == (product_id or ALL_PRODUCTS),
+            SalesRollup.bucket >= start,
+            SalesRollup.bucket < end,
+        )
+        .all()
+    )
+    found = {row.bucket: row for row in rows}
+
+    series = []
+    totals = {"units": 0, "gross": 0.0, "commission": 0.0, "net": 0.0}
+    for bucket in buckets:
+        row = found.get(bucket)
+        point = {
+            "bucket": bucket,
+            "units": row.units if row else 0,
+            "gross": row.gross if row else 0.0,
+            "commission": row.commission if row else 0.0,
+            "net": row.net if row else 0.0,
+        }
+        series.append(point)
+        for name in totals:
+            totals[name] += point[name]
+
+    return {
+        "seller_id": seller_id,
+        "product_id": product_id,
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "totals": {name: round(value, 2) for name, value in totals.items()},
+        "series": series,
+    }
+
+
+def top_products(
+    db: Session,
+    seller_id: int,
+    start: datetime,
+    end: datetime,
+    limit: int = 10
+) -> List[dict]:
+    """
+    Best-selling products of a seller in ``[start, end)`` (widened to whole
+    days), from the daily rollups
+    """
+    start = floor_bucket(start, DAY)
+    if floor_bucket(end, DAY) != end:
+        end = next_bucket(floor_bucket(end, DAY), DAY)
+    if (end - start).days > settings.ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {settings.ANALYTICS_MAX_BUCKETS} days"
+        )
+    rows = (
+        db.query(
+            SalesRollup.product_id,
+            func.sum(SalesRollup.units).label("units"),
+            func.sum(SalesRollup.gross).label("gross"),
+            func.sum(SalesRollup.net).label("net"),
+        )
+        .filter(
+            SalesRollup.granularity == DAY,
+            SalesRollup.seller_id == seller_id,
+            SalesRollup.product_id != ALL_PRODUCTS,
+            SalesRollup.bucket >= start,
+            SalesRollup.bucket < end,
+        )
+        .group_by(SalesRollup.product_id)
+        .order_by(func.sum(SalesRollup.gross).desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"product_id": row.product_id, "units": int(row.units), "gross": round(row.gross, 2), "net": round(row.net, 2)}
+        for row in rows
+    ]
@@ -0,0 +1,265 @@
+"""
+Payment Settlement: queued verifications applied to the database in batches
+"""
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.user import User
+from app.services import entitlements, sales_analytics
+from app.services.admin_metrics import MetricChanges
+from app.tasks import email as email_tasks
+from app.tasks.base import enqueue
+
+QUEUE_KEY = "settlement:queue"
+LOCK_KEY = "settlement:lock"
+
+# Statuses a verification may still move a transaction out of
+OPEN_STATUSES = (TransactionStatus.PENDING, TransactionStatus.PROCESSING)
+
+
+def verification(transaction_id: str, succeeded: bool, gateway_id: Optional[str] = None) -> dict:
+    return {
+        "transaction_id": transaction_id,
+        "succeeded": succeeded,
+        "gateway_id": gateway_id,
+        "received_at": time.time(),
+    }
+
+
+async def queue_verification(item: dict) -> bool:
+    """
+    Record a gateway verification for the settlement workers (O(1), no DB
+    write). Returns False when Redis is unavailable.
+    """
+    return bool(await redis_client.rpush(QUEUE_KEY, json.dumps(item)))
+
+
+def split_amount(amount: float, commission_rate: float) -> tuple:
+    """(commission, seller share) of a sale, rounded to cents"""
+    commission = round(amount * (commission_rate or 0.0), 2)
+    return commission, round(amount - commission, 2)
+
+
+def settle_batch(db: Session, items: List[dict]) -> Dict[str, list]:
+    """
+    Apply a batch of verifications in one database transaction.
+
+    Transactions still open are completed (with commission split from the
+    seller's ``commission_rate``) or failed; anything else is left alone,
+    so replayed and duplicate verifications are no-ops. Seller totals get
+    one atomic increment per seller per batch rather than one per sale,
+    which keeps popular sellers' rows from becoming a lock hotspot; the
+    sales rollups are updated the same way, in the same transaction.
+    Returns ids of completed and failed transactions and of those to notify,
+    the (buyer, product) purchases completed, and the admin metric changes
+    (under "metrics") for the caller to flush.
+    """
+    verdicts: Dict[str, dict] = {}
+    for item in items:
+        previous = verdicts.get(item["transaction_id"])
+        # A success outranks a failure reported for the same payment
+        if previous is None or item["succeeded"] or not previous["succeeded"]:
+            verdicts[item["transaction_id"]] = item
+    if not verdicts:
+        return {"completed": [], "failed": [], "notify": [], "purchases": [], "metrics": MetricChanges()}
+
+    rows = (
+        db.query(Transaction, User.commission_rate)
+        .join(User, User.id == Transaction.seller_id)
+        .filter(Transaction.transaction_id.in_(list(verdicts)))
+        .with_for_update(of=Transaction)
+        .all()
+    )
+
+    now = datetime.utcnow()
+    completed, failed, renotify, purchases = [], [], [], []
+    seller_totals = defaultdict(lambda: [0, 0.0])
+    rollups = sales_analytics.new_deltas()
+    metrics = MetricChanges()
+    for transaction, commission_rate in rows:
+        verdict = verdicts[transaction.transaction_id]
+        if transaction.status not in OPEN_STATUSES:
+            if transaction.status == TransactionStatus.COMPLETED and verdict["succeeded"]:
+                renotify.append(transaction)
+            continue
+        if verdict["succeeded"]:
+            commission, seller_amount = split_amount(transaction.amount, commission_rate)
+            completed.append({
+                "_id": transaction.id,
+                "_commission": commission,
+                "_seller_amount": seller_amount,
+                "_gateway_id": verdict.get("gateway_id") or transaction.payment_gateway_id,
+            })
+            purchases.append((transaction.buyer_id, transaction.product_id))
+            totals = seller_totals[transaction.seller_id]
+            totals[0] += 1
+            totals[1] += seller_amount
+            sales_analytics.add_sale(
+                rollups, transaction.seller_id, transaction.product_id, now,
+                transaction.amount, commission, seller_amount,
+            )
+            metrics.transaction_moved(transaction.status, TransactionStatus.COMPLETED)
+            metrics.sale_completed(now, transaction.amount)
+        else:
+            failed.append({"_id": transaction.id})
+            metrics.transaction_moved(transaction.status, TransactionStatus.FAILED)
+
+    table = Transaction.__table__
+    if completed:
+        db.execute(
+            table.update().where(table.c.id == bindparam("_id")).values(
+                status=TransactionStatus.COMPLETED,
+                commission_amount=bindparam("_commission"),
+                seller_amount=bindparam("_seller_amount"),
+                payment_gateway_id=bindparam("_gateway_id"),
+                completed_at=now,
+                updated_at=now,
+            ),
+            completed,
+        )
+    if failed:
+        db.execute(
+            table.update().where(table.c.id == bindparam("_id")).values(
+                status=TransactionStatus.FAILED, updated_at=now
+            ),
+            failed,
+        )
+    if seller_totals:
+        users = User.__table__
+        db.execute(
+            users.update().where(users.c.id == bindparam("_id")).values(
+                total_sales=users.c.total_sales + bindparam("_sales"),
+                total_earnings=users.c.total_earnings + bindparam("_earnings"),
+            ),
+            [
+                {"_id": seller_id, "_sales": sales, "_earnings": round(earnings, 2)}
+                for seller_id, (sales, earnings) in sorted(seller_totals.items())
+            ],
+        )
+    sales_analytics.apply_deltas(db, rollups)
+    db.commit()
+
+    completed_ids = [row["_id"] for row in completed]
+    # Completed earlier but possibly never notified (worker died before fan-out);
+    # email jobs are idempotent per transaction, so this cannot double-send
+    cutoff = now - timedelta(seconds=settings.JOB_IDEMPOTENCY_TTL)
+    return {
+        "completed": completed_ids,
+        "failed": [row["_id"] for row in failed],
+        "notify": completed_ids + [t.id for t in renotify if t.completed_at and t.completed_at > cutoff],
+        "purchases": purchases,
+        "metrics": metrics,
+    }
+
+
+def notify_completed(db: Session, transaction_ids: List[int]) -> None:
+    """
+    Fan out purchase confirmation and sale notification emails
+    """
+    if not transaction_ids:
+        return
+    transactions = (
+        db.query(Transaction)
+        .filter(Transaction.id.in_(transaction_ids))
+        .all()
+    )
+    for transaction in transactions:
+        product, buyer, seller = transaction.product, transaction.buyer, transaction.seller
+        enqueue(
+            email_tasks.send_purchase_confirmation,
+            idempotency_key=f"purchase:{transaction.transaction_id}",
+            email_to=buyer.email,
+            username=buyer.username,
+            product_name=product.title,
+            transaction_id=transaction.transaction_id,
+            amount=transaction.amount,
+        )
+        enqueue(
+            email_tasks.send_sale_notification,
+            idempotency_key=f"sale:{transaction.transaction_id}",
+            email_to=seller.email,
+            seller_name=seller.username,
+            product_name=product.title,
+            buyer_name=buyer.username,
+            amount=transaction.amount,
+            seller_amount=transaction.seller_amount,
+        )
+
+
+def after_settlement(db: Session, redis_conn, result: Dict[str, list]) -> None:
+    """
+    Side effects of a settled batch, the same for the workers and the
+    inline path: cached entitlements, emails and admin counters
+    """
+    entitlements.grant(redis_conn, result["purchases"])
+    notify_completed(db, result["notify"])
+    result["metrics"].flush(redis_conn)
+
+
+@contextmanager
+def settlement_lock(redis_conn, wait: float = 0) -> Iterator[bool]:
+    """
+    Hold the lock that serializes settlement (and rollup rebuilds), waiting
+    up to ``wait`` seconds for it. Yields whether it was acquired; holders
+    refresh it with ``refresh_lock`` while they work.
+    """
+    token = str(time.time())
+    deadline = time.monotonic() + wait
+    acquired = bool(redis_conn.set(LOCK_KEY, token, nx=True, ex=settings.SETTLEMENT_LOCK_TTL))
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.5)
+        acquired = bool(redis_conn.set(LOCK_KEY, token, nx=True, ex=settings.SETTLEMENT_LOCK_TTL))
+    try:
+        yield acquired
+    finally:
+        if acquired and redis_conn.get(LOCK_KEY) == token:
+            redis_conn.delete(LOCK_KEY)
+
+
+def refresh_lock(redis_conn) -> None:
+    redis_conn.expire(LOCK_KEY, settings.SETTLEMENT_LOCK_TTL)
+
+
+def drain_queue(db: Session, redis_conn) -> Dict[str, int]:
+    """
+    Settle queued verifications batch by batch (run from a worker with a
+    sync Redis client).
+
+    A single drainer runs at a time (Redis lock). Each batch is read without
+    removing it, settled, notified and only then trimmed from the queue, so
+    a crash replays the batch instead of losing it; settlement is idempotent.
+    """
+    stats = {"batches": 0, "verifications": 0, "completed": 0, "failed": 0}
+    with settlement_lock(redis_conn) as acquired:
+        if not acquired:
+            return stats
+        for _ in range(settings.SETTLEMENT_MAX_BATCHES):
+            raw = redis_conn.lrange(QUEUE_KEY, 0, settings.SETTLEMENT_BATCH_SIZE - 1)
+            if not raw:
+                break
+            items = []
+            for value in raw:
+                try:
+                    items.append(json.loads(value))
+                except ValueError:
+                    continue  # malformed entries are dropped with the batch
+            result = settle_batch(db, items)
+            after_settlement(db, redis_conn, result)
+            redis_conn.ltrim(QUEUE_KEY, len(raw), -1)
+            refresh_lock(redis_conn)
+
+            stats["batches"] += 1
+            stats["verifications"] += len(raw)
+            stats["completed"] += len(result["completed"])
+            stats["failed"] += len(result["failed"])
+    return stats
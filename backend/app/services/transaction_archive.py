@@ -0,0 +1,189 @@
+"""
+Transaction Archive: settled transactions past the horizon live in transactions_archive
+"""
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+from sqlalchemy import DateTime, and_, delete, exists, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.review import Review
+from app.models.transaction import Transaction, TransactionArchive, TransactionStatus
+
+LOCK_KEY = "transaction_archive:lock"
+
+# Only these never change again, so only these are archived
+SETTLED_STATUSES = (
+    TransactionStatus.COMPLETED,
+    TransactionStatus.FAILED,
+    TransactionStatus.CANCELLED,
+    TransactionStatus.REFUNDED,
+)
+
+COLUMNS = [column.name for column in Transaction.__table__.columns]
+
+
+def downloadable(model, now: Optional[datetime] = None):
+    """Filter for completed purchases the buyer can still download"""
+    return and_(
+        model.status == TransactionStatus.COMPLETED,
+        or_(model.download_expiry.is_(None), model.download_expiry > (now or datetime.utcnow())),
+        func.coalesce(model.download_count, 0) < model.max_downloads,
+    )
+
+
+def horizon(now: Optional[datetime] = None) -> datetime:
+    """Transactions created before this may be archived"""
+    return (now or datetime.utcnow()) - timedelta(days=settings.TRANSACTION_ARCHIVE_AFTER_DAYS)
+
+
+def needs_archive(start: Optional[datetime]) -> bool:
+    """Whether a query from ``start`` on (None: all time) can reach archived rows"""
+    return start is None or start < horizon()
+
+
+def _copy(db: Session, source, target, ids: Sequence[int], **extra: Any) -> None:
+    """Copy rows between the live and archive tables, then delete the originals"""
+    columns = [source.c[name] for name in COLUMNS]
+    values = [literal(value, DateTime) for value in extra.values()]
+    db.execute(
+        insert(target).from_select(
+            COLUMNS + list(extra),
+            select(*columns, *values).where(source.c.id.in_(ids)),
+        )
+    )
+    db.execute(delete(source).where(source.c.id.in_(ids)))
+
+
+def archive_batch(db: Session, cutoff: datetime) -> int:
+    """
+    Move one batch of settled transactions created before ``cutoff``, in a
+    single database transaction: a crash leaves each row in exactly one
+    table, so the mover can simply be run again. Transactions referenced
+    by reviews, and purchases that can still be downloaded, stay live.
+    """
+    ids = [
+        transaction_id
+        for (transaction_id,) in (
+            db.query(Transaction.id)
+            .filter(
+                Transaction.status.in_(SETTLED_STATUSES),
+                Transaction.created_at < cutoff,
+                ~exists().where(Review.transaction_id == Transaction.id),
+                ~downloadable(Transaction),
+            )
+            .order_by(Transaction.id)
+            .limit(settings.TRANSACTION_ARCHIVE_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+    ]
+    if ids:
+        _copy(db, Transaction.__table__, TransactionArchive.__table__, ids, archived_at=datetime.utcnow())
+    db.commit()
+    return len(ids)
+
+
+def archive_transactions(db: Session, redis_conn) -> Dict[str, Any]:
+    """
+    Archive in batches until nothing is left, pausing
+    ``TRANSACTION_ARCHIVE_BATCH_PAUSE`` seconds between batches to leave the
+    database room for live traffic. Stops after
+    ``TRANSACTION_ARCHIVE_RUN_SECONDS``; the next run picks up from there.
+    """
+    stats = {"batches": 0, "archived": 0, "finished": False}
+    token = str(time.time())
+    if not redis_conn.set(LOCK_KEY, token, nx=True, ex=settings.TRANSACTION_ARCHIVE_RUN_SECONDS * 2):
+        return stats
+    try:
+        cutoff = horizon()
+        deadline = time.monotonic() + settings.TRANSACTION_ARCHIVE_RUN_SECONDS
+        while time.monotonic() < deadline:
+            moved = archive_batch(db, cutoff)
+            stats["batches"] += 1
+            stats["archived"] += moved
+            if moved < settings.TRANSACTION_ARCHIVE_BATCH_SIZE:
+                stats["finished"] = True
+                break
+            time.sleep(settings.TRANSACTION_ARCHIVE_BATCH_PAUSE)
+    finally:
+        if redis_conn.get(LOCK_KEY) == token:
+            redis_conn.delete(LOCK_KEY)
+    return stats
+
+
+def restore_downloadable(db: Session) -> int:
+    """
+    Move archived purchases that can still be downloaded back to the live
+    table (and commit). ``archive_batch`` skips them; this repairs rows
+    archived before it did.
+    """
+    ids = [
+        transaction_id
+        for (transaction_id,) in db.query(TransactionArchive.id).filter(downloadable(TransactionArchive))
+    ]
+    if ids:
+        _copy(db, TransactionArchive.__table__, Transaction.__table__, ids)
+    db.commit()
+    return len(ids)
+
+
+def _naive_utc(moment: Union[datetime, date, None]) -> Optional[datetime]:
+    """Transactions are stored in naive UTC; plain dates mean midnight UTC"""
+    if moment is None or isinstance(moment, datetime) and moment.tzinfo is None:
+        return moment
+    if not isinstance(moment, datetime):
+        return datetime(moment.year, moment.month, moment.day)
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _history(
+    db: Session,
+    model: Type,
+    load_options: Any,
+    column: str,
+    user_id: int,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    limit: Optional[int],
+) -> List[Any]:
+    query = db.query(model).filter(getattr(model, column) == user_id)
+    if load_options is not None:
+        query = query.options(load_options(model))
+    if start:
+        query = query.filter(model.created_at >= start)
+    if end:
+        query = query.filter(model.created_at < end)
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def history(
+    db: Session,
+    column: str,
+    user_id: int,
+    start: Union[datetime, date, None] = None,
+    end: Union[datetime, date, None] = None,
+    limit: Optional[int] = None,
+    load_options: Any = None,
+) -> List[Any]:
+    """
+    Transactions of a buyer or seller (``column`` is "buyer_id" or
+    "seller_id") in ``[start, end)``, newest first. The archive is only
+    read when the range reaches past the horizon and the live rows do not
+    already fill ``limit`` with newer transactions.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    rows = _history(db, Transaction, load_options, column, user_id, start, end, limit)
+    if not needs_archive(start):
+        return rows
+    if limit and len(rows) == limit and rows[-1].created_at >= horizon():
+        return rows
+    archived = _history(db, TransactionArchive, load_options, column, user_id, start, end, limit)
+    if not archived:
+        return rows
+    rows = sorted(rows + archived, key=lambda row: (row.created_at, row.id), reverse=True)
+    return rows[:limit] if limit else rows
@@ -0,0 +1,367 @@
+"""
+Streaming Upload Ingestion
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, List, Optional
+
+from fastapi import HTTPException, Request, status
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.product import Product, ProductFile, ProductImage
+from app.models.user import User, UserRole
+from app.services.blob_store import BlobStore, blob_store
+
+try:
+    import magic
+except ImportError:  # pragma: no cover - libmagic missing on the host
+    magic = None
+
+# Bytes kept from the start of the stream for content-type sniffing
+SNIFF_SIZE = 4096
+
+# Fallback signatures when libmagic is unavailable
+SIGNATURES = (
+    (b"PK\x03\x04", "application/zip"),
+    (b"PK\x05\x06", "application/zip"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"Rar!\x1a\x07", "application/vnd.rar"),
+    (b"\x1f\x8b", "application/gzip"),
+)
+
+
+@dataclass
+class StoredUpload:
+    """Result of a completed upload"""
+    filename: str
+    stored_as: str
+    size: int
+    checksum: str
+    content_type: str
+    deduplicated: bool = False
+
+
+def validate_filename(filename: Optional[str], allowed: Optional[List[str]] = None) -> str:
+    """
+    Check the client filename and return its (lower-cased) extension
+    """
+    if not filename or not os.path.basename(filename):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file")
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in (allowed if allowed is not None else settings.ALLOWED_EXTENSIONS):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"File type {ext or '(none)'} is not allowed"
+        )
+    return ext
+
+
+def sniff_content_type(head: bytes, filename: str) -> str:
+    """
+    Detect the content type from the first bytes, falling back to the extension
+    """
+    if magic is not None:
+        try:
+            return magic.from_buffer(head, mime=True)
+        except Exception:
+            pass
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if len(head) > 262 and head[257:262] == b"ustar":
+        return "application/x-tar"
+    guessed, _ = mimetypes.guess_type(filename)
+    return guessed or "application/octet-stream"
+
+
+def _write_chunk(fh: BinaryIO, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    fh.write(chunk)
+
+
+def _commit_file(
+    fh: BinaryIO,
+    temp_path: str,
+    store: BlobStore,
+    checksum: str,
+    content_type: str
+) -> bool:
+    fh.flush()
+    os.fsync(fh.fileno())
+    fh.close()
+    return store.commit(temp_path, checksum, content_type)
+
+
+def _discard_file(fh: BinaryIO, temp_path: str) -> None:
+    fh.close()
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def ingest_stream(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    max_size: int = settings.MAX_UPLOAD_SIZE,
+    store: BlobStore = blob_store,
+    allowed_extensions: Optional[List[str]] = None
+) -> StoredUpload:
+    """
+    Write an upload to disk chunk by chunk.
+
+    The SHA-256 is computed as the bytes arrive. The upload is aborted with 413
+    as soon as ``max_size`` is exceeded. Data goes to a temp file that is moved
+    into the content-addressed ``store`` (local disk or S3) only once complete.
+    If the content is already stored, the temp file is dropped. File I/O runs
+    in the threadpool, so memory stays at one chunk per upload.
+    """
+    validate_filename(filename, allowed_extensions)
+    os.makedirs(store.staging_dir, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=store.staging_dir, prefix=".upload-", suffix=".part")
+    fh = os.fdopen(fd, "wb")
+    hasher = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds the {max_size} byte limit"
+                )
+            if len(head) < SNIFF_SIZE:
+                head += chunk[:SNIFF_SIZE - len(head)]
+            await run_in_threadpool(_write_chunk, fh, hasher, chunk)
+
+        checksum = hasher.hexdigest()
+        content_type = sniff_content_type(head, filename)
+        deduplicated = await run_in_threadpool(
+            _commit_file, fh, temp_path, store, checksum, content_type
+        )
+    except BaseException:
+        await run_in_threadpool(_discard_file, fh, temp_path)
+        raise
+
+    return StoredUpload(
+        filename=os.path.basename(filename),
+        stored_as=store.key_for(checksum),
+        size=size,
+        checksum=checksum,
+        content_type=content_type,
+        deduplicated=deduplicated,
+    )
+
+
+def get_owned_product(db: Session, product_id: int, user: User) -> Product:
+    """
+    Load a product the user may attach files to
+    """
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    if product.seller_id != user.id and user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return product
+
+
+def owns_blob(db: Session, checksum: str, user: User) -> bool:
+    """
+    Whether one of the user's products already references the content.
+    Knowing a checksum is no proof of having the bytes, so blobs are only
+    probed and re-attached within the seller's own products.
+    """
+    if user.role == UserRole.ADMIN:
+        return True
+    return db.query(
+        db.query(ProductFile.id)
+        .join(Product, Product.id == ProductFile.product_id)
+        .filter(ProductFile.checksum == checksum, Product.seller_id == user.id)
+        .exists()
+    ).scalar()
+
+
+def attach_product_file(
+    db: Session,
+    product: Product,
+    stored: StoredUpload,
+    is_main: bool = False
+) -> ProductFile:
+    """
+    Record a stored upload as a ProductFile of the product
+    """
+    product_file = ProductFile(
+        product_id=product.id,
+        file_name=stored.filename,
+        file_url=stored.stored_as,
+        file_size=stored.size,
+        file_type=stored.content_type,
+        checksum=stored.checksum,
+        is_main=is_main,
+    )
+    db.add(product_file)
+    db.commit()
+    db.refresh(product_file)
+    return product_file
+
+
+def attach_product_image(
+    db: Session,
+    product: Product,
+    stored: StoredUpload,
+    derivatives: dict,
+    is_primary: bool = False,
+    caption: Optional[str] = None
+) -> ProductImage:
+    """
+    Record an uploaded screenshot and, for the primary image, denormalize its
+    card thumbnail onto the product so listings need no join
+    """
+    urls = derivatives["urls"]
+    is_primary = is_primary or not product.thumbnail_url
+    if is_primary:
+        db.query(ProductImage).filter(
+            ProductImage.product_id == product.id,
+            ProductImage.is_primary.is_(True),
+        ).update({"is_primary": False}, synchronize_session=False)
+        product.thumbnail_url = urls["card"]["webp"]
+
+    image = ProductImage(
+        product_id=product.id,
+        image_url=urls["large"]["webp"],
+        thumbnail_url=urls["thumb"]["webp"],
+        checksum=stored.checksum,
+        caption=caption,
+        is_primary=is_primary,
+    )
+    db.add(image)
+    db.commit()
+    db.refresh(image)
+    return image
+
+
+class MultipartFileStream:
+    """
+    Incremental multipart/form-data reader exposing one file field as a
+    stream of chunks, without spooling the request body first.
+    """
+
+    def __init__(self, request: Request, field_name: str = "file"):
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a multipart/form-data upload"
+            )
+
+        self.field_name = field_name.encode()
+        self.filename: Optional[str] = None
+        self._source = request.stream()
+        self._pending: List[bytes] = []
+        self._in_target = False
+        self._target_done = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if (
+            self.filename is None
+            and options.get(b"name") == self.field_name
+            and b"filename" in options
+        ):
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_target = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_target:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_target:
+            self._in_target = False
+            self._target_done = True
+
+    async def _feed(self) -> bool:
+        """Push the next network chunk through the parser"""
+        try:
+            chunk = await self._source.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Malformed multipart body"
+            )
+        return True
+
+    async def start(self) -> str:
+        """
+        Read until the file part's headers are parsed and return its filename
+        """
+        while self.filename is None:
+            if not await self._feed():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Missing file field '{self.field_name.decode()}'"
+                )
+        return self.filename
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """
+        Yield the file part's bytes as they arrive
+        """
+        while True:
+            if self._pending:
+                data = b"".join(self._pending)
+                self._pending.clear()
+                yield data
+            if self._target_done:
+                return
+            if not await self._feed():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Upload ended before the file was complete"
+                )
@@ -0,0 +1,30 @@
+"""
+Static Code Analysis Jobs
+"""
+from sqlalchemy.orm import Session
+
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.database import SessionLocal
+from app.services.code_analysis import analysis_key, analyze_product
+from app.tasks.base import JobTask, enqueue_async
+
+
+@celery_app.task(base=JobTask, name="app.tasks.analysis.analyze_product")
+def analyze_product_job(product_id: int) -> dict:
+    """Score a product's code quality and security from its files"""
+    db = SessionLocal()
+    try:
+        return analyze_product(db, product_id, get_sync_redis())
+    finally:
+        db.close()
+
+
+async def schedule_analysis(db: Session, product_id: int) -> str:
+    """
+    Enqueue analysis of a product; repeats for the same set of files reuse the job
+    """
+    return await enqueue_async(
+        analyze_product_job,
+        idempotency_key=analysis_key(db, product_id),
+        product_id=product_id,
+    )
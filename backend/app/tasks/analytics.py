@@ -0,0 +1,45 @@
+"""
+Analytics Jobs
+"""
+from datetime import datetime
+from functools import partial
+from typing import Optional
+
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services import admin_metrics, sales_analytics
+from app.services.settlement import refresh_lock, settlement_lock
+from app.tasks.base import JobTask
+
+
+@celery_app.task(base=JobTask, name="app.tasks.analytics.rebuild_sales_rollups")
+def rebuild_sales_rollups_job(since: Optional[str] = None) -> dict:
+    """
+    Backfill the sales rollups from completed transactions (all, or from
+    the month of ``since``, an ISO date, on)
+    """
+    redis_conn = get_sync_redis()
+    # Settlement updates the rollups too: keep it paused while rebuilding
+    with settlement_lock(redis_conn, wait=settings.SETTLEMENT_LOCK_TTL) as acquired:
+        if not acquired:
+            raise RuntimeError("Settlement is running, retrying the rebuild later")
+        db = SessionLocal()
+        try:
+            return sales_analytics.rebuild(
+                db,
+                datetime.fromisoformat(since) if since else None,
+                on_batch=partial(refresh_lock, redis_conn),
+            )
+        finally:
+            db.close()
+
+
+@celery_app.task(base=JobTask, name="app.tasks.analytics.reconcile_admin_metrics")
+def reconcile_admin_metrics_job() -> dict:
+    """Recompute the admin dashboard counters from the database"""
+    db = SessionLocal()
+    try:
+        return admin_metrics.reconcile(db, get_sync_redis())
+    finally:
+        db.close()
@@ -0,0 +1,17 @@
+"""
+Transaction Archive Jobs
+"""
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.database import SessionLocal
+from app.services.transaction_archive import archive_transactions
+from app.tasks.base import JobTask
+
+
+@celery_app.task(base=JobTask, name="app.tasks.archive.archive_transactions")
+def archive_transactions_job() -> dict:
+    """Move settled transactions past the horizon to the archive table"""
+    db = SessionLocal()
+    try:
+        return archive_transactions(db, get_sync_redis())
+    finally:
+        db.close()
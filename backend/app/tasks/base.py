@@ -0,0 +1,176 @@
+"""
+Base Job Task: retries with backoff, idempotency keys and dead-lettering
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+from celery import Task
+from celery.exceptions import Ignore
+from celery.result import AsyncResult
+from starlette.concurrency import run_in_threadpool
+
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
+DEAD_LETTER_KEY = "jobs:dead_letter"
+ENQUEUED_KEY = "jobs:enqueued:{}"
+DONE_KEY = "jobs:done:{}"
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+
+
+class JobTask(Task):
+    """
+    Base class for application jobs.
+
+    Any exception triggers a retry with exponential backoff and jitter. Once
+    retries are exhausted the job is recorded in the dead-letter list. A job
+    whose id (its idempotency key) already completed is skipped without
+    touching its stored result, which makes redelivery after a worker crash
+    safe.
+    """
+    abstract = True
+    autoretry_for = (Exception,)
+    retry_backoff = True
+    retry_backoff_max = 600
+    retry_jitter = True
+    max_retries = 5
+
+    def __call__(self, *args, **kwargs):
+        job_id = self.request.id
+        if job_id and get_sync_redis().exists(DONE_KEY.format(job_id)):
+            # Returning would store None over the first run's result
+            raise Ignore()
+        result = super().__call__(*args, **kwargs)
+        if job_id:
+            get_sync_redis().set(DONE_KEY.format(job_id), 1, ex=settings.JOB_IDEMPOTENCY_TTL)
+        return result
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        """Record jobs that exhausted their retries"""
+        record = {
+            "task": self.name,
+            "job_id": task_id,
+            "args": args,
+            "kwargs": kwargs,
+            "error": repr(exc),
+            "failed_at": datetime.utcnow().isoformat(),
+        }
+        client = get_sync_redis()
+        client.lpush(DEAD_LETTER_KEY, json.dumps(record, default=str))
+        client.ltrim(DEAD_LETTER_KEY, 0, settings.JOB_DEAD_LETTER_MAX - 1)
+        client.delete(ENQUEUED_KEY.format(task_id))
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine from a (synchronous) job.
+
+    Each worker process keeps one event loop for its lifetime, so clients
+    bound to the loop (Redis, HTTP connection pools) are reused across jobs.
+    """
+    global _loop, _loop_pid
+    if _loop is None or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+        redis_client.redis = None  # connections of a parent process can't be shared
+
+    async def with_redis() -> T:
+        if redis_client.redis is None:
+            await redis_client.initialize()
+        return await coro
+
+    return _loop.run_until_complete(with_redis())
+
+
+def enqueue(
+    task: Task,
+    *,
+    idempotency_key: Optional[str] = None,
+    queue: Optional[str] = None,
+    countdown: Optional[int] = None,
+    **kwargs: Any
+) -> str:
+    """
+    Enqueue a job and return its id.
+
+    With an ``idempotency_key`` the job id is derived from it and repeated
+    enqueues within ``JOB_IDEMPOTENCY_TTL`` return the existing job instead of
+    publishing a duplicate.
+    """
+    job_id = f"{task.name}:{idempotency_key}" if idempotency_key else None
+    if job_id:
+        first = get_sync_redis().set(
+            ENQUEUED_KEY.format(job_id), 1, nx=True, ex=settings.JOB_IDEMPOTENCY_TTL
+        )
+        if not first:
+            return job_id
+
+    try:
+        result = task.apply_async(
+            kwargs=kwargs,
+            task_id=job_id,
+            queue=queue,
+            countdown=countdown,
+        )
+    except Exception:
+        # Nothing was published: let the next attempt enqueue it
+        if job_id:
+            get_sync_redis().delete(ENQUEUED_KEY.format(job_id))
+        raise
+    return result.id
+
+
+async def enqueue_async(task: Task, **options: Any) -> str:
+    """
+    ``enqueue`` for request handlers: broker I/O runs off the event loop
+    """
+    return await run_in_threadpool(lambda: enqueue(task, **options))
+
+
+def job_status(job_id: str) -> Dict[str, Any]:
+    """
+    Current state of a job and its result once finished
+    """
+    result = AsyncResult(job_id, app=celery_app)
+    status = {"job_id": job_id, "status": result.state.lower()}
+    if result.successful():
+        status["result"] = result.result
+    elif result.failed():
+        status["error"] = str(result.result)
+    return status
+
+
+def dead_letters(limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Most recent dead-lettered jobs
+    """
+    return [json.loads(item) for item in get_sync_redis().lrange(DEAD_LETTER_KEY, 0, limit - 1)]
+
+
+def replay_dead_letters(limit: int = 100) -> int:
+    """
+    Re-enqueue dead-lettered jobs under their original ids
+    """
+    client = get_sync_redis()
+    replayed = 0
+    for _ in range(limit):
+        raw = client.rpop(DEAD_LETTER_KEY)
+        if raw is None:
+            break
+        record = json.loads(raw)
+        celery_app.send_task(
+            record["task"],
+            args=record.get("args") or (),
+            kwargs=record.get("kwargs") or {},
+            task_id=record["job_id"],
+        )
+        replayed += 1
+    return replayed
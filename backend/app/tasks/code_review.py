@@ -0,0 +1,17 @@
+"""
+AI Code Review Jobs
+"""
+from app.core.celery_app import celery_app
+from app.services.code_review import ReviewNotConfigured, check_configured, review_code
+from app.tasks.base import JobTask, run_async
+
+
+@celery_app.task(
+    base=JobTask,
+    name="app.tasks.code_review.review_code",
+    dont_autoretry_for=(ReviewNotConfigured,),
+)
+def review_code_job(code: str) -> str:
+    """Run an AI code review and store the feedback as the job result"""
+    check_configured()
+    return run_async(review_code(code))
@@ -0,0 +1,17 @@
+"""
+Currency Jobs
+"""
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.database import SessionLocal
+from app.services.currency import refresh_rates
+from app.tasks.base import JobTask
+
+
+@celery_app.task(base=JobTask, name="app.tasks.currency.refresh_fx_rates")
+def refresh_fx_rates_job() -> dict:
+    """Fetch FX rates and renormalize product prices to the base currency"""
+    db = SessionLocal()
+    try:
+        return refresh_rates(db, get_sync_redis())
+    finally:
+        db.close()
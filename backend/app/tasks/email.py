@@ -0,0 +1,66 @@
+"""
+Email Jobs
+"""
+import asyncio
+from typing import List, Optional
+
+from app.core.celery_app import celery_app
+from app.services.email import EmailService
+from app.tasks.base import JobTask
+
+
+@celery_app.task(base=JobTask, name="app.tasks.email.send_email")
+def send_email(
+    email_to: List[str],
+    subject: str,
+    body: str,
+    html: Optional[str] = None
+) -> None:
+    """Send a generic email"""
+    asyncio.run(EmailService().send_email(
+        email_to=email_to,
+        subject=subject,
+        body=body,
+        html=html
+    ))
+
+
+@celery_app.task(base=JobTask, name="app.tasks.email.send_verification_email")
+def send_verification_email(email_to: str, username: str) -> None:
+    """Send the account verification email"""
+    asyncio.run(EmailService().send_verification_email(email_to, username))
+
+
+@celery_app.task(base=JobTask, name="app.tasks.email.send_password_reset_email")
+def send_password_reset_email(email_to: str, username: str, reset_url: str) -> None:
+    """Send a password reset email"""
+    asyncio.run(EmailService().send_password_reset_email(email_to, username, reset_url))
+
+
+@celery_app.task(base=JobTask, name="app.tasks.email.send_purchase_confirmation")
+def send_purchase_confirmation(
+    email_to: str,
+    username: str,
+    product_name: str,
+    transaction_id: str,
+    amount: float
+) -> None:
+    """Send the buyer's purchase confirmation"""
+    asyncio.run(EmailService().send_purchase_confirmation(
+        email_to, username, product_name, transaction_id, amount
+    ))
+
+
+@celery_app.task(base=JobTask, name="app.tasks.email.send_sale_notification")
+def send_sale_notification(
+    email_to: str,
+    seller_name: str,
+    product_name: str,
+    buyer_name: str,
+    amount: float,
+    seller_amount: float
+) -> None:
+    """Tell the seller about a sale"""
+    asyncio.run(EmailService().send_sale_notification(
+        email_to, seller_name, product_name, buyer_name, amount, seller_amount
+    ))
@@ -0,0 +1,17 @@
+"""
+Purchase Entitlement Jobs
+"""
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.database import SessionLocal
+from app.services import entitlements
+from app.tasks.base import JobTask
+
+
+@celery_app.task(base=JobTask, name="app.tasks.entitlements.reconcile_entitlements")
+def reconcile_entitlements_job() -> dict:
+    """Drop cached entitlement sets that no longer match the database"""
+    db = SessionLocal()
+    try:
+        return entitlements.reconcile(db, get_sync_redis())
+    finally:
+        db.close()
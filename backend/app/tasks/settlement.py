@@ -0,0 +1,31 @@
+"""
+Payment Settlement Jobs
+"""
+import time
+
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.database import SessionLocal
+from app.services.settlement import drain_queue
+from app.tasks.base import JobTask, enqueue_async
+
+
+@celery_app.task(base=JobTask, name="app.tasks.settlement.settle_payments")
+def settle_payments_job() -> dict:
+    """Settle queued payment verifications in batches"""
+    db = SessionLocal()
+    try:
+        return drain_queue(db, get_sync_redis())
+    finally:
+        db.close()
+
+
+async def schedule_settlement() -> str:
+    """
+    Trigger settlement shortly after a verification was queued; all
+    verifications arriving within the same second share one job
+    """
+    return await enqueue_async(
+        settle_payments_job,
+        idempotency_key=str(int(time.time())),
+        countdown=1,
+    )
@@ -0,0 +1,24 @@
+"""
+Upload Maintenance Jobs
+"""
+from app.core.celery_app import celery_app, get_sync_redis
+from app.core.database import SessionLocal
+from app.services.blob_store import collect_garbage
+from app.services.resumable_upload import purge_abandoned_uploads
+from app.tasks.base import JobTask
+
+
+@celery_app.task(base=JobTask, name="app.tasks.uploads.purge_abandoned_uploads")
+def purge_abandoned_uploads_job() -> int:
+    """Delete partial files of expired resumable upload sessions"""
+    return purge_abandoned_uploads(get_sync_redis())
+
+
+@celery_app.task(base=JobTask, name="app.tasks.uploads.collect_blob_garbage")
+def collect_blob_garbage_job() -> int:
+    """Delete stored blobs no ProductFile references any more"""
+    db = SessionLocal()
+    try:
+        return collect_garbage(db)
+    finally:
+        db.close()
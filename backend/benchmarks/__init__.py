@@ -0,0 +1,3 @@
+"""
+Benchmarks (run from backend/: python -m benchmarks.<name> --help)
+"""
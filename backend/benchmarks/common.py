@@ -0,0 +1,108 @@
+"""
+Shared benchmark helpers: throwaway databases, seed data and timing
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every model)
+from app.core.database import Base
+from app.models.product import Product
+from app.models.transaction import Transaction
+from app.models.user import User, UserRole
+
+
+def make_session(url: str = "sqlite://") -> Session:
+    """Session on a fresh database (in memory by default) with every table created"""
+    engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def seed_seller(db: Session) -> User:
+    seller = User(email="seller@example.com", username="seller", hashed_password="x", role=UserRole.SELLER)
+    db.add(seller)
+    db.commit()
+    return seller
+
+
+def seed_users(db: Session, count: int) -> None:
+    now = datetime.utcnow()
+    db.execute(insert(User.__table__), [
+        {
+            "email": f"buyer{index}@example.com",
+            "username": f"buyer{index}",
+            "hashed_password": "x",
+            "full_name": f"Buyer {index}",
+            "website": f"https://buyer{index % 50}.example.com" if index % 3 else None,
+            "role": "BUYER",
+            "created_at": now - timedelta(minutes=index),
+        }
+        for index in range(count)
+    ])
+    db.commit()
+
+
+def seed_products(db: Session, seller: User, count: int) -> None:
+    """Products shaped like real listings: titles, URLs, prices, ratings"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "title": f"Admin dashboard template {index}",
+            "slug": f"admin-dashboard-template-{index}",
+            "description": "Responsive admin dashboard with charts, tables and authentication pages",
+            "price": 9.99 + index % 90,
+            "currency": "USD",
+            "rating": round(3 + index % 20 / 10, 1),
+            "total_reviews": index % 37,
+            "thumbnail_url": f"/media/images/{index:064x}/thumb.webp",
+            "demo_url": f"https://demo.example.com/products/{index}" if index % 2 else None,
+            "seller_id": seller.id,
+            "created_at": now - timedelta(minutes=index),
+        }
+        for index in range(count)
+    ]
+    db.execute(insert(Product.__table__), rows)
+    db.commit()
+
+
+def seed_transactions(db: Session, seller: User, count: int, batch: int = 10000) -> None:
+    now = datetime.utcnow()
+    for offset in range(0, count, batch):
+        db.execute(insert(Transaction.__table__), [
+            {
+                "transaction_id": f"txn-{index}",
+                "amount": 19.99,
+                "commission_amount": 2.0,
+                "seller_amount": 17.99,
+                "currency": "USD",
+                "payment_method": "VNPAY",
+                "status": "COMPLETED",
+                "product_id": 1,
+                "buyer_id": seller.id,
+                "seller_id": seller.id,
+                "created_at": now - timedelta(seconds=index),
+                "completed_at": now - timedelta(seconds=index),
+            }
+            for index in range(offset, min(offset + batch, count))
+        ])
+        db.commit()
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    """Fastest of ``repeat`` runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    return argparse.ArgumentParser(description=description.strip().splitlines()[0])
@@ -0,0 +1,53 @@
+"""
+Response compression: bytes saved vs CPU per body for gzip and brotli levels
+
+    python -m benchmarks.compression --page-size 100 --repeat 200
+
+The body is a real product list page (get_serializer + orjson). The last
+column is the time a CompressedBodyCache hit takes instead.
+"""
+from app.core.compression import CompressedBodyCache, brotli, compress
+from app.core.config import settings
+from app.core.serialization import fast_json_response, get_serializer
+from app.models.product import Product
+from app.schemas.product import ProductListItem
+from benchmarks.common import best_time, make_session, parser, seed_products, seed_seller
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 5, 11)
+
+
+def main() -> None:
+    args = parser(__doc__)
+    args.add_argument("--page-size", type=int, default=100)
+    args.add_argument("--repeat", type=int, default=200)
+    options = args.parse_args()
+
+    db = make_session()
+    seed_products(db, seed_seller(db), options.page_size)
+    serializer = get_serializer(ProductListItem)
+    rows = db.query(Product).options(serializer.load_options(Product)).all()
+    body = fast_json_response({
+        "items": serializer.dump_rows(rows), "total": len(rows), "page": 1, "page_size": len(rows)
+    }).body
+
+    cache = CompressedBodyCache(1)
+    key = ("/api/v1/products/", "W/\"bench\"", "gzip", "")
+    cache.put(key, compress(body, "gzip"))
+    hit = best_time(lambda: cache.get(key), options.repeat)
+
+    cases = [("gzip", "COMPRESSION_GZIP_LEVEL", level) for level in GZIP_LEVELS]
+    if brotli is not None:
+        cases += [("br", "COMPRESSION_BROTLI_QUALITY", quality) for quality in BROTLI_QUALITIES]
+
+    print(f"identity: {len(body)} bytes")
+    print(f"{'encoding':<10}{'level':>6}{'bytes':>9}{'ratio':>8}{'us/body':>10}{'cache hit us':>14}")
+    for encoding, setting, level in cases:
+        setattr(settings, setting, level)
+        size = len(compress(body, encoding))
+        seconds = best_time(lambda: compress(body, encoding), options.repeat)
+        print(f"{encoding:<10}{level:>6}{size:>9}{size / len(body):>8.2f}{seconds * 1e6:>10.0f}{hit * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Bulk export: rows/sec and peak memory of the streamed NDJSON and CSV exports
+
+    python -m benchmarks.export --rows 300000
+
+Transactions are seeded into a throwaway SQLite file. Each mode then runs in
+its own interpreter, so the peak RSS it reports is that mode's alone:
+"buffered" is the old shape (every row loaded, one body built), the others
+consume the export iterator chunk by chunk as StreamingResponse would.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import orjson
+
+from app.core.config import settings
+from app.services import export
+from benchmarks.common import make_session, parser, seed_seller, seed_transactions
+
+MODES = ("buffered", export.NDJSON, export.CSV)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(mode: str, url: str) -> None:
+    """Export every transaction once; prints rows, bytes, seconds, RSS before and peak"""
+    db = make_session(url)
+    stmt, columns = export.export_query("transactions", {})
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "buffered":
+        rows = db.execute(stmt).all()
+        body = orjson.dumps([dict(zip(columns, row)) for row in rows], default=export._plain)
+        count, size = len(rows), len(body)
+    else:
+        count = size = 0
+        for chunk in export.export(db, "transactions", mode, {}):
+            size += len(chunk)
+            count += chunk.count(b"\n")
+        if mode == export.CSV:
+            count -= 1  # header row
+    seconds = time.perf_counter() - start
+    print(count, size, seconds, before, peak_rss_mb())
+
+
+def main() -> None:
+    args = parser(__doc__)
+    args.add_argument("--rows", type=int, default=300000)
+    args.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    args.add_argument("--db", help=argparse.SUPPRESS)
+    options = args.parse_args()
+    if options.run:
+        return run(options.run, options.db)
+
+    fd, path = tempfile.mkstemp(prefix="bench-export-", suffix=".db")
+    os.close(fd)
+    url = f"sqlite:///{path}"
+    try:
+        db = make_session(url)
+        seed_transactions(db, seed_seller(db), options.rows)
+        db.close()
+
+        print(f"{options.rows} transactions, EXPORT_BATCH_SIZE={settings.EXPORT_BATCH_SIZE}")
+        print(f"{'mode':<10}{'rows':>9}{'MB':>8}{'rows/s':>10}{'RSS MB':>9}{'peak MB':>9}{'growth':>8}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.export", "--run", mode, "--db", url],
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            count, size = int(output[0]), int(output[1])
+            seconds, before, peak = map(float, output[2:])
+            print(
+                f"{mode:<10}{count:>9}{size / 1e6:>8.1f}{count / seconds:>10,.0f}"
+                f"{before:>9.0f}{peak:>9.0f}{peak - before:>8.0f}"
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Image derivatives: CPU per source image and listing payload weight
+
+    python -m benchmarks.images --images 8 --size 4000x3000 --workers 2
+
+Sources are synthetic camera-sized JPEGs stored in a throwaway local
+store. Reports render time per image (serial, then through the process
+pool) and the bytes a listing page downloads for the full-size
+screenshots vs the card derivatives.
+"""
+import os
+import tempfile
+
+# Set before the app is imported; pool workers (spawned) inherit the same directory
+if "BENCH_IMAGES_DIR" not in os.environ:
+    os.environ["BENCH_IMAGES_DIR"] = tempfile.mkdtemp(prefix="bench-images-")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["UPLOAD_DIR"] = os.environ["BENCH_IMAGES_DIR"]
+
+import hashlib  # noqa: E402
+import multiprocessing  # noqa: E402
+import shutil  # noqa: E402
+import time  # noqa: E402
+from concurrent.futures import ProcessPoolExecutor  # noqa: E402
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.storage import storage  # noqa: E402
+from app.services.blob_store import BlobStore  # noqa: E402
+from app.services.images import derivatives_key, render_derivatives  # noqa: E402
+from benchmarks.common import parser  # noqa: E402
+
+
+def make_source(index: int, width: int, height: int) -> str:
+    """Store a photo-like JPEG (gradient, shapes, noise, EXIF) and return its checksum"""
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for shape in range(40):
+        x, y = (shape * 997 + index * 131) % width, (shape * 577 + index * 71) % height
+        draw.rectangle((x, y, x + width // 6, y + height // 8), fill=(shape * 6 % 255, index * 30 % 255, 120))
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    image = Image.blend(image, noise, 0.15).filter(ImageFilter.SMOOTH)
+    exif = Image.Exif()
+    exif[0x010F] = "Benchmark camera"
+
+    fd, path = tempfile.mkstemp(dir=storage.staging_dir, suffix=".jpg")
+    with os.fdopen(fd, "wb") as fh:
+        image.save(fh, "JPEG", quality=92, exif=exif)
+    with open(path, "rb") as fh:
+        checksum = hashlib.sha256(fh.read()).hexdigest()
+    storage.put_file(path, BlobStore.key_for(checksum), "image/jpeg")
+    return checksum
+
+
+def clear_derivatives(checksums) -> None:
+    for checksum in checksums:
+        shutil.rmtree(storage.local_path(derivatives_key(checksum)), ignore_errors=True)
+
+
+def main() -> None:
+    args = parser(__doc__)
+    args.add_argument("--images", type=int, default=8)
+    args.add_argument("--size", default="4000x3000")
+    args.add_argument("--workers", type=int, default=settings.IMAGE_PROCESS_WORKERS)
+    args.add_argument("--page-size", type=int, default=20, help="cards on a listing page")
+    options = args.parse_args()
+    width, height = (int(part) for part in options.size.split("x"))
+
+    try:
+        checksums = [make_source(index, width, height) for index in range(options.images)]
+
+        start = time.perf_counter()
+        for checksum in checksums:
+            render_derivatives(checksum)
+        serial = (time.perf_counter() - start) / len(checksums)
+
+        cached_start = time.perf_counter()
+        for checksum in checksums:
+            render_derivatives(checksum)
+        cached = (time.perf_counter() - cached_start) / len(checksums)
+
+        clear_derivatives(checksums)
+        pool = ProcessPoolExecutor(options.workers, mp_context=multiprocessing.get_context("spawn"))
+        list(pool.map(render_derivatives, checksums[:options.workers]))  # warm up the workers
+        clear_derivatives(checksums)
+        start = time.perf_counter()
+        list(pool.map(render_derivatives, checksums))
+        pooled = time.perf_counter() - start
+        pool.shutdown()
+
+        def average(name: str) -> float:
+            keys = [
+                BlobStore.key_for(c) if name == "source" else f"{derivatives_key(c)}/{name}"
+                for c in checksums
+            ]
+            return sum(storage.size(key) for key in keys) / len(keys)
+
+        print(f"{options.images} sources {width}x{height}")
+        print(f"render, serial:          {serial * 1000:8.1f} ms/image")
+        print(f"render, cached manifest: {cached * 1000:8.1f} ms/image")
+        print(f"render, pool of {options.workers}:       {len(checksums) / pooled:8.1f} images/s")
+        print(f"{'variant':<12}{'bytes/image':>12}{'KB/page':>10}")
+        for name in ("source", "large.webp", "card.webp", "card.jpg", "thumb.webp"):
+            size = average(name)
+            print(f"{name:<12}{size:>12.0f}{size * options.page_size / 1024:>10.0f}")
+    finally:
+        shutil.rmtree(os.environ["BENCH_IMAGES_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
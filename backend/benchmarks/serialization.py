@@ -0,0 +1,59 @@
+"""
+List serialization: response_model (Pydantic + jsonable_encoder) vs get_serializer
+
+    python -m benchmarks.serialization --rows 5000 --repeat 5
+
+Both paths run the query and build the response body; the script fails if
+the two bodies differ.
+"""
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import fast_json_response, get_serializer
+from app.models.product import Product
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.schemas.product import ProductBase
+from app.schemas.transaction import TransactionBase
+from app.schemas.user import UserResponse
+from benchmarks.common import best_time, make_session, parser, seed_products, seed_seller, seed_transactions, seed_users
+
+CASES = [(Product, ProductBase), (Transaction, TransactionBase), (User, UserResponse)]
+
+
+def main() -> None:
+    args = parser(__doc__)
+    args.add_argument("--rows", type=int, default=5000)
+    args.add_argument("--repeat", type=int, default=5)
+    options = args.parse_args()
+
+    db = make_session()
+    seller = seed_seller(db)
+    seed_products(db, seller, options.rows)
+    seed_transactions(db, seller, options.rows)
+    seed_users(db, options.rows)
+
+    print(f"{'schema':<18}{'rows':>8}{'pydantic ms':>14}{'fast ms':>10}{'speedup':>9}")
+    for model, schema in CASES:
+        serializer = get_serializer(schema)
+
+        def pydantic_body() -> bytes:
+            db.expunge_all()
+            rows = db.query(model).all()
+            return JSONResponse(jsonable_encoder([schema.model_validate(row) for row in rows])).body
+
+        def fast_body() -> bytes:
+            db.expunge_all()
+            rows = db.query(model).options(serializer.load_options(model)).all()
+            return fast_json_response(serializer.dump_rows(rows)).body
+
+        if pydantic_body() != fast_body():
+            raise SystemExit(f"{schema.__name__}: the two paths produced different JSON")
+        count = db.query(model).count()
+        slow = best_time(pydantic_body, options.repeat)
+        fast = best_time(fast_body, options.repeat)
+        print(f"{schema.__name__:<18}{count:>8}{slow * 1000:>14.1f}{fast * 1000:>10.1f}{slow / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
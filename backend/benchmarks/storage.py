@@ -0,0 +1,80 @@
+"""
+Storage throughput: 100 MB put/get through S3Storage at several concurrencies
+
+    AWS_S3_ENDPOINT_URL=http://localhost:9000 AWS_ACCESS_KEY_ID=codeshare \\
+    AWS_SECRET_ACCESS_KEY=codeshare123 python -m benchmarks.storage --size-mb 100
+
+Any S3-compatible endpoint works: the MinIO service from docker-compose,
+or a moto server (python -m moto.server -p 5055). The bucket is created
+if needed and the benchmark objects are deleted afterwards. LocalStorage
+is measured on the same file for comparison.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from app.core.config import settings
+from app.core.storage import LocalStorage, S3Storage
+from benchmarks.common import parser
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def ensure_bucket(store: S3Storage) -> None:
+    from botocore.exceptions import ClientError
+
+    try:
+        store.client.head_bucket(Bucket=store.bucket)
+    except ClientError:
+        options = {}
+        if settings.AWS_REGION != "us-east-1":
+            options["CreateBucketConfiguration"] = {"LocationConstraint": settings.AWS_REGION}
+        store.client.create_bucket(Bucket=store.bucket, **options)
+
+
+def main() -> None:
+    args = parser(__doc__)
+    args.add_argument("--size-mb", type=int, default=100)
+    args.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, settings.S3_MAX_CONCURRENCY])
+    args.add_argument("--bucket", default=f"{settings.AWS_S3_BUCKET_NAME}-bench")
+    options = args.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-storage-")
+    source = os.path.join(workdir, "source.bin")
+    with open(source, "wb") as fh:
+        for _ in range(options.size_mb):
+            fh.write(os.urandom(1024 * 1024))
+    megabytes = options.size_mb
+
+    try:
+        print(f"{'backend':<22}{'put MB/s':>10}{'get MB/s':>10}")
+        local = LocalStorage(os.path.join(workdir, "local"))
+        staged = os.path.join(local.root, "staged.bin")
+        os.makedirs(local.root, exist_ok=True)
+        shutil.copyfile(source, staged)
+        put = timed(lambda: local.put_file(staged, "blobs/bench"))
+        get = timed(lambda: local.get_file("blobs/bench", os.path.join(workdir, "down.bin")))
+        print(f"{'local':<22}{megabytes / put:>10.0f}{megabytes / get:>10.0f}")
+
+        store = S3Storage(bucket=options.bucket, staging_dir=workdir)
+        ensure_bucket(store)
+        for concurrency in options.concurrency:
+            settings.S3_MAX_CONCURRENCY = concurrency
+            key = f"bench/{concurrency}"
+            staged = os.path.join(workdir, "staged.bin")
+            shutil.copyfile(source, staged)
+            put = timed(lambda: store.put_file(staged, key))
+            get = timed(lambda: store.get_file(key, os.path.join(workdir, "down.bin")))
+            store.delete(key)
+            print(f"{f's3 concurrency={concurrency}':<22}{megabytes / put:>10.0f}{megabytes / get:>10.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
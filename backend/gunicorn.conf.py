@@ -0,0 +1,74 @@
+"""
+Gunicorn Configuration (production pre-fork server)
+
+Run with:   gunicorn -c gunicorn.conf.py main:app
+Reload:     kill -HUP <master pid>   (new workers start, old ones drain gracefully)
+Scale:      kill -TTIN / -TTOU <master pid>   (never above the planned worker count)
+"""
+import os
+
+from app.core.config import settings
+from app.core.server import plan_workers
+
+plan = plan_workers()
+
+# Workers import settings after the fork; keep their pools inside the budget
+settings.DB_POOL_SIZE = plan.pool_size
+settings.DB_MAX_OVERFLOW = plan.max_overflow
+os.environ["DB_POOL_SIZE"] = str(plan.pool_size)
+os.environ["DB_MAX_OVERFLOW"] = str(plan.max_overflow)
+
+bind = f"{settings.WEB_HOST}:{settings.WEB_PORT}"
+workers = plan.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Recycle workers periodically to cap memory growth (jitter avoids restart storms)
+max_requests = settings.WEB_MAX_REQUESTS
+max_requests_jitter = settings.WEB_MAX_REQUESTS_JITTER
+
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "debug" if settings.DEBUG else "info"
+
+
+def when_ready(server):
+    server.log.info(
+        "Starting %d workers, DB pool %d+%d per worker (%d connections, "
+        "%d at peak with reload overlap and %d for Celery; budget %d)",
+        plan.workers,
+        plan.pool_size,
+        plan.max_overflow,
+        plan.total_connections,
+        plan.peak_connections,
+        plan.celery_connections,
+        settings.DB_CONNECTION_BUDGET,
+    )
+    if plan.peak_connections > settings.DB_CONNECTION_BUDGET:
+        server.log.warning(
+            "Celery alone needs %d connections; raise DB_CONNECTION_BUDGET or "
+            "lower CELERY_WORKER_CONCURRENCY",
+            plan.celery_connections,
+        )
+
+
+def nworkers_changed(server, new_value, old_value):
+    # TTIN must not grow the server past the connection budget
+    if new_value > plan.workers:
+        server.log.warning("Keeping %d workers, the DB connection budget allows no more", plan.workers)
+        server.num_workers = plan.workers
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s booted", worker.pid)
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exiting", worker.pid)
+
+
+def child_exit(server, worker):
+    server.log.info("Worker %s reaped, %d workers running", worker.pid, len(server.WORKERS))
@@ -10,9 +10,14 @@ from app.core.config import settings
 from app.core.database import engine, Base
 from app.api.v1.router import api_router
 from app.core.redis_client import redis_client
+from app.core.compression import CompressionMiddleware
+from app.core.server import worker_health
+from app.services.code_review import review_service
+from app.services.payment import gateways
+from app.services.images import shutdown_pool as shutdown_image_pool
 
 # Import all models to ensure they are registered with SQLAlchemy
-from app.models import user, product, transaction, review
+from app.models import user, product, transaction, review, analytics, currency
 
 
 @asynccontextmanager
@@ -34,6 +39,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("Shutting down CodeShare Market...")
     await redis_client.close()
+    await review_service.close()
+    await gateways.close()
+    shutdown_image_pool()
 
 
 # Create FastAPI application
@@ -53,6 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses (gzip/brotli negotiated per request)
+app.add_middleware(CompressionMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -74,14 +85,16 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "CodeShare Market API",
-        "version": settings.APP_VERSION
+        "version": settings.APP_VERSION,
+        "worker": worker_health()
     }
 
 
 if __name__ == "__main__":
+    # Development server; production runs `gunicorn -c gunicorn.conf.py main:app`
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
         reload=settings.DEBUG
     )
@@ -0,0 +1,84 @@
+"""
+Shared fixtures. Services run against in-process stand-ins: SQLite for
+the database, fakeredis for Redis and a moto S3 server for object storage.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every model)
+from app.core.config import settings
+from app.core.database import Base
+from app.core.redis_client import redis_client
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Sessions on a fresh SQLite file database. Each session has its own
+    connection, like concurrent requests do.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+async def fake_redis():
+    """The application's Redis client backed by fakeredis"""
+    from fakeredis import aioredis
+
+    previous = redis_client.redis
+    redis_client.redis = aioredis.FakeRedis(decode_responses=True)
+    yield redis_client.redis
+    await redis_client.redis.aclose()
+    redis_client.redis = previous
+
+
+@pytest.fixture
+def sync_redis(monkeypatch):
+    """The jobs' blocking Redis client (get_sync_redis) backed by fakeredis"""
+    from fakeredis import FakeRedis
+
+    from app.core import celery_app
+
+    client = FakeRedis(decode_responses=True)
+    monkeypatch.setattr(celery_app, "_sync_redis", client)
+    return client
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    """URL of a local moto S3 server (the same API the MinIO service speaks)"""
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_storage(s3_endpoint, monkeypatch, tmp_path, request):
+    """S3Storage on a fresh bucket of the moto server"""
+    from app.core.storage import S3Storage
+
+    monkeypatch.setattr(settings, "AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setattr(settings, "AWS_SECRET_ACCESS_KEY", "test")
+    bucket = request.node.name.lower().replace("_", "-")[:63]
+    store = S3Storage(bucket=bucket, endpoint_url=s3_endpoint, staging_dir=str(tmp_path))
+    store.client.create_bucket(
+        Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": settings.AWS_REGION}
+    )
+    return store
@@ -0,0 +1,27 @@
+"""
+Local HTTP stand-ins for third-party APIs, served by uvicorn in a thread
+"""
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import uvicorn
+
+
+@contextmanager
+def serve(app) -> Iterator[str]:
+    """Run an ASGI app on a free local port; yields its base URL"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off", ws="none"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield "http://127.0.0.1:{}".format(sock.getsockname()[1])
+    finally:
+        server.should_exit = True
+        thread.join()
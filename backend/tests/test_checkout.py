@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.product import Product
+from app.models.transaction import PaymentMethod, Transaction
+from app.models.user import User, UserRole
+from app.schemas.transaction import TransactionCreate
+from app.services import checkout as checkout_service
+from app.services.checkout import checkout
+from app.services.payment import PaymentSession
+
+PARALLEL = 10
+
+
+@pytest.fixture
+def buyer_id(db):
+    seller = User(email="seller@example.com", username="seller", hashed_password="x", role=UserRole.SELLER)
+    buyer = User(email="buyer@example.com", username="buyer", hashed_password="x")
+    db.add_all([seller, buyer])
+    db.commit()
+    db.add(Product(id=1, title="Template", slug="template", description="d", price=19.0, seller_id=seller.id))
+    db.commit()
+    return buyer.id
+
+
+@pytest.fixture
+def gateway_calls(monkeypatch):
+    """Fake payment sessions, slow enough for concurrent checkouts to overlap"""
+    calls = []
+
+    async def create_payment_session(transaction):
+        calls.append(transaction.transaction_id)
+        await asyncio.sleep(0.05)
+        return PaymentSession(f"https://pay.example.com/{transaction.transaction_id}", f"gw-{len(calls)}")
+
+    monkeypatch.setattr(checkout_service, "create_payment_session", create_payment_session)
+    return calls
+
+
+async def _checkouts(session_factory, buyer_id, keys):
+    sessions = [session_factory() for _ in keys]
+    payload = TransactionCreate(product_id=1, payment_method=PaymentMethod.STRIPE)
+    try:
+        return await asyncio.gather(
+            *(checkout(db, db.get(User, buyer_id), payload, key) for db, key in zip(sessions, keys)),
+            return_exceptions=True,
+        )
+    finally:
+        for db in sessions:
+            db.close()
+
+
+async def test_parallel_checkouts_with_one_key_create_one_transaction(
+    session_factory, db, fake_redis, buyer_id, gateway_calls
+):
+    results = await _checkouts(session_factory, buyer_id, ["retry-1"] * PARALLEL)
+
+    assert db.query(Transaction).count() == 1
+    assert len(gateway_calls) == 1
+    responses = [response for response, _ in results]
+    assert all(response == responses[0] for response in responses)
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * (PARALLEL - 1)
+
+
+async def test_parallel_checkouts_with_different_keys_reuse_the_pending_transaction(
+    session_factory, db, fake_redis, buyer_id, gateway_calls
+):
+    results = await _checkouts(session_factory, buyer_id, [f"key-{n}" for n in range(PARALLEL)])
+
+    assert db.query(Transaction).count() == 1
+    assert len(gateway_calls) == 1
+    assert len({response["payment_url"] for response, _ in results}) == 1
+
+
+async def test_duplicate_takes_over_when_the_first_request_fails(
+    session_factory, db, fake_redis, buyer_id, monkeypatch
+):
+    calls = []
+
+    async def create_payment_session(transaction):
+        calls.append(transaction.transaction_id)
+        await asyncio.sleep(0.05)
+        if len(calls) == 1:
+            raise HTTPException(status_code=502, detail="Stripe did not respond, try again later")
+        return PaymentSession("https://pay.example.com/ok", "gw-ok")
+
+    monkeypatch.setattr(checkout_service, "create_payment_session", create_payment_session)
+    results = await _checkouts(session_factory, buyer_id, ["retry-2"] * 2)
+
+    failed = [result for result in results if isinstance(result, HTTPException)]
+    succeeded = [result for result in results if not isinstance(result, BaseException)]
+    assert len(failed) == 1 and len(succeeded) == 1
+    assert succeeded[0][0]["payment_url"] == "https://pay.example.com/ok"
+    # The retry resumed the same pending transaction
+    assert db.query(Transaction).count() == 1
+    assert calls[0] == calls[1]
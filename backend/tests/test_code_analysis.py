@@ -0,0 +1,55 @@
+import io
+import zipfile
+
+from app.services.code_analysis import iter_sources
+
+GOOD = b"def ok():\n    return 1\n"
+
+
+def _archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in members:
+            zf.writestr(name, GOOD)
+    return bytearray(buffer.getvalue())
+
+
+def _patch_entry(data: bytearray, name: bytes, flag_bits: int = None, method: int = None) -> None:
+    """Rewrite the flags / compression method of a member in both of its headers"""
+    for signature, flags_at, method_at, name_at in ((b"PK\x03\x04", 6, 8, 30), (b"PK\x01\x02", 8, 10, 46)):
+        start = data.find(signature)
+        while start != -1:
+            if data[start + name_at:start + name_at + len(name)] == name:
+                if flag_bits is not None:
+                    data[start + flags_at:start + flags_at + 2] = flag_bits.to_bytes(2, "little")
+                if method is not None:
+                    data[start + method_at:start + method_at + 2] = method.to_bytes(2, "little")
+            start = data.find(signature, start + 4)
+
+
+def _stats():
+    return {"skipped": 0, "failed": 0}
+
+
+def test_encrypted_and_unsupported_members_are_counted_not_raised():
+    data = _archive(["encrypted.py", "aes.py", "good.py"])
+    _patch_entry(data, b"encrypted.py", flag_bits=0x1)
+    _patch_entry(data, b"aes.py", method=99)
+    stats = _stats()
+
+    sources = list(iter_sources(io.BytesIO(bytes(data)), "kit.zip", stats))
+
+    assert sources == [("good.py", GOOD)]
+    assert stats["failed"] == 2
+
+
+def test_corrupt_member_does_not_stop_the_archive():
+    data = _archive(["broken.py", "good.py"])
+    payload = data.find(b"broken.py") + len(b"broken.py")
+    data[payload:payload + 4] = b"\xff\xff\xff\xff"
+    stats = _stats()
+
+    sources = list(iter_sources(io.BytesIO(bytes(data)), "kit.zip", stats))
+
+    assert sources == [("good.py", GOOD)]
+    assert stats["failed"] == 1
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from celery.exceptions import Retry
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.services.code_review import CHUNK_PROMPT, review_code, review_service
+from app.tasks.code_review import review_code_job
+from tests.servers import serve
+
+
+class FakeOpenAI:
+    """Chat completions endpoint answering each prompt with a numbered review"""
+
+    def __init__(self):
+        self.prompts = []
+        self.delay = 0.0
+        self.app = Starlette(routes=[Route("/v1/chat/completions", self.completions, methods=["POST"])])
+
+    async def completions(self, request: Request):
+        body = await request.json()
+        prompt = body["messages"][0]["content"]
+        self.prompts.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return JSONResponse({
+            "id": f"chatcmpl-{len(self.prompts)}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": f"review {len(self.prompts)}"},
+            }],
+        })
+
+
+@pytest.fixture(scope="module")
+def openai_server():
+    fake = FakeOpenAI()
+    with serve(fake.app) as fake.url:
+        yield fake
+
+
+@pytest.fixture
+async def openai(openai_server, fake_redis, monkeypatch):
+    """The stub, reset, with the review service pointed at it"""
+    openai_server.prompts = []
+    openai_server.delay = 0.0
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"{openai_server.url}/v1")
+    monkeypatch.setattr(settings, "OPENAI_MAX_RETRIES", 0)
+    yield openai_server
+    await review_service.close()
+
+
+async def test_review_fails_without_an_api_key(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    with pytest.raises(HTTPException) as exc:
+        await review_code("print('hi')")
+    assert exc.value.status_code == 503
+
+
+def test_review_job_without_an_api_key_fails_without_retrying(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    retries = []
+
+    def retry(exc=None, **options):
+        retries.append(exc)
+        raise Retry(exc=exc)
+
+    monkeypatch.setattr(review_code_job, "retry", retry)
+    # As a worker runs it: autoretry applies outside of eager/direct calls
+    review_code_job.push_request(id="review:no-key", retries=0, called_directly=False)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            review_code_job.run(code="x = 1")
+    finally:
+        review_code_job.pop_request()
+
+    assert exc.value.status_code == 503
+    assert retries == []
+
+
+def test_file_and_chunk_reviews_are_cached_apart():
+    code = "def f():\n    return 1"
+    assert review_service.cache_key(code) != review_service.cache_key(code, "chunk")
+    # Formatting-only differences share a review
+    assert review_service.cache_key(code) == review_service.cache_key("\n" + code + "   \n")
+
+
+async def test_reviews_are_cached(openai):
+    first = await review_code("def f():\n    return 1\n")
+    again = await review_code("    def f():\r\n        return 1   \r\n")
+
+    assert first == again == "review 1"
+    assert len(openai.prompts) == 1
+
+
+async def test_identical_reviews_in_flight_share_one_completion(openai):
+    openai.delay = 0.2
+    reviews = await asyncio.gather(*(review_code("x = 1") for _ in range(5)))
+
+    assert reviews == ["review 1"] * 5
+    assert len(openai.prompts) == 1
+
+
+async def test_large_code_is_reviewed_in_chunks_and_merged(openai, monkeypatch):
+    monkeypatch.setattr(settings, "CODE_REVIEW_CHUNK_SIZE", 60)
+    functions = [f"def f{n}():\n    return {n} * {n} + {n}\n" for n in range(4)]
+    code = "\n".join(functions)
+
+    feedback = await review_code(code)
+
+    chunks = review_service.chunks(code.strip("\n"))
+    assert len(chunks) > 1
+    assert len(openai.prompts) == len(chunks)
+    assert all(prompt.startswith(CHUNK_PROMPT) for prompt in openai.prompts)
+    headings = [part.split("\n\n")[0] for part in feedback.split("\n\n### ")]
+    assert headings[0] == f"### Lines {chunks[0][0]}-{chunks[0][1]}"
+    assert len(headings) == len(chunks)
+
+    # Editing the last function re-reviews only its chunk
+    await review_code(code.replace("return 3 * 3 + 3", "return 3 ** 2 + 3"))
+    assert len(openai.prompts) == len(chunks) + 1
+
+
+async def test_full_queue_is_rejected_with_503(openai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "OPENAI_MAX_QUEUE", 1)
+    openai.delay = 0.3
+
+    running = asyncio.ensure_future(review_code("a = 1"))
+    await asyncio.sleep(0.1)  # holds the only slot
+    waiting = asyncio.ensure_future(review_code("b = 2"))
+    await asyncio.sleep(0.05)  # queued for the slot
+    with pytest.raises(HTTPException) as exc:
+        await review_code("c = 3")
+
+    assert exc.value.status_code == 503
+    assert await running == "review 1"
+    assert await waiting == "review 2"
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.responses import JSONResponse
+
+from app.core.compression import CompressionMiddleware
+from app.core.storage import LocalStorage
+from app.models.product import Product, ProductFile
+from app.models.transaction import PaymentMethod, Transaction, TransactionStatus
+from app.models.user import User, UserRole
+from app.services import download
+
+README = b"".join(b"line %d of a plain text file that compresses very well\n" % n for n in range(400))
+
+
+@pytest.fixture
+def purchase(db, tmp_path, monkeypatch):
+    """A completed purchase of a product whose file is a text file in local storage"""
+    store = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(download, "storage", store)
+    (tmp_path / "README.txt").write_bytes(README)
+
+    user = User(email="buyer@example.com", username="buyer", hashed_password="x", role=UserRole.SELLER)
+    db.add(user)
+    db.commit()
+    db.add(Product(id=1, title="Kit", slug="kit", description="d", price=10.0, seller_id=user.id))
+    product_file = ProductFile(
+        product_id=1, file_name="README.txt", file_url="README.txt", file_size=len(README),
+        file_type="text/plain", checksum=hashlib.sha256(README).hexdigest(),
+    )
+    transaction = Transaction(
+        transaction_id="txn-1", amount=10.0, currency="USD", payment_method=PaymentMethod.STRIPE,
+        status=TransactionStatus.COMPLETED, product_id=1, buyer_id=user.id, seller_id=user.id,
+        download_count=0, max_downloads=5,
+    )
+    db.add_all([product_file, transaction])
+    db.commit()
+    return transaction, product_file
+
+
+@pytest.fixture
+def client(db, purchase):
+    transaction, product_file = purchase
+    api = FastAPI()
+    api.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @api.get("/download")
+    async def get_download(request: Request):
+        return await download.download_response(request, db, transaction, product_file)
+
+    @api.get("/listing")
+    async def get_listing():
+        return JSONResponse({"items": [README.decode()]}, headers={"ETag": '"v1"'})
+
+    return TestClient(api)
+
+
+def test_ranged_text_download_is_not_compressed(client, purchase):
+    _, product_file = purchase
+    etag = f'"{product_file.checksum}"'
+
+    full = client.get("/download", headers={"Accept-Encoding": "gzip"})
+    assert full.status_code == 200
+    assert "content-encoding" not in full.headers
+    assert full.headers["etag"] == etag
+    assert full.content == README
+
+    resumed = client.get(
+        "/download", headers={"Accept-Encoding": "gzip", "Range": "bytes=1000-", "If-Range": etag}
+    )
+    assert resumed.status_code == 206
+    assert "content-encoding" not in resumed.headers
+    assert resumed.headers["content-range"] == f"bytes 1000-{len(README) - 1}/{len(README)}"
+    assert resumed.content == README[1000:]
+
+
+def test_other_text_responses_are_still_compressed(client):
+    response = client.get("/listing", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert response.json() == {"items": [README.decode()]}
+
+
+async def test_zero_copy_sends_pass_through_in_order():
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.zerocopysend", "file": None, "count": 10, "more_body": False})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    await CompressionMiddleware(app)(scope, None, send)
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.zerocopysend"]
+    assert (b"content-encoding", b"gzip") not in sent[0]["headers"]
@@ -0,0 +1,78 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.storage import LocalStorage
+from app.models.product import Product, ProductFile
+from app.models.transaction import PaymentMethod, Transaction, TransactionStatus
+from app.models.user import User
+from app.services import download
+
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def transaction(db, tmp_path, monkeypatch):
+    """A completed purchase with three downloads, served from local storage"""
+    monkeypatch.setattr(download, "storage", LocalStorage(str(tmp_path)))
+    (tmp_path / "kit.zip").write_bytes(CONTENT)
+
+    user = User(email="buyer@example.com", username="buyer", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.add(Product(id=1, title="Kit", slug="kit", description="d", price=10.0, seller_id=user.id))
+    product_file = ProductFile(product_id=1, file_name="kit.zip", file_url="kit.zip", file_size=len(CONTENT))
+    transaction = Transaction(
+        transaction_id="txn-1", amount=10.0, currency="USD", payment_method=PaymentMethod.STRIPE,
+        status=TransactionStatus.COMPLETED, product_id=1, buyer_id=user.id, seller_id=user.id,
+        download_count=0, max_downloads=3,
+    )
+    db.add_all([product_file, transaction])
+    db.commit()
+    return transaction, product_file
+
+
+@pytest.fixture
+def client(db, transaction):
+    api = FastAPI()
+
+    @api.get("/download")
+    async def get_download(request: Request):
+        return await download.download_response(request, db, *transaction)
+
+    return TestClient(api)
+
+
+def _count(db, transaction):
+    db.expire_all()
+    return transaction[0].download_count
+
+
+def test_resuming_a_download_is_free(client, db, transaction):
+    assert client.get("/download", headers={"Range": "bytes=0-999"}).status_code == 206
+    resumed = client.get("/download", headers={"Range": "bytes=1000-"})
+    assert resumed.status_code == 206
+    assert resumed.content == CONTENT[1000:]
+    assert _count(db, transaction) == 1
+
+
+def test_ranges_avoiding_the_last_byte_still_count(client, db, transaction):
+    last = len(CONTENT) - 1
+    client.get("/download", headers={"Range": f"bytes=0-{last - 1}"})
+    client.get("/download", headers={"Range": f"bytes={last}-"})
+    assert _count(db, transaction) == 1
+    client.get("/download", headers={"Range": f"bytes=0-{last - 1}"})
+    assert _count(db, transaction) == 2
+
+
+def test_a_first_request_past_the_start_counts(client, db, transaction):
+    assert client.get("/download", headers={"Range": "bytes=1-"}).status_code == 206
+    assert _count(db, transaction) == 1
+
+
+def test_quota_is_enforced(client, db, transaction):
+    for _ in range(3):
+        assert client.get("/download").status_code == 200
+    assert client.get("/download").status_code == 403
+    assert client.get("/download", headers={"Range": "bytes=1000-"}).status_code == 206
+    assert _count(db, transaction) == 3
@@ -0,0 +1,43 @@
+import pytest
+from celery.app.trace import build_tracer
+from celery.backends.database import DatabaseBackend
+
+from app.core.celery_app import celery_app
+from app.tasks.base import DONE_KEY, JobTask
+
+runs = []
+
+
+@celery_app.task(base=JobTask, name="tests.jobs.add")
+def add(a: int, b: int) -> int:
+    runs.append((a, b))
+    return a + b
+
+
+@pytest.fixture
+def worker(sync_redis, monkeypatch, tmp_path):
+    """
+    Runs a job the way a worker does. Results go to the SQL result backend,
+    which (unlike the key-value ones) overwrites a stored success.
+    """
+    runs.clear()
+    backend = DatabaseBackend(url=f"sqlite:///{tmp_path / 'results.db'}", app=celery_app)
+    monkeypatch.setattr(add, "backend", backend)
+    tracer = build_tracer(add.name, add, app=celery_app, eager=False)
+
+    def deliver(job_id, **kwargs):
+        tracer(job_id, (), kwargs, {"id": job_id, "delivery_info": {}})
+        return backend.get_task_meta(job_id)
+
+    return deliver
+
+
+def test_redelivered_job_keeps_its_first_result(worker, sync_redis):
+    first = worker("tests.jobs.add:key", a=2, b=3)
+    assert (first["status"], first["result"]) == ("SUCCESS", 5)
+    assert sync_redis.exists(DONE_KEY.format("tests.jobs.add:key"))
+
+    again = worker("tests.jobs.add:key", a=2, b=3)
+
+    assert runs == [(2, 3)]
+    assert (again["status"], again["result"]) == ("SUCCESS", 5)
@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.models.transaction import PaymentMethod, Transaction
+from app.services.payment import GatewayPool, PaymentGateway, PayPalGateway, StripeGateway
+from tests.servers import serve
+
+
+class FakeGateway:
+    """
+    Stripe and PayPal endpoints on a local HTTP server. ``failures`` lists
+    status codes to answer with before succeeding; ``delay`` slows every call.
+    """
+
+    def __init__(self):
+        self.reset()
+        self.app = Starlette(routes=[
+            Route("/v1/checkout/sessions", self.checkout_session, methods=["POST"]),
+            Route("/v1/oauth2/token", self.oauth_token, methods=["POST"]),
+            Route("/v2/checkout/orders/{order_id}", self.order, methods=["GET"]),
+            Route("/v2/checkout/orders/{order_id}/capture", self.capture, methods=["POST"]),
+        ])
+
+    def reset(self):
+        self.failures = []
+        self.delay = 0.0
+        self.order_status = "APPROVED"
+        self.calls = []
+
+    async def _answer(self, request: Request, body: dict) -> JSONResponse:
+        self.calls.append((request.method, request.url.path, dict(request.headers)))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            return JSONResponse({"error": "unavailable"}, status_code=self.failures.pop(0))
+        return JSONResponse(body)
+
+    async def checkout_session(self, request):
+        form = await request.form()
+        return await self._answer(request, {"id": "cs_1", "url": f"https://stripe.test/{form['client_reference_id']}"})
+
+    async def oauth_token(self, request):
+        return await self._answer(request, {"access_token": "token", "expires_in": 3600})
+
+    async def order(self, request):
+        return await self._answer(request, {
+            "id": request.path_params["order_id"],
+            "status": self.order_status,
+            "purchase_units": [{"reference_id": "txn-1"}],
+        })
+
+    async def capture(self, request):
+        return await self._answer(request, {
+            "id": request.path_params["order_id"],
+            "status": "COMPLETED",
+            "purchase_units": [{"reference_id": "txn-1"}],
+        })
+
+
+@pytest.fixture(scope="module")
+def gateway_server():
+    fake = FakeGateway()
+    with serve(fake.app) as fake.url:
+        yield fake
+
+
+@pytest.fixture
+def fake_gateway(gateway_server, monkeypatch):
+    """The fake server, reset, with both gateways pointed at it and fast retries"""
+    gateway_server.reset()
+    monkeypatch.setattr(settings, "STRIPE_API_URL", gateway_server.url)
+    monkeypatch.setattr(settings, "PAYPAL_API_URL", gateway_server.url)
+    monkeypatch.setattr(settings, "PAYMENT_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(settings, "PAYMENT_RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "PAYMENT_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(settings, "PAYMENT_BREAKER_RESET", 0.2)
+    return gateway_server
+
+
+@pytest.fixture
+async def pool():
+    pool = GatewayPool()
+    yield pool
+    await pool.close()
+
+
+def _transaction():
+    return Transaction(transaction_id="txn-1", amount=19.0, currency="USD", payment_method=PaymentMethod.STRIPE)
+
+
+def _paypal_return(order_id="ORDER1"):
+    return Request({
+        "type": "http", "method": "GET", "path": "/", "headers": [],
+        "query_string": f"token={order_id}".encode(),
+    })
+
+
+def test_adapters_must_implement_the_gateway_calls():
+    class Incomplete(PaymentGateway):
+        async def create_payment(self, transaction, return_url, cancel_url):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete(GatewayPool())
+
+
+async def test_server_errors_are_retried(fake_gateway, pool):
+    fake_gateway.failures = [503, 429]
+    session = await StripeGateway(pool).create_payment(_transaction(), "https://r", "https://c")
+
+    assert session.payment_url == "https://stripe.test/txn-1"
+    assert len(fake_gateway.calls) == 3
+    # Every attempt carries the same idempotency key, so the gateway creates one session
+    assert {headers["idempotency-key"] for _, _, headers in fake_gateway.calls} == {"txn-1"}
+
+
+async def test_client_errors_are_not_retried(fake_gateway, pool):
+    fake_gateway.failures = [400]
+    with pytest.raises(HTTPException) as error:
+        await StripeGateway(pool).create_payment(_transaction(), "https://r", "https://c")
+
+    assert error.value.status_code == 502
+    assert len(fake_gateway.calls) == 1
+
+
+async def test_retries_give_up_at_the_deadline(fake_gateway, pool, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_GATEWAY_DEADLINE", 0.3)
+    monkeypatch.setattr(settings, "PAYMENT_RETRY_ATTEMPTS", 10)
+    fake_gateway.delay = 1.0
+
+    start = time.monotonic()
+    with pytest.raises(HTTPException) as error:
+        await StripeGateway(pool, timeout=5.0).create_payment(_transaction(), "https://r", "https://c")
+
+    assert error.value.status_code == 502
+    assert time.monotonic() - start < 0.8
+
+
+async def test_breaker_fails_fast_then_lets_a_trial_call_through(fake_gateway, pool):
+    gateway = StripeGateway(pool)
+    fake_gateway.failures = [503] * 3
+    with pytest.raises(HTTPException) as error:
+        await gateway.create_payment(_transaction(), "https://r", "https://c")
+    assert error.value.status_code == 502
+    assert len(fake_gateway.calls) == 3
+
+    # Open: no call reaches the gateway
+    with pytest.raises(HTTPException) as error:
+        await gateway.create_payment(_transaction(), "https://r", "https://c")
+    assert error.value.status_code == 503
+    assert len(fake_gateway.calls) == 3
+
+    # After the reset period one trial call closes it again
+    await asyncio.sleep(settings.PAYMENT_BREAKER_RESET)
+    assert (await gateway.create_payment(_transaction(), "https://r", "https://c")).gateway_id == "cs_1"
+    assert gateway.breaker.opened_at is None
+
+
+async def test_failed_trial_call_keeps_the_breaker_open(fake_gateway, pool, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_RETRY_ATTEMPTS", 1)
+    gateway = StripeGateway(pool)
+    fake_gateway.failures = [503] * 4
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            await gateway.create_payment(_transaction(), "https://r", "https://c")
+
+    await asyncio.sleep(settings.PAYMENT_BREAKER_RESET)
+    with pytest.raises(HTTPException) as error:
+        await gateway.create_payment(_transaction(), "https://r", "https://c")
+    assert error.value.status_code == 502
+    with pytest.raises(HTTPException) as error:
+        await gateway.create_payment(_transaction(), "https://r", "https://c")
+    assert error.value.status_code == 503
+    assert len(fake_gateway.calls) == 4
+
+
+async def test_paypal_verification_captures_approved_orders(fake_gateway, pool):
+    result = await PayPalGateway(pool).verify(_paypal_return())
+
+    assert (result.transaction_id, result.succeeded, result.gateway_id) == ("txn-1", True, "ORDER1")
+    paths = [(method, path) for method, path, _ in fake_gateway.calls]
+    assert paths == [
+        ("POST", "/v1/oauth2/token"),
+        ("GET", "/v2/checkout/orders/ORDER1"),
+        ("POST", "/v2/checkout/orders/ORDER1/capture"),
+    ]
+    assert fake_gateway.calls[-1][2]["paypal-request-id"] == "capture-ORDER1"
+
+
+async def test_paypal_order_not_yet_approved_has_no_verdict(fake_gateway, pool):
+    fake_gateway.order_status = "CREATED"
+    assert await PayPalGateway(pool).verify(_paypal_return()) is None
+    assert [path for _, path, _ in fake_gateway.calls][-1] == "/v2/checkout/orders/ORDER1"
+
+
+async def test_paypal_rejects_malformed_order_ids(fake_gateway, pool):
+    with pytest.raises(HTTPException) as error:
+        await PayPalGateway(pool).verify(_paypal_return("../v1/oauth2"))
+    assert error.value.status_code == 400
+    assert fake_gateway.calls == []
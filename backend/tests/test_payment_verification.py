@@ -0,0 +1,203 @@
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.deps import get_db
+from app.api.v1.endpoints import transactions
+from app.models.product import Product
+from app.models.transaction import PaymentMethod, Transaction, TransactionStatus
+from app.models.user import User, UserRole
+from app.services import settlement
+from app.services.payment import StripeGateway, VNPayGateway
+
+VNPAY_SECRET = "vnpay-secret"
+STRIPE_SECRET = "whsec_test"
+
+
+@pytest.fixture
+def emails(monkeypatch):
+    """Notification tasks enqueued by settlement, by idempotency key"""
+    sent = []
+    monkeypatch.setattr(settlement, "enqueue", lambda task, idempotency_key, **kwargs: sent.append(idempotency_key))
+    return sent
+
+
+@pytest.fixture
+def client(session_factory, sync_redis, emails, monkeypatch):
+    monkeypatch.setattr(settings, "VNPAY_HASH_SECRET", VNPAY_SECRET)
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", STRIPE_SECRET)
+    api = FastAPI()
+    api.include_router(transactions.router, prefix="/transactions")
+
+    def get_test_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    api.dependency_overrides[get_db] = get_test_db
+    return TestClient(api)
+
+
+@pytest.fixture
+def pending(db):
+    """One pending transaction per gateway, keyed by payment method"""
+    seller = User(email="seller@example.com", username="seller", hashed_password="x", role=UserRole.SELLER)
+    buyer = User(email="buyer@example.com", username="buyer", hashed_password="x")
+    db.add_all([seller, buyer])
+    db.commit()
+    product = Product(title="Template", slug="template", description="d", price=20.0, seller_id=seller.id)
+    db.add(product)
+    db.commit()
+    for method in (PaymentMethod.VNPAY, PaymentMethod.STRIPE):
+        db.add(Transaction(
+            transaction_id=f"txn-{method.value}", amount=20.0, currency="USD", payment_method=method,
+            product_id=product.id, buyer_id=buyer.id, seller_id=seller.id,
+        ))
+    db.commit()
+
+
+def _status(db, transaction_id):
+    db.expire_all()
+    return db.query(Transaction.status).filter(Transaction.transaction_id == transaction_id).scalar()
+
+
+def _vnpay_result(response_code="00", **changes):
+    params = {
+        "vnp_Amount": "50000000",
+        "vnp_ResponseCode": response_code,
+        "vnp_TransactionNo": "14000001",
+        "vnp_TransactionStatus": response_code,
+        "vnp_TxnRef": "txn-vnpay",
+    }
+    secure_hash = hmac.new(
+        VNPAY_SECRET.encode(), urlencode(sorted(params.items())).encode(), hashlib.sha512
+    ).hexdigest()
+    return {**params, **changes, "vnp_SecureHash": secure_hash}
+
+
+def _stripe_event(event_type="checkout.session.completed", payment_status="paid"):
+    return json.dumps({
+        "type": event_type,
+        "data": {"object": {
+            "id": "cs_test_1", "client_reference_id": "txn-stripe", "payment_status": payment_status,
+        }},
+    }).encode()
+
+
+def _stripe_signature(payload: bytes, secret=STRIPE_SECRET, timestamp=None):
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def test_signed_vnpay_result_settles(client, db, pending):
+    response = client.get("/transactions/verify/vnpay", params=_vnpay_result())
+    assert response.status_code == 200
+    assert _status(db, "txn-vnpay") == TransactionStatus.COMPLETED
+
+
+def test_inline_settlement_runs_the_post_settlement_hook(client, db, pending, sync_redis, emails):
+    client.get("/transactions/verify/vnpay", params=_vnpay_result())
+    transaction = db.query(Transaction).filter(Transaction.transaction_id == "txn-vnpay").one()
+    assert sync_redis.smembers(f"entitlements:{transaction.buyer_id}") == {str(transaction.product_id)}
+    assert sorted(emails) == ["purchase:txn-vnpay", "sale:txn-vnpay"]
+    assert sync_redis.hgetall("metrics:transactions:by_status") == {"pending": "-1", "completed": "1"}
+
+
+def test_signed_vnpay_failure_fails_the_payment(client, db, pending):
+    response = client.get("/transactions/verify/vnpay", params=_vnpay_result("24"))
+    assert response.status_code == 200
+    assert _status(db, "txn-vnpay") == TransactionStatus.FAILED
+
+
+@pytest.mark.parametrize("params", [
+    {"vnp_TxnRef": "txn-vnpay", "vnp_ResponseCode": "00"},  # unsigned
+    _vnpay_result("24", vnp_ResponseCode="00", vnp_TransactionStatus="00"),  # tampered
+    _vnpay_result(vnp_TxnRef="txn-stripe"),  # signature of another transaction
+])
+def test_untrusted_vnpay_results_are_rejected(client, db, pending, params):
+    response = client.get("/transactions/verify/vnpay", params=params)
+    assert response.status_code == 400
+    assert _status(db, "txn-vnpay") == TransactionStatus.PENDING
+    assert _status(db, "txn-stripe") == TransactionStatus.PENDING
+
+
+def test_vnpay_without_a_configured_secret_rejects_everything(client, db, pending, monkeypatch):
+    monkeypatch.setattr(settings, "VNPAY_HASH_SECRET", "")
+    params = {"vnp_TxnRef": "txn-vnpay", "vnp_ResponseCode": "00"}
+    params["vnp_SecureHash"] = VNPayGateway.sign(params)  # signed with the empty secret
+    assert client.get("/transactions/verify/vnpay", params=params).status_code == 400
+
+
+def test_signed_stripe_event_settles(client, db, pending):
+    payload = _stripe_event()
+    response = client.post(
+        "/transactions/verify/stripe", content=payload, headers={"Stripe-Signature": _stripe_signature(payload)}
+    )
+    assert response.status_code == 200
+    assert _status(db, "txn-stripe") == TransactionStatus.COMPLETED
+
+
+@pytest.mark.parametrize("signature", [
+    None,
+    "t=1,v1=deadbeef",
+    "wrong-secret",
+    "expired",
+])
+def test_untrusted_stripe_events_are_rejected(client, db, pending, signature):
+    payload = _stripe_event()
+    headers = {}
+    if signature == "wrong-secret":
+        headers["Stripe-Signature"] = _stripe_signature(payload, secret="whsec_other")
+    elif signature == "expired":
+        headers["Stripe-Signature"] = _stripe_signature(
+            payload, timestamp=time.time() - settings.STRIPE_WEBHOOK_TOLERANCE - 60
+        )
+    elif signature:
+        headers["Stripe-Signature"] = signature
+    response = client.post("/transactions/verify/stripe", content=payload, headers=headers)
+    assert response.status_code == 400
+    assert _status(db, "txn-stripe") == TransactionStatus.PENDING
+
+
+@pytest.mark.parametrize("event_type,payment_status", [
+    ("payment_intent.created", "unpaid"),
+    ("checkout.session.completed", "unpaid"),  # delayed payment method, not paid yet
+])
+def test_stripe_events_without_a_verdict_are_ignored(client, db, pending, event_type, payment_status):
+    payload = _stripe_event(event_type, payment_status)
+    response = client.post(
+        "/transactions/verify/stripe", content=payload, headers={"Stripe-Signature": _stripe_signature(payload)}
+    )
+    assert response.json() == {"status": "ignored"}
+    assert _status(db, "txn-stripe") == TransactionStatus.PENDING
+
+
+def test_result_for_another_gateways_transaction_is_not_found(client, db, pending):
+    payload = json.dumps({
+        "type": "checkout.session.completed",
+        "data": {"object": {"id": "cs_1", "client_reference_id": "txn-vnpay", "payment_status": "paid"}},
+    }).encode()
+    response = client.post(
+        "/transactions/verify/stripe", content=payload, headers={"Stripe-Signature": _stripe_signature(payload)}
+    )
+    assert response.status_code == 404
+    assert _status(db, "txn-vnpay") == TransactionStatus.PENDING
+
+
+def test_stripe_signature_accepts_any_listed_v1(monkeypatch):
+    """Stripe lists one v1 per active secret while a secret is being rolled"""
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", STRIPE_SECRET)
+    payload = b"{}"
+    header = _stripe_signature(payload)
+    timestamp, valid = header.split(",")
+    StripeGateway.check_signature(payload, f"{timestamp},v1=00ff,{valid}")
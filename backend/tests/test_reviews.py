@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from app.models.product import Product
+from app.models.review import Review
+from app.models.user import User, UserRole
+from app.services.reviews import list_page, rescore_reviews, wilson_lower_bound
+
+EDITED = datetime(2020, 1, 1)
+
+
+def test_rescore_ranks_many_helpful_votes_above_a_few(db):
+    seller = User(email="seller@example.com", username="seller", hashed_password="x", role=UserRole.SELLER)
+    db.add(seller)
+    db.commit()
+    db.add(Product(id=1, title="Template", slug="template", description="d", price=10.0, seller_id=seller.id))
+    for review_id, (helpful, not_helpful) in enumerate([(2, 0), (40, 10), (0, 0), (None, None), (2, 0)], start=1):
+        db.add(Review(
+            id=review_id, rating=5, comment="c", product_id=1, reviewer_id=seller.id,
+            helpful_count=helpful, not_helpful_count=not_helpful, helpful_score=0.0, updated_at=EDITED,
+        ))
+    db.commit()
+
+    assert rescore_reviews(db) == 5
+    db.commit()
+
+    reviews = list_page(db, 1, "most_helpful", 0, 10)
+    scores = {review.id: review.helpful_score for review in reviews}
+    assert reviews[0].id == 2
+    assert scores == {
+        1: wilson_lower_bound(2, 0), 2: wilson_lower_bound(40, 10), 3: 0.0, 4: 0.0, 5: wilson_lower_bound(2, 0),
+    }
+    assert {review.updated_at for review in reviews} == {EDITED}
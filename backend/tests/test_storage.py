@@ -0,0 +1,90 @@
+import os
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from app.core.config import settings
+from app.core.storage import LocalStorage, content_disposition
+
+
+def _write(path, size: int) -> bytes:
+    data = os.urandom(size)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return data
+
+
+def test_multipart_round_trip(s3_storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD", 5 * 1024 * 1024)
+    monkeypatch.setattr(settings, "S3_MULTIPART_CHUNK_SIZE", 5 * 1024 * 1024)
+    data = _write(tmp_path / "up.bin", 12 * 1024 * 1024)
+
+    s3_storage.put_file(str(tmp_path / "up.bin"), "blobs/ab/cd/abcd", "application/zip")
+    assert not (tmp_path / "up.bin").exists()
+    assert s3_storage.size("blobs/ab/cd/abcd") == len(data)
+    # Uploaded in parts: the ETag of a multipart object ends with the part count
+    assert s3_storage._head("blobs/ab/cd/abcd")["ETag"].endswith('-3"')
+
+    s3_storage.get_file("blobs/ab/cd/abcd", str(tmp_path / "down.bin"))
+    assert (tmp_path / "down.bin").read_bytes() == data
+    with s3_storage.open("blobs/ab/cd/abcd") as fh:
+        fh.seek(len(data) - 10)
+        assert fh.read() == data[-10:]
+
+
+def test_missing_objects(s3_storage):
+    assert s3_storage.size("nope") is None
+    assert s3_storage.modified_at("nope") is None
+    assert not s3_storage.exists("nope")
+
+
+def test_touch_keeps_content_type_and_metadata(s3_storage, tmp_path):
+    _write(tmp_path / "img", 1024)
+    s3_storage.put_file(str(tmp_path / "img"), "derivatives/card.webp", "image/webp")
+    s3_storage.client.copy_object(
+        Bucket=s3_storage.bucket,
+        Key="derivatives/card.webp",
+        CopySource={"Bucket": s3_storage.bucket, "Key": "derivatives/card.webp"},
+        MetadataDirective="REPLACE",
+        ContentType="image/webp",
+        CacheControl="public, max-age=31536000",
+        Metadata={"source": "abcd"},
+    )
+
+    s3_storage.touch("derivatives/card.webp")
+
+    head = s3_storage._head("derivatives/card.webp")
+    assert head["ContentType"] == "image/webp"
+    assert head["CacheControl"] == "public, max-age=31536000"
+    assert head["Metadata"]["source"] == "abcd"
+    assert "touched" in head["Metadata"]
+
+
+def test_presigned_url_serves_the_object(s3_storage, tmp_path):
+    data = _write(tmp_path / "f", 2048)
+    s3_storage.put_file(str(tmp_path / "f"), "blobs/f", "application/octet-stream")
+
+    url = s3_storage.presigned_url("blobs/f", filename="Tài liệu.zip", content_type="application/zip")
+    response = httpx.get(url)
+
+    assert response.status_code == 200
+    assert response.content == data
+    # The bucket copies these signed parameters into the response headers
+    query = parse_qs(urlsplit(url).query)
+    assert query["response-content-type"] == ["application/zip"]
+    assert query["response-content-disposition"] == [content_disposition("Tài liệu.zip")]
+
+
+def test_local_storage_rejects_keys_outside_the_root(tmp_path):
+    store = LocalStorage(str(tmp_path))
+    assert store.size("../outside") is None
+    assert store.modified_at("../outside") is None
+
+
+def test_content_disposition_is_latin1_safe():
+    value = content_disposition('Đồ án "cuối kỳ".zip')
+    value.encode("latin-1")
+    assert value == (
+        'attachment; filename="Do an _cuoi ky_.zip"; '
+        "filename*=UTF-8''%C4%90%E1%BB%93%20%C3%A1n%20%22cu%E1%BB%91i%20k%E1%BB%B3%22.zip"
+    )
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.product import Product
+from app.models.transaction import PaymentMethod, Transaction, TransactionArchive, TransactionStatus
+from app.models.user import User, UserRole
+from app.services.download import get_purchase
+from app.services.transaction_archive import _copy, archive_batch, restore_downloadable
+
+OLD = datetime.utcnow() - timedelta(days=400)
+
+
+@pytest.fixture
+def purchases(db):
+    """Old purchases of one buyer, one product each, keyed by what still allows a download"""
+    seller = User(email="seller@example.com", username="seller", hashed_password="x", role=UserRole.SELLER)
+    buyer = User(email="buyer@example.com", username="buyer", hashed_password="x")
+    db.add_all([seller, buyer])
+    db.commit()
+    cases = {
+        "downloadable": dict(download_count=1),
+        "expiring_later": dict(download_expiry=datetime.utcnow() + timedelta(days=1)),
+        "expired": dict(download_expiry=OLD + timedelta(days=30)),
+        "used_up": dict(download_count=5),
+        "refunded": dict(status=TransactionStatus.REFUNDED),
+    }
+    for product_id, (name, columns) in enumerate(cases.items(), start=1):
+        db.add(Product(id=product_id, title=name, slug=name, description="d", price=10.0, seller_id=seller.id))
+        db.add(Transaction(
+            transaction_id=name, amount=10.0, currency="USD", payment_method=PaymentMethod.STRIPE,
+            product_id=product_id, buyer_id=buyer.id, seller_id=seller.id, created_at=OLD,
+            **{"status": TransactionStatus.COMPLETED, "max_downloads": 5, **columns},
+        ))
+    db.commit()
+    return {name: product_id for product_id, name in enumerate(cases, start=1)}, buyer.id
+
+
+def test_downloadable_purchases_stay_live(db, purchases):
+    assert archive_batch(db, datetime.utcnow()) == 3
+
+    live = {transaction_id for (transaction_id,) in db.query(Transaction.transaction_id)}
+    archived = {transaction_id for (transaction_id,) in db.query(TransactionArchive.transaction_id)}
+    assert live == {"downloadable", "expiring_later"}
+    assert archived == {"expired", "used_up", "refunded"}
+
+
+def test_download_lookup_never_restores_archived_purchases(db, purchases):
+    products, buyer_id = purchases
+    archive_batch(db, datetime.utcnow())
+
+    assert get_purchase(db, buyer_id, products["downloadable"]).transaction_id == "downloadable"
+    with pytest.raises(HTTPException) as expired:
+        get_purchase(db, buyer_id, products["expired"])
+    with pytest.raises(HTTPException) as used_up:
+        get_purchase(db, buyer_id, products["used_up"])
+    assert (expired.value.status_code, used_up.value.status_code) == (410, 403)
+    assert db.query(TransactionArchive).count() == 3
+
+
+def test_downloadable_purchases_archived_earlier_are_restored(db, purchases):
+    archive_batch(db, datetime.utcnow())
+    # As the mover did before it skipped downloadable purchases
+    ids = [row_id for (row_id,) in db.query(Transaction.id).filter(Transaction.transaction_id == "downloadable")]
+    _copy(db, Transaction.__table__, TransactionArchive.__table__, ids, archived_at=datetime.utcnow())
+    db.commit()
+
+    assert restore_downloadable(db) == 1
+    assert restore_downloadable(db) == 0
+
+    live = {transaction_id for (transaction_id,) in db.query(Transaction.transaction_id)}
+    archived = {transaction_id for (transaction_id,) in db.query(TransactionArchive.transaction_id)}
+    assert live == {"downloadable", "expiring_later"}
+    assert archived == {"expired", "used_up", "refunded"}
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import upload
+from app.core.deps import get_current_seller_user, get_db
+from app.core.storage import LocalStorage
+from app.models.product import Product, ProductFile
+from app.models.user import User, UserRole
+from app.services.blob_store import blob_store, collect_garbage
+
+
+@pytest.fixture
+def seller_client(session_factory, db, tmp_path, monkeypatch):
+    """Upload API of a seller with two products, storing blobs under tmp_path"""
+    store = LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(blob_store, "storage", store)
+    monkeypatch.setattr(upload, "storage", store)
+
+    async def schedule_analysis(db, product_id):
+        return f"analysis-{product_id}"
+
+    monkeypatch.setattr(upload, "schedule_analysis", schedule_analysis)
+
+    seller = User(email="seller@example.com", username="seller", hashed_password="x", role=UserRole.SELLER)
+    db.add(seller)
+    db.commit()
+    for product_id in (1, 2):
+        db.add(Product(
+            id=product_id, title=f"Kit {product_id}", slug=f"kit-{product_id}",
+            description="d", price=10.0, seller_id=seller.id,
+        ))
+    db.commit()
+
+    api = FastAPI()
+    api.include_router(upload.router, prefix="/upload")
+
+    def get_test_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    api.dependency_overrides[get_db] = get_test_db
+    api.dependency_overrides[get_current_seller_user] = lambda: db.get(User, seller.id)
+    return TestClient(api)
+
+
+def test_uploaded_file_survives_gc_and_can_be_attached_again(seller_client, db):
+    response = seller_client.post(
+        "/upload/file", params={"product_id": 1, "is_main": True},
+        files={"file": ("kit.zip", b"PK\x05\x06" + b"\0" * 18, "application/zip")},
+    )
+    assert response.status_code == 201
+    uploaded = response.json()
+    assert uploaded["analysis_job_id"] == "analysis-1"
+    assert db.get(ProductFile, uploaded["product_file_id"]).checksum == uploaded["checksum"]
+
+    assert collect_garbage(db, grace_seconds=0) == 0
+    assert blob_store.exists(uploaded["checksum"])
+
+    response = seller_client.post(
+        f"/upload/blobs/{uploaded['checksum']}/attach",
+        json={"filename": "kit.zip", "product_id": 2},
+    )
+    assert response.status_code == 201
+    assert response.json()["stored_as"] == uploaded["stored_as"]
+
+
+def test_upload_requires_a_product_of_the_seller(seller_client, db):
+    files = {"file": ("kit.zip", b"PK\x05\x06" + b"\0" * 18, "application/zip")}
+    assert seller_client.post("/upload/file", files=files).status_code == 422
+    assert seller_client.post("/upload/file", params={"product_id": 99}, files=files).status_code == 404
+    assert db.query(ProductFile).count() == 0